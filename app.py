@@ -1,15 +1,40 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from werkzeug.utils import secure_filename
-from datetime import datetime
+from flask import (Flask, Response, render_template, request, redirect, url_for, flash, jsonify, session,
+                   stream_with_context)
+import click
+import glob
+import hashlib
 import json
 import os
 import re
+import shutil
+import tempfile
+import zipfile
+
+from import_cache import ImportCache
+from import_jobs import ImportJobQueue
+from importer import bulk_import, collect_pdfs, read_zip
+from rules import parse_class_levels, spell_slot_totals
+from serialization import CODECS
+from storage import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, VersionConflict, create_storage, copy_characters
 
 app = Flask(__name__)
 app.secret_key = 'dnd_secret_key'
 app.config.update(
     MAX_CONTENT_LENGTH=16 * 1024 * 1024,
-    UPLOAD_FOLDER='uploads'
+    UPLOAD_FOLDER='uploads',
+    # Uploads larger than this are spooled to a temporary file instead of memory
+    UPLOAD_SPOOL_SIZE=2 * 1024 * 1024,
+    STORAGE_BACKEND=os.environ.get('DND_STORAGE_BACKEND', 'json'),
+    STORAGE_PATH=os.environ.get('DND_STORAGE_PATH'),
+    # Format character documents are written in: json, fastjson (orjson) or msgpack
+    STORAGE_FORMAT=os.environ.get('DND_STORAGE_FORMAT', 'json'),
+    # Background threads running uploaded PDF imports
+    IMPORT_WORKERS=int(os.environ.get('DND_IMPORT_WORKERS', 2)),
+    # Results of earlier imports of identical PDFs; a size of 0 disables the cache
+    IMPORT_CACHE_PATH=os.environ.get('DND_IMPORT_CACHE_PATH'),
+    IMPORT_CACHE_SIZE=int(os.environ.get('DND_IMPORT_CACHE_SIZE', 64 * 1024 * 1024)),
+    # Version of the code and templates in page ETags (default: a hash of them)
+    RENDER_VERSION=os.environ.get('DND_RENDER_VERSION')
 )
 
 # Directory setup
@@ -19,37 +44,109 @@ UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+DEFAULT_STORAGE_PATHS = {
+    'json': DATA_DIR,
+    'sqlite': os.path.join(DATA_DIR, 'characters.db')
+}
+
+
+def get_storage_path(backend):
+    return app.config['STORAGE_PATH'] or DEFAULT_STORAGE_PATHS.get(backend, DATA_DIR)
+
+
+def get_storage_spec():
+    # Lets worker processes open their own connection to the configured storage
+    backend = app.config['STORAGE_BACKEND']
+    return backend, get_storage_path(backend), app.config['STORAGE_FORMAT']
+
+
+def get_import_cache_spec():
+    if not app.config['IMPORT_CACHE_SIZE']:
+        return None
+    path = app.config['IMPORT_CACHE_PATH'] or os.path.join(DATA_DIR, 'import_cache.db')
+    return path, app.config['IMPORT_CACHE_SIZE']
 
-def get_character_path(character_id):
-    return os.path.join(DATA_DIR, f'{character_id}.json')
+
+storage = create_storage(*get_storage_spec())
+import_cache = ImportCache(*get_import_cache_spec()) if get_import_cache_spec() else None
+import_jobs = ImportJobQueue(storage, workers=app.config['IMPORT_WORKERS'], cache=import_cache)
+
+
+def get_render_version():
+    # Pages depend on the code and templates as much as on the character, so
+    # their entity tags change with every deployment of either. Hashed on
+    # first use rather than on import, which every spawned worker repeats.
+    if not app.config['RENDER_VERSION']:
+        digest = hashlib.sha1()
+        for path in sorted(glob.glob(os.path.join(BASE_DIR, '*.py')) +
+                           glob.glob(os.path.join(BASE_DIR, app.template_folder, '*.html'))):
+            with open(path, 'rb') as file:
+                digest.update(file.read())
+        app.config['RENDER_VERSION'] = digest.hexdigest()[:12]
+    return app.config['RENDER_VERSION']
 
 
 def load_character(character_id=None):
     if character_id:
-        try:
-            with open(get_character_path(character_id)) as file:
-                return json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return None
-
-    characters = []
-    for filename in os.listdir(DATA_DIR):
-        if filename.endswith('.json'):
-            try:
-                with open(os.path.join(DATA_DIR, filename)) as file:
-                    characters.append(json.load(file))
-            except json.JSONDecodeError:
-                continue
-    return characters
+        return storage.get(character_id)
+    return storage.all()
 
 
 def save_character(character_data):
-    if not character_data.get('id'):
-        character_data['id'] = datetime.now().strftime('%Y%m%d%H%M%S')
+    return storage.save(character_data)
+
+
+def get_expected_version():
+    """
+    Read the version a client based its update on from the If-Match header.
+
+    Returns:
+        int: The expected version, or None if any version is acceptable
 
-    with open(get_character_path(character_data['id']), 'w') as file:
-        json.dump(character_data, file, indent=2)
-    return character_data['id']
+    Raises:
+        ValueError: If the header is not a version ETag
+    """
+    if_match = request.headers.get('If-Match', '').strip()
+    if not if_match or if_match == '*':
+        return None
+    return int(if_match.strip('"'))
+
+
+def add_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Let clients keep a copy but always revalidate it
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified_response(etag, last_modified):
+    """
+    Answer 304 Not Modified when the client's cached copy is still current.
+
+    Only If-None-Match is trusted. If-Modified-Since alone can't prove a copy
+    current: HTTP dates have one-second granularity, which a journal append
+    right after a read falls within, and deletions or new code don't change
+    the modification time at all.
+
+    Args:
+        etag (str): Current entity tag (unquoted)
+        last_modified (datetime): Current modification time (UTC) or None
+
+    Returns:
+        Response: A 304 response, or None if the full response must be sent
+    """
+    if not request.if_none_match or not request.if_none_match.contains_weak(etag):
+        return None
+    return add_validators(Response(status=304), etag, last_modified)
+
+
+def version_conflict_response(conflict):
+    return jsonify({
+        'error': 'Character was modified by another request',
+        'version': conflict.current_version
+    }), 409
 
 
 def prepare_spell_lists(character):
@@ -87,6 +184,20 @@ def get_proficient_skill_names(character):
     return skills
 
 
+def update_spell_slot_totals(character):
+    # Multiclass characters list each class with its level, e.g. "Paladin 6 / Sorcerer 2"
+    class_levels = parse_class_levels(character['class'])
+    if len(class_levels) < 2:
+        class_levels = [(character['class'], character['level'])]
+
+    spell_slots = character['spellcasting'].setdefault('spell_slots', {})
+    for slot_level, total in enumerate(spell_slot_totals(class_levels), 1):
+        slot = spell_slots.setdefault(str(slot_level), {'total': 0, 'used': 0})
+        slot['total'] = total
+        slot['used'] = min(slot.get('used', 0), total)
+    return character
+
+
 def process_spellcasting_data(character, form_data):
     if 'spellcasting' not in character:
         return character
@@ -95,11 +206,9 @@ def process_spellcasting_data(character, form_data):
     spellcasting['class'] = form_data.get('spellcasting_class', '')
     ability = form_data.get('spellcasting_ability', '')
 
+    # Save DC and attack bonus are derived stats, recomputed when the character is saved
     if ability:
         spellcasting['ability'] = ability
-        ability_mod = character['ability_modifiers'][ability]
-        spellcasting['spell_save_dc'] = 8 + character['proficiency_bonus'] + ability_mod
-        spellcasting['spell_attack_bonus'] = character['proficiency_bonus'] + ability_mod
 
     spellcasting['cantrips'] = [c.strip() for c in form_data.get('cantrips', '').split('\n') if c.strip()]
     spellcasting['spells'] = []
@@ -123,7 +232,7 @@ def process_spellcasting_data(character, form_data):
 # Routes
 @app.route('/')
 def index():
-    return render_template('index.html', characters=load_character())
+    return render_template('index.html', characters=storage.summaries())
 
 
 @app.route('/import', methods=['GET', 'POST'])
@@ -144,40 +253,104 @@ def import_character():
         flash('Only PDF files are allowed')
         return redirect(request.url)
 
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(UPLOAD_DIR, filename)
-
     try:
-        file.save(file_path)
-        character_id = None
-        error = None
-
-        try:
-            from pdf_import import import_character_from_pdf
-            character_id, error = import_character_from_pdf(file_path, DATA_DIR)
-
-            if error and "No fillable form fields found" in error:
-                flash('No fillable form fields found. Attempting OCR import...')
-                from ocr_support import import_character_from_scanned_pdf
-                character_id, error = import_character_from_scanned_pdf(file_path, DATA_DIR)
-        except ImportError:
-            flash('Standard PDF import failed. Attempting OCR import...')
-            from ocr_support import import_character_from_scanned_pdf
-            character_id, error = import_character_from_scanned_pdf(file_path, DATA_DIR)
-
-        if error:
-            flash(f'Error importing character: {error}')
-            return redirect(url_for('import_character'))
-
-        flash('Character imported successfully!')
-        return redirect(url_for('view_character', character_id=character_id))
-
+        job_id = queue_upload(file)
     except Exception as e:
         flash(f'Error processing file: {str(e)}')
         return redirect(url_for('import_character'))
-    finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    return redirect(url_for('import_status', job_id=job_id))
+
+
+def queue_upload(file):
+    """
+    Queue an uploaded PDF for import.
+
+    The upload is copied into a spooled temporary file that outlives the
+    request: small PDFs stay in memory, larger ones roll over to an
+    anonymous, unique temporary file. The job closes (and so deletes) it.
+
+    Args:
+        file (FileStorage): Uploaded PDF
+
+    Returns:
+        str: Import job ID
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_SIZE'], dir=UPLOAD_DIR)
+    try:
+        shutil.copyfileobj(file.stream, spool)
+    except BaseException:
+        spool.close()
+        raise
+    return import_jobs.submit(spool, file.filename)
+
+
+@app.route('/import/<job_id>')
+def import_status(job_id):
+    job = import_jobs.get(job_id)
+    if job is None:
+        flash('Import job not found or expired')
+        return redirect(url_for('import_character'))
+    if job['status'] == 'done' and job['character_id']:
+        flash('Character imported successfully!')
+        return redirect(url_for('view_character', character_id=job['character_id']))
+    return render_template('import_status.html', job=job)
+
+
+@app.route('/api/import', methods=['POST'])
+def api_import_character():
+    file = request.files.get('pdf_file')
+    if not file or not file.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Only PDF files are allowed'}), 400
+
+    job_id = queue_upload(file)
+    status_url = url_for('import_job', job_id=job_id)
+    response = jsonify({'job_id': job_id, 'status': 'queued', 'status_url': status_url})
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+
+@app.route('/api/import/<job_id>')
+def import_job(job_id):
+    job = import_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Import job not found'}), 404
+    if job['status'] == 'done' and job['character_id']:
+        job['character_url'] = url_for('view_character', character_id=job['character_id'])
+    return jsonify(job)
+
+
+@app.route('/api/import/bulk', methods=['POST'])
+def bulk_import_characters():
+    # Several PDFs and/or zip archives of PDFs, uploaded as 'pdf_files'
+    files = [file for file in request.files.getlist('pdf_files') if file and file.filename]
+    if not files:
+        return jsonify({'error': 'No files uploaded'}), 400
+
+    # Read straight from the request; workers receive the PDF contents, so
+    # nothing is written to disk
+    pdfs = []
+    for file in files:
+        filename = file.filename.lower()
+        if filename.endswith('.pdf'):
+            pdfs.append((file.filename, file.read()))
+        elif filename.endswith('.zip'):
+            try:
+                pdfs.extend(read_zip(file.stream, file.filename))
+            except zipfile.BadZipFile as e:
+                return jsonify({'error': f'Invalid zip file: {str(e)}'}), 400
+        else:
+            return jsonify({'error': f'Only PDF and zip files are allowed: {file.filename}'}), 400
+
+    # The whole batch is one job, which runs the worker process pool off the request thread
+    job_id = import_jobs.submit_bulk(pdfs, get_storage_spec(), cache_spec=get_import_cache_spec())
+    status_url = url_for('import_job', job_id=job_id)
+    response = jsonify({'job_id': job_id, 'status': 'queued', 'status_url': status_url})
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
 
 
 @app.route('/character/new', methods=['GET', 'POST'])
@@ -214,11 +387,24 @@ def new_character():
 
 @app.route('/character/<character_id>')
 def view_character(character_id):
+    meta = storage.character_meta(character_id)
+    if not meta:
+        flash('Character not found!')
+        return redirect(url_for('index'))
+
+    etag = f"html-{get_render_version()}-{meta['version']}"
+    # Pending flash messages are part of the page, so it must be rendered
+    if '_flashes' not in session:
+        not_modified = not_modified_response(etag, meta['last_modified'])
+        if not_modified:
+            return not_modified
+
     character = load_character(character_id)
     if not character:
         flash('Character not found!')
         return redirect(url_for('index'))
-    return render_template('character.html', character=character)
+    response = app.make_response(render_template('character.html', character=character))
+    return add_validators(response, f"html-{get_render_version()}-{character.get('version', 0)}", meta['last_modified'])
 
 
 @app.route('/character/<character_id>/edit', methods=['GET', 'POST'])
@@ -236,6 +422,12 @@ def edit_character(character_id):
                                spell_lists=spell_lists,
                                proficient_skills=proficient_skills)
 
+    # Only save on top of the version the form was rendered from
+    try:
+        expected_version = int(request.form.get('version', character.get('version', 0)))
+    except ValueError:
+        return 'Invalid version field', 400
+    previous_class_level = (character['class'], character['level'])
     character.update({
         'name': request.form.get('name', character['name']),
         'race': request.form.get('race', character['race']),
@@ -258,36 +450,164 @@ def edit_character(character_id):
     })
 
     character = process_spellcasting_data(character, request.form)
-    save_character(character)
+    # Slot totals follow the class table when the class or level changes
+    if 'spellcasting' in character and (character['class'], character['level']) != previous_class_level:
+        character = update_spell_slot_totals(character)
+    try:
+        storage.save(character, expected_version=expected_version)
+    except VersionConflict:
+        flash('This character was changed by someone else while you were editing it. Please review and try again.')
+        return redirect(url_for('edit_character', character_id=character_id))
     flash('Character updated successfully!')
     return redirect(url_for('view_character', character_id=character_id))
 
 
 @app.route('/character/<character_id>/delete', methods=['POST'])
 def delete_character(character_id):
-    try:
-        os.remove(get_character_path(character_id))
+    if storage.delete(character_id):
         flash('Character deleted successfully!')
-    except FileNotFoundError:
+    else:
         flash('Character not found!')
     return redirect(url_for('index'))
 
 
+LIST_QUERY_ARGS = ('limit', 'cursor', 'sort', 'class', 'race', 'min_level', 'max_level', 'spellcaster')
+
+
+def parse_list_query(args):
+    """
+    Parse the pagination, filter and sort arguments of /api/characters.
+
+    Args:
+        args (MultiDict): Request query arguments
+
+    Returns:
+        tuple: (filters, sort, limit, cursor)
+
+    Raises:
+        ValueError: If an argument is invalid
+    """
+    filters = {
+        'class': args.get('class'),
+        'race': args.get('race'),
+        'min_level': parse_int_arg(args, 'min_level'),
+        'max_level': parse_int_arg(args, 'max_level'),
+        'spellcaster': None
+    }
+    spellcaster = args.get('spellcaster', '').lower()
+    if spellcaster in ('yes', 'true', '1'):
+        filters['spellcaster'] = True
+    elif spellcaster in ('no', 'false', '0'):
+        filters['spellcaster'] = False
+    elif spellcaster:
+        raise ValueError("spellcaster must be yes or no")
+
+    limit = parse_int_arg(args, 'limit', DEFAULT_PAGE_SIZE)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    return filters, args.get('sort', 'id'), limit, args.get('cursor')
+
+
+def parse_int_arg(args, name, default=None):
+    if not args.get(name):
+        return default
+    try:
+        return int(args[name])
+    except ValueError:
+        # The message of int() would echo the raw argument back
+        raise ValueError(f"{name} must be an integer") from None
+
+
 @app.route('/api/characters')
 def api_characters():
-    return jsonify(load_character())
+    meta = storage.collection_meta()
+    # The same roster serializes differently per query string
+    etag = hashlib.sha1(f"{meta['tag']}?{request.query_string.decode()}".encode()).hexdigest()
+    not_modified = not_modified_response(etag, meta['last_modified'])
+    if not_modified:
+        return not_modified
+
+    response = app.make_response(list_characters())
+    if response.status_code == 200:
+        add_validators(response, etag, meta['last_modified'])
+    return response
+
+
+def list_characters():
+    fields = request.args.get('fields')
+    if not any(arg in request.args for arg in LIST_QUERY_ARGS):
+        # Unpaginated listing, kept for existing clients
+        if fields == 'summary':
+            return jsonify(storage.summaries())
+        return jsonify(load_character())
+
+    try:
+        summaries, next_cursor = storage.query_summaries(*parse_list_query(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if fields == 'full':
+        characters = [character for character in map(storage.get, (s['id'] for s in summaries)) if character]
+    else:
+        characters = summaries
+    return jsonify({'characters': characters, 'next_cursor': next_cursor})
+
+
+def stream_json_array(characters):
+    yield '['
+    for index, character in enumerate(characters):
+        yield (',\n' if index else '\n') + json.dumps(character)
+    yield '\n]\n'
+
+
+def stream_ndjson(characters):
+    for character in characters:
+        yield json.dumps(character) + '\n'
+
+
+EXPORT_FORMATS = {
+    'json': (stream_json_array, 'application/json'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson')
+}
+
+
+@app.route('/api/characters/export')
+def export_characters():
+    export_format = request.args.get('format', 'json')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown export format: {export_format}'}), 400
+
+    stream, mimetype = EXPORT_FORMATS[export_format]
+    response = Response(stream_with_context(stream(storage.iter_characters())), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=characters.{export_format}'
+    return response
 
 
 @app.route('/api/character/<character_id>')
 def api_character(character_id):
+    meta = storage.character_meta(character_id)
+    if not meta:
+        return jsonify({'error': 'Character not found'}), 404
+
+    # The version ETag doubles as the If-Match value for updates
+    not_modified = not_modified_response(str(meta['version']), meta['last_modified'])
+    if not_modified:
+        return not_modified
+
     character = load_character(character_id)
     if not character:
         return jsonify({'error': 'Character not found'}), 404
-    return jsonify(character)
+    return add_validators(jsonify(character), str(character.get('version', 0)), meta['last_modified'])
 
 
 @app.route('/api/character/<character_id>/spellslots', methods=['POST'])
 def update_spell_slots(character_id):
+    try:
+        expected_version = get_expected_version()
+    except ValueError:
+        return jsonify({'error': 'Invalid If-Match header'}), 400
+
     character = load_character(character_id)
     if not character:
         return jsonify({'error': 'Character not found'}), 404
@@ -310,9 +630,114 @@ def update_spell_slots(character_id):
     if not 0 <= used <= total_slots:
         return jsonify({'error': f'Invalid usage count. Must be between 0 and {total_slots}'}), 400
 
-    spell_slots[level]['used'] = used
-    save_character(character)
-    return jsonify({'success': True})
+    try:
+        version = storage.apply_mutations(
+            character_id,
+            [{'path': ['spellcasting', 'spell_slots', level, 'used'], 'value': used}],
+            expected_version=expected_version
+        )
+    except VersionConflict as conflict:
+        return version_conflict_response(conflict)
+    if version is None:
+        return jsonify({'error': 'Character not found'}), 404
+    return jsonify({'success': True, 'version': version})
+
+
+@app.route('/api/character/<character_id>/hp', methods=['POST'])
+def update_hit_points(character_id):
+    try:
+        expected_version = get_expected_version()
+    except ValueError:
+        return jsonify({'error': 'Invalid If-Match header'}), 400
+
+    character = load_character(character_id)
+    if not character:
+        return jsonify({'error': 'Character not found'}), 404
+
+    data = request.json
+    if not data or 'current' not in data:
+        return jsonify({'error': 'Invalid data'}), 400
+
+    current = int(data['current'])
+    max_hp = character['hp']['max']
+    if not 0 <= current <= max_hp:
+        return jsonify({'error': f'Invalid hit points. Must be between 0 and {max_hp}'}), 400
+
+    try:
+        version = storage.apply_mutations(
+            character_id,
+            [{'path': ['hp', 'current'], 'value': current}],
+            expected_version=expected_version
+        )
+    except VersionConflict as conflict:
+        return version_conflict_response(conflict)
+    if version is None:
+        return jsonify({'error': 'Character not found'}), 404
+    return jsonify({'success': True, 'version': version})
+
+
+@app.cli.command('copy-characters')
+@click.argument('source_backend')
+@click.argument('destination_backend')
+@click.option('--source-path', help='Data directory or database file to read from')
+@click.option('--destination-path', help='Data directory or database file to write to')
+def copy_characters_command(source_backend, destination_backend, source_path, destination_path):
+    """Copy all characters between storage backends (e.g. json sqlite)."""
+    source = create_storage(source_backend, source_path or DEFAULT_STORAGE_PATHS[source_backend])
+    destination = create_storage(destination_backend, destination_path or DEFAULT_STORAGE_PATHS[destination_backend])
+    count = copy_characters(source, destination)
+    click.echo(f'Copied {count} characters from {source_backend} to {destination_backend}')
+
+
+@app.cli.command('migrate-format')
+@click.argument('storage_format', metavar='FORMAT', type=click.Choice(sorted(CODECS)))
+@click.option('--backend', help='Storage backend to migrate (defaults to the configured one)')
+@click.option('--path', help='Data directory or database file to migrate')
+def migrate_format_command(storage_format, backend, path):
+    """Rewrite every stored character document in another format (e.g. msgpack)."""
+    backend = backend or app.config['STORAGE_BACKEND']
+    try:
+        target = create_storage(backend, path or get_storage_path(backend), storage_format)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    count = target.migrate_format()
+    click.echo(f'Rewrote {count} characters as {storage_format}')
+
+
+@app.cli.command('bulk-import')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--workers', type=int, help='Worker processes (defaults to the CPU count)')
+def bulk_import_command(paths, workers):
+    """Import PDFs, directories of PDFs and zip archives of PDFs in parallel."""
+    extract_dir = tempfile.mkdtemp()
+    try:
+        pdfs = collect_pdfs(paths, extract_dir)
+        results, summary = bulk_import(pdfs, get_storage_spec(), workers, get_import_cache_spec())
+    finally:
+        shutil.rmtree(extract_dir, ignore_errors=True)
+
+    for result in results:
+        if result['error']:
+            click.echo(f"FAILED    {result['file']}: {result['error']}")
+        else:
+            classification = result['classification']
+            classified = f", classified in {classification['seconds']}s" if classification else ''
+            click.echo(f"IMPORTED  {result['file']} -> {result['character_id']} ({result['method']}, "
+                       f"{result['seconds']}s{classified})")
+    click.echo(f"{summary['imported']} of {summary['total']} imported, {summary['failed']} failed, "
+               f"{summary['workers']} workers, {summary['seconds']}s")
+
+
+@app.cli.command('clear-import-cache')
+@click.option('--kind', type=click.Choice(['form', 'text', 'ocr-text', 'classification']),
+              help='Only clear cached results of one kind')
+def clear_import_cache_command(kind):
+    """Forget cached results of earlier PDF imports."""
+    if import_cache is None:
+        raise click.ClickException('The import cache is disabled')
+    count = import_cache.clear(kind)
+    stats = import_cache.stats()
+    click.echo(f"Removed {count} cache entries; {stats['entries']} entries ({stats['bytes']} bytes) remain")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,181 @@
+"""
+Measure the cost and accuracy of each OCR preprocessing profile.
+
+Pages of known text are rendered, clean and degraded the ways scans are, and
+recognized after each profile and after the one chosen from their quality.
+
+Needs the tesseract binary.
+
+Usage:
+    python benchmarks/ocr_preprocessing_benchmark.py [--pages N] [--seed N] [--output results.json]
+"""
+import argparse
+import difflib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+import pytesseract
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from scan_preprocessing import PROFILES, preprocess_page  # noqa: E402
+
+DEFAULT_OUTPUT_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+
+WORDS = (
+    'strength', 'dexterity', 'wisdom', 'charisma', 'armor', 'class', 'hit', 'points', 'spell', 'slots',
+    'longsword', 'shield', 'rations', 'rope', 'torch', 'cleric', 'wizard', 'ranger', 'elf', 'dwarf',
+    'perception', 'stealth', 'arcana', 'history', 'gold', 'silver', 'potion', 'healing', 'fireball'
+)
+
+# Page size of a letter page rendered at 200 DPI, like an imported scan
+PAGE_SIZE = (2200, 1700)
+
+
+def page_lines(rng):
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 7))) + f' {rng.randint(1, 20)}'
+            for _ in range(30)]
+
+
+def render_page(lines):
+    page = np.full(PAGE_SIZE, 255, np.uint8)
+    for index, line in enumerate(lines):
+        cv2.putText(page, line, (120, 160 + index * 60), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 2, cv2.LINE_AA)
+    return page
+
+
+def add_noise(page, sigma, rng):
+    noise = np.random.default_rng(rng.randint(0, 2 ** 32)).normal(0, sigma, page.shape)
+    return np.clip(page + noise, 0, 255).astype(np.uint8)
+
+
+def rotate(page, angle):
+    height, width = page.shape
+    rotation = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(page, rotation, (width, height), borderValue=255)
+
+
+# Ways a scan is degraded, as functions of a clean page and a random generator
+DEGRADATIONS = {
+    'clean': lambda page, rng: page,
+    'light noise': lambda page, rng: add_noise(page, 8, rng),
+    'heavy noise': lambda page, rng: add_noise(page, 30, rng),
+    'faded': lambda page, rng: (110 + page * 0.4).astype(np.uint8),
+    'uneven light': lambda page, rng: (page * np.linspace(0.45, 1, page.shape[1])).astype(np.uint8),
+    'skewed': lambda page, rng: rotate(page, rng.choice((-2.5, -1.5, 1.5, 2.5)))
+}
+
+
+def normalize(text):
+    return ' '.join(text.split()).lower()
+
+
+def benchmark(pages, seed):
+    """
+    OCR every degraded page with every profile and with the chosen one.
+
+    Args:
+        pages (int): Synthetic pages per degradation
+        seed (int): Random seed, so runs can be compared
+
+    Returns:
+        dict: Degradation -> profile ('auto' for the chosen one) -> list of
+            (preprocessing seconds, OCR seconds, accuracy, profile used)
+    """
+    rng = random.Random(seed)
+    samples = {degradation: {profile: [] for profile in (*PROFILES, 'auto')} for degradation in DEGRADATIONS}
+    for _ in range(pages):
+        lines = page_lines(rng)
+        truth = normalize('\n'.join(lines))
+        clean = render_page(lines)
+        for degradation, degrade in DEGRADATIONS.items():
+            page = degrade(clean, rng)
+            for profile in samples[degradation]:
+                image, report = preprocess_page(page, None if profile == 'auto' else profile)
+                start = time.perf_counter()
+                text = pytesseract.image_to_string(image, config='--oem 3 --psm 6')
+                ocr_seconds = time.perf_counter() - start
+                accuracy = difflib.SequenceMatcher(None, truth, normalize(text)).ratio()
+                samples[degradation][profile].append((report['seconds'], ocr_seconds, accuracy, report['profile']))
+    return samples
+
+
+def summarize(samples):
+    """
+    Average the samples of each degradation and profile.
+
+    Args:
+        samples (dict): Result of benchmark()
+
+    Returns:
+        dict: Degradation -> profile -> 'preprocess_ms', 'ocr_ms',
+            'accuracy' (similarity of the recognized and the true text, 0-1)
+            and 'chosen' (how often auto picked each profile)
+    """
+    summary = {}
+    for degradation, profiles in samples.items():
+        summary[degradation] = {}
+        for profile, runs in profiles.items():
+            chosen = {}
+            for run in runs:
+                chosen[run[3]] = chosen.get(run[3], 0) + 1
+            summary[degradation][profile] = {
+                'preprocess_ms': round(sum(run[0] for run in runs) / len(runs) * 1000, 1),
+                'ocr_ms': round(sum(run[1] for run in runs) / len(runs) * 1000, 1),
+                'accuracy': round(sum(run[2] for run in runs) / len(runs), 4),
+                'chosen': chosen
+            }
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(summary):
+    print(f'{"degradation":<14}{"profile":<10}{"prep ms":>10}{"ocr ms":>10}{"accuracy":>10}  chosen')
+    for degradation, profiles in summary.items():
+        for profile, stats in profiles.items():
+            chosen = ', '.join(stats['chosen']) if profile == 'auto' else ''
+            print(f'{degradation:<14}{profile:<10}{stats["preprocess_ms"]:>10.1f}{stats["ocr_ms"]:>10.1f}'
+                  f'{stats["accuracy"]:>10.3f}  {chosen}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=3, help='Synthetic pages per degradation')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/ocr_preprocessing-<commit>.json)')
+    args = parser.parse_args()
+
+    summary = summarize(benchmark(args.pages, args.seed))
+    print_summary(summary)
+
+    commit = git_commit()
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f'ocr_preprocessing-{commit or "unknown"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump({
+            'commit': commit,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'tesseract': str(pytesseract.get_tesseract_version()),
+            'pages': args.pages,
+            'seed': args.seed,
+            'profiles': summary
+        }, file, indent=2)
+    print(f'Results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Time the stages of importing fillable PDFs on synthetic sheets.
+
+Usage:
+    python benchmarks/pdf_extraction_benchmark.py [--sheets N] [--iterations N] [--seed N]
+        [--output results.json] [--compare earlier.json]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import PyPDF2
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pdf_import import (build_character_data, import_character_from_pdf, read_checkboxes,  # noqa: E402
+                        read_unknown_sheet)
+from sheet_profiles import detect_profile  # noqa: E402
+from storage import create_storage  # noqa: E402
+from synthetic_sheets import SCHEMES, generate_sheets  # noqa: E402
+
+# Stages, in the order an import runs them
+STAGES = ('parse', 'resolve', 'extract', 'import')
+
+DEFAULT_OUTPUT_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+
+
+def parse(data):
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return reader.get_form_text_fields(), read_checkboxes(reader)
+
+
+def resolve(form_fields, checkboxes):
+    profile = detect_profile(form_fields)
+    return profile.read(form_fields, checkboxes) if profile else read_unknown_sheet(form_fields)
+
+
+def time_call(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def benchmark(sheets, iterations):
+    """
+    Time every stage on every sheet.
+
+    The stages are timed separately: 'parse' reads the form with PyPDF2,
+    'resolve' finds the sheet profile and reads the raw values, 'extract'
+    builds the character, and 'import' runs import_character_from_pdf()
+    end to end, including saving to a temporary JSON storage.
+
+    Args:
+        sheets (list): Sheets from synthetic_sheets.generate_sheets()
+        iterations (int): Timed runs per sheet and stage
+
+    Returns:
+        dict: Scheme ('all' for every sheet) -> stage -> list of (seconds,
+            form text chars) samples
+    """
+    samples = {scheme: {stage: [] for stage in STAGES} for scheme in ('all', *SCHEMES)}
+    with tempfile.TemporaryDirectory() as directory:
+        storage = create_storage('json', directory)
+        for sheet in sheets:
+            for _ in range(iterations):
+                parse_time, (form_fields, checkboxes) = time_call(parse, sheet['data'])
+                resolve_time, raw_sheet = time_call(resolve, form_fields, checkboxes)
+                extract_time, _ = time_call(build_character_data, raw_sheet)
+                import_time, (_, error) = time_call(import_character_from_pdf, sheet['data'], storage)
+                if error:
+                    raise RuntimeError(f"Importing a {sheet['scheme']} sheet failed: {error}")
+                timings = zip(STAGES, (parse_time, resolve_time, extract_time, import_time))
+                for stage, seconds in timings:
+                    for scheme in ('all', sheet['scheme']):
+                        samples[scheme][stage].append((seconds, sheet['chars']))
+    return samples
+
+
+def summarize(samples):
+    """
+    Reduce timing samples to per-stage statistics.
+
+    Args:
+        samples (dict): Result of benchmark()
+
+    Returns:
+        dict: Scheme -> stage -> 'runs', 'p50_ms', 'p95_ms' and
+            'chars_per_sec' (form text characters processed per second)
+    """
+    summary = {}
+    for scheme, stages in samples.items():
+        if not stages['parse']:
+            continue
+        summary[scheme] = {}
+        for stage, runs in stages.items():
+            seconds = [run[0] for run in runs]
+            summary[scheme][stage] = {
+                'runs': len(runs),
+                'p50_ms': round(percentile(seconds, 0.5) * 1000, 4),
+                'p95_ms': round(percentile(seconds, 0.95) * 1000, 4),
+                'chars_per_sec': round(sum(run[1] for run in runs) / sum(seconds))
+            }
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(summary, baseline=None):
+    header = f'{"scheme":<10}{"stage":<9}{"p50 ms":>10}{"p95 ms":>10}{"chars/s":>12}'
+    print(header + (f'{"p50 vs base":>13}' if baseline else ''))
+    for scheme, stages in summary.items():
+        for stage, stats in stages.items():
+            line = (f'{scheme:<10}{stage:<9}{stats["p50_ms"]:>10.3f}{stats["p95_ms"]:>10.3f}'
+                    f'{stats["chars_per_sec"]:>12,}')
+            base = (baseline or {}).get(scheme, {}).get(stage)
+            if base:
+                line += f'{(stats["p50_ms"] / base["p50_ms"] - 1) * 100:>+12.1f}%'
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sheets', type=int, default=30, help='Synthetic sheets to generate')
+    parser.add_argument('--iterations', type=int, default=5, help='Timed runs per sheet')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/pdf_extraction-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare the median times with')
+    args = parser.parse_args()
+
+    sheets = generate_sheets(args.sheets, args.seed)
+    summary = summarize(benchmark(sheets, args.iterations))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['stages']
+    print_summary(summary, baseline)
+
+    commit = git_commit()
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f'pdf_extraction-{commit or "unknown"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump({
+            'commit': commit,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'pypdf2': PyPDF2.__version__,
+            'sheets': args.sheets,
+            'iterations': args.iterations,
+            'seed': args.seed,
+            'fields': [sheet['fields'] for sheet in sheets],
+            'stages': summary
+        }, file, indent=2)
+    print(f'Results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare load and save times of the character document formats.
+
+Usage:
+    python benchmarks/serialization_benchmark.py [character.json] [--iterations N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serialization import CODECS, get_codec, read_document  # noqa: E402
+from storage import write_file_atomic  # noqa: E402
+
+DEFAULT_DOCUMENT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'data', '20250307221327.json')
+
+
+def time_per_call(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def benchmark(document, iterations):
+    """
+    Time saving and loading a document in every available format.
+
+    Args:
+        document (dict): Character data
+        iterations (int): Calls per measurement
+
+    Returns:
+        list: (format, size in bytes, save µs, load µs) for each format
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'character.json')
+        for name in CODECS:
+            try:
+                codec = get_codec(name)
+            except ValueError as e:
+                print(f'Skipping {name}: {e}')
+                continue
+            save = time_per_call(lambda: write_file_atomic(path, document, codec), iterations)
+            load = time_per_call(lambda: read_document(path), iterations)
+            results.append((name, os.path.getsize(path), save, load))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('document', nargs='?', default=DEFAULT_DOCUMENT)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    document = read_document(args.document)
+    print(f'{"format":<10}{"bytes":>8}{"save µs":>10}{"load µs":>10}')
+    for name, size, save, load in benchmark(document, args.iterations):
+        print(f'{name:<10}{size:>8}{save:>10.1f}{load:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Generate synthetic fillable character sheets for the benchmarks.
+
+Usage:
+    python benchmarks/synthetic_sheets.py OUTPUT_DIR [--count N] [--seed N]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import ArrayObject, DictionaryObject, FloatObject, NameObject, TextStringObject
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rules import ABILITIES, SKILL_ABILITIES  # noqa: E402
+from sheet_profiles import PROFILE_DEFINITIONS  # noqa: E402
+
+# Field naming schemes: the two known sheet profiles, and sheets only the
+# fuzzy fallback can read
+SCHEMES = ('wotc-5e', 'skill-cb', 'unknown')
+
+CLASSES = ('Wizard', 'Cleric', 'Paladin', 'Ranger', 'Warlock', 'Fighter', 'Rogue', 'Bard', 'Druid', 'Sorcerer')
+RACES = ('Human', 'Elf', 'Dwarf', 'Halfling', 'Gnome', 'Tiefling', 'Dragonborn', 'Half-Orc')
+SPELLS = (
+    'Magic Missile', 'Shield', 'Cure Wounds', 'Bless', 'Detect Magic', 'Misty Step', 'Hold Person',
+    'Fireball', 'Counterspell', 'Fly', 'Polymorph', 'Greater Invisibility', 'Cone of Cold', 'Wall of Force'
+)
+CANTRIPS = ('Fire Bolt', 'Light', 'Mage Hand', 'Prestidigitation', 'Sacred Flame', 'Guidance', 'Minor Illusion')
+
+# Names sheets without a profile use for the same values
+UNKNOWN_FIELD_NAMES = {
+    'name': ('CharacterName', 'Character Name', 'charactername'),
+    'class_level': ('ClassLevel', 'Class & Level', 'classlevel'),
+    'race': ('Race', 'RACE', 'Race/Species'),
+    'background': ('Background', 'BACKGROUND'),
+    'strength': ('STR', 'Strength', 'StrengthScore'),
+    'dexterity': ('DEX', 'Dexterity', 'DexterityScore'),
+    'constitution': ('CON', 'Constitution', 'ConstitutionScore'),
+    'intelligence': ('INT', 'Intelligence', 'IntelligenceScore'),
+    'wisdom': ('WIS', 'Wisdom', 'WisdomScore'),
+    'charisma': ('CHA', 'Charisma', 'CharismaScore'),
+    'hp_max': ('HPMax', 'Hit Point Maximum'),
+    'hp_current': ('HPCurrent', 'CURRENT HIT POINTS'),
+    'armor_class': ('AC', 'ARMOR CLASS'),
+    'proficiency_bonus': ('ProfBonus', 'PROFICIENCY BONUS'),
+    'equipment': ('Equipment', 'EQUIPMENT')
+}
+
+
+def character_values(rng):
+    """
+    Pick the values of a random character.
+
+    Args:
+        rng (random.Random): Random number generator
+
+    Returns:
+        dict: Raw sheet values by sheet_profiles.SHEET_FIELDS key, plus
+            'skills' (proficient skill names), 'cantrips' and 'spells'
+            (name, level tuples)
+    """
+    level = rng.randint(1, 20)
+    character_class = rng.choice(CLASSES)
+    values = {
+        'name': f'Synthetic {rng.randint(1, 10 ** 6)}',
+        'race': rng.choice(RACES),
+        'class_level': f'{character_class} {level}',
+        'level': str(level),
+        'background': rng.choice(('Sage', 'Soldier', 'Acolyte', 'Criminal')),
+        'hp_max': str(rng.randint(8, 200)),
+        'armor_class': str(rng.randint(10, 20)),
+        'proficiency_bonus': f'+{2 + (level - 1) // 4}',
+        'equipment': '\n'.join(rng.sample(('Rope', 'Torch', 'Rations', 'Dagger', 'Shield', 'Spellbook'), 3)),
+        'spellcasting_class': character_class,
+        'traits': 'Curious about everything.',
+        'skills': rng.sample(list(SKILL_ABILITIES), rng.randint(2, 6)),
+        'cantrips': rng.sample(CANTRIPS, rng.randint(2, 5)),
+        'spells': [(spell, rng.randint(1, 9)) for spell in rng.sample(SPELLS, rng.randint(4, 12))]
+    }
+    values['hp_current'] = values['hp_max']
+    values.update({ability: str(rng.randint(3, 20)) for ability in ABILITIES})
+    return values
+
+
+def sheet_fields(scheme, values, field_count, rng):
+    """
+    Lay out a character as the form fields of a sheet.
+
+    Args:
+        scheme (str): One of SCHEMES
+        values (dict): Character, see character_values()
+        field_count (int): Total number of fields; unrelated filler fields
+            are added to reach it
+        rng (random.Random): Random number generator
+
+    Returns:
+        tuple: (text fields, checkbox fields) as name -> value dictionaries
+    """
+    text, checkboxes = {}, {}
+    if scheme in PROFILE_DEFINITIONS:
+        definition = PROFILE_DEFINITIONS[scheme]
+        # Unfilled markers identify the sheet like on an empty official sheet
+        text.update({marker: '' for marker in definition['markers']})
+        for key, names in definition['fields'].items():
+            if key in values and key != 'spells':
+                text[names[0]] = values[key]
+        for skill, names in definition['skills'].items():
+            proficient = skill in values['skills']
+            # Skill-CB-* sheets use text fields for their skill boxes
+            if names[0].startswith('Skill-CB-'):
+                text[names[0]] = 'Yes' if proficient else ''
+            else:
+                checkboxes[names[0]] = '/Yes' if proficient else '/Off'
+    else:
+        for key, names in UNKNOWN_FIELD_NAMES.items():
+            text[rng.choice(names)] = values[key]
+        for skill in values['skills']:
+            text[f"Skill-CB-{skill.replace(' ', '')}"] = 'Yes'
+
+    if scheme == 'wotc-5e':
+        definition = PROFILE_DEFINITIONS[scheme]
+        for name, cantrip in zip(definition['cantrips'], values['cantrips']):
+            text[name] = cantrip
+        for spell_level in sorted({spell_level for _, spell_level in values['spells']}):
+            names = definition['spell_lines'].get(spell_level, [])
+            spells = [spell for spell, level in values['spells'] if level == spell_level]
+            if len(spells) > len(names):
+                raise ValueError(f"The {scheme} profile has {len(names)} fields for level {spell_level} spells, "
+                                 f"{len(spells)} needed")
+            text.update(zip(names, spells))
+    else:
+        # A single spell list with level headings
+        lines = ['Cantrips', *values['cantrips']]
+        for spell_level in sorted({spell_level for _, spell_level in values['spells']}):
+            lines.append(f'Level {spell_level}')
+            lines.extend(spell for spell, level in values['spells'] if level == spell_level)
+        text['Spells'] = '\n'.join(lines)
+
+    for number in range(max(field_count - len(text) - len(checkboxes), 0)):
+        text[f'Text{number}'] = rng.choice(('', '', 'note', 'Lorem ipsum dolor sit amet'))
+    return text, checkboxes
+
+
+def build_pdf(text, checkboxes):
+    """
+    Write a one-page PDF with an AcroForm holding the given fields.
+
+    Args:
+        text (dict): Text field values by name
+        checkboxes (dict): Checkbox values ('/Yes' or '/Off') by name
+
+    Returns:
+        bytes: PDF contents
+    """
+    writer = PdfWriter()
+    page = writer.add_blank_page(612, 792)
+    widgets = ArrayObject()
+    fields = [(name, '/Tx', TextStringObject(value)) for name, value in text.items()]
+    fields += [(name, '/Btn', NameObject(value)) for name, value in checkboxes.items()]
+    for index, (name, field_type, value) in enumerate(fields):
+        y = 10 + (index % 60) * 12
+        widgets.append(writer._add_object(DictionaryObject({
+            NameObject('/Type'): NameObject('/Annot'),
+            NameObject('/Subtype'): NameObject('/Widget'),
+            NameObject('/FT'): NameObject(field_type),
+            NameObject('/T'): TextStringObject(name),
+            NameObject('/V'): value,
+            NameObject('/Rect'): ArrayObject([FloatObject(10), FloatObject(y), FloatObject(200), FloatObject(y + 10)])
+        })))
+    page[NameObject('/Annots')] = widgets
+    writer._root_object[NameObject('/AcroForm')] = DictionaryObject({NameObject('/Fields'): widgets})
+
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def generate_sheets(count, seed=0, min_fields=50, max_fields=500):
+    """
+    Generate synthetic fillable sheets, cycling through the naming schemes.
+
+    Args:
+        count (int): Number of sheets
+        seed (int): Random seed, so runs can be compared
+        min_fields (int): Smallest number of fields of a sheet
+        max_fields (int): Largest number of fields of a sheet
+
+    Returns:
+        list: Dictionaries with the 'scheme', number of 'fields', number of
+            form text 'chars' (names and values) and the PDF 'data'
+    """
+    rng = random.Random(seed)
+    sheets = []
+    for index in range(count):
+        scheme = SCHEMES[index % len(SCHEMES)]
+        text, checkboxes = sheet_fields(scheme, character_values(rng), rng.randint(min_fields, max_fields), rng)
+        sheets.append({
+            'scheme': scheme,
+            'fields': len(text) + len(checkboxes),
+            'chars': sum(len(name) + len(value) for name, value in text.items()),
+            'data': build_pdf(text, checkboxes)
+        })
+    return sheets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output_dir')
+    parser.add_argument('--count', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for index, sheet in enumerate(generate_sheets(args.count, args.seed)):
+        path = os.path.join(args.output_dir, f"{index:03d}-{sheet['scheme']}-{sheet['fields']}.pdf")
+        with open(path, 'wb') as file:
+            file.write(sheet['data'])
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,441 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+
+from journal import (COMPACTING_SUFFIX, JOURNAL_SUFFIX, apply_mutations, journal_paths, read_journal, replay_journal,
+                     stat_key)
+from rules import is_spellcaster
+from serialization import read_document
+
+
+def stat_or_none(path):
+    try:
+        return os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def scan_data_dir(data_dir):
+    """
+    Stat every character file and journal in the data directory in one pass.
+
+    Args:
+        data_dir (str): Data directory
+
+    Returns:
+        dict: character_id -> (document DirEntry, [compacting stat, journal stat])
+    """
+    documents = {}
+    journals = {}
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            try:
+                if name.endswith('.json'):
+                    if entry.is_file():
+                        documents[name[:-len('.json')]] = entry
+                elif name.endswith(COMPACTING_SUFFIX):
+                    journals.setdefault(name[:-len(COMPACTING_SUFFIX)], [None, None])[0] = entry.stat()
+                elif name.endswith(JOURNAL_SUFFIX):
+                    journals.setdefault(name[:-len(JOURNAL_SUFFIX)], [None, None])[1] = entry.stat()
+            except FileNotFoundError:
+                continue
+    return {
+        character_id: (entry, journals.get(character_id, [None, None]))
+        for character_id, entry in documents.items()
+    }
+
+
+def load_document(path, journal_files):
+    """
+    Read a character file (in any stored format) and replay its journals on
+    top of it.
+
+    Args:
+        path (str): Character file path
+        journal_files (list): Journal paths in the order they must be applied
+
+    Returns:
+        dict: Character data
+
+    Raises:
+        FileNotFoundError, ValueError: If the document can't be read
+    """
+    data = read_document(path)
+    for journal_path in journal_files:
+        replay_journal(data, read_journal(journal_path))
+    return data
+
+
+class CharacterCache:
+    """
+    Process-wide cache of parsed character documents.
+
+    Each file in the data directory is parsed once and kept in memory together
+    with the mtime and size it had when it was read (and those of its journal
+    files). A file is only read again when one of those stats changes or when
+    it is explicitly invalidated after a write.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _path(self, character_id):
+        return os.path.join(self.data_dir, f'{character_id}.json')
+
+    def _load(self, character_id, path, stat, journal_stats):
+        """
+        Return the cached document for a file, reading it if the stat changed.
+
+        Args:
+            character_id (str): Character ID (file name without extension)
+            path (str): Path to the character file
+            stat (os.stat_result): Current stat of the file
+            journal_stats (list): Current stats of the journal files (or None)
+
+        Returns:
+            dict: Parsed character data or None if the file can't be decoded
+        """
+        key = (stat_key(stat), [stat_key(s) for s in journal_stats])
+        with self._lock:
+            entry = self._entries.get(character_id)
+        if entry and entry[0] == key:
+            return entry[1]
+
+        try:
+            data = load_document(path, journal_paths(self.data_dir, character_id))
+        except (FileNotFoundError, ValueError):
+            self.invalidate(character_id)
+            return None
+
+        with self._lock:
+            self._entries[character_id] = (key, data)
+        return data
+
+    def peek(self, character_id):
+        """
+        Get a single character without copying it.
+
+        Args:
+            character_id (str): Character ID
+
+        Returns:
+            dict: The cached character data (read-only) or None
+        """
+        path = self._path(character_id)
+        stat = stat_or_none(path)
+        if stat is None:
+            self.invalidate(character_id)
+            return None
+
+        journal_stats = [stat_or_none(p) for p in journal_paths(self.data_dir, character_id)]
+        return self._load(character_id, path, stat, journal_stats)
+
+    def get(self, character_id):
+        """
+        Get a single character.
+
+        Args:
+            character_id (str): Character ID
+
+        Returns:
+            dict: A copy of the character data (safe to modify) or None
+        """
+        data = self.peek(character_id)
+        return copy.deepcopy(data) if data is not None else None
+
+    def all(self):
+        """
+        Get every character in the data directory.
+
+        Only files whose stat changed since the last call are parsed again.
+        The returned documents are shared with the cache and must be treated
+        as read-only.
+
+        Returns:
+            list: Character data dictionaries
+        """
+        characters = []
+        scanned = scan_data_dir(self.data_dir)
+        for character_id, (entry, journal_stats) in scanned.items():
+            try:
+                data = self._load(character_id, entry.path, entry.stat(), journal_stats)
+            except FileNotFoundError:
+                continue
+            if data is not None:
+                characters.append(data)
+
+        with self._lock:
+            for character_id in list(self._entries):
+                if character_id not in scanned:
+                    del self._entries[character_id]
+        return characters
+
+    def store(self, character_id, data):
+        """
+        Record a document that was just written so it is not parsed again.
+
+        Args:
+            character_id (str): Character ID
+            data (dict): The character data as it now reads from disk
+        """
+        key = self.current_key(character_id)
+        if key[0] is None:
+            self.invalidate(character_id)
+            return
+
+        with self._lock:
+            self._entries[character_id] = (key, copy.deepcopy(data))
+
+    def current_key(self, character_id):
+        """
+        Get the stats a cache entry for this character would be keyed by.
+
+        Args:
+            character_id (str): Character ID
+
+        Returns:
+            tuple: Document and journal stats
+        """
+        stat = stat_or_none(self._path(character_id))
+        journal_stats = [stat_or_none(p) for p in journal_paths(self.data_dir, character_id)]
+        return stat_key(stat), [stat_key(s) for s in journal_stats]
+
+    def apply_mutations(self, character_id, mutations, previous_key):
+        """
+        Apply mutations that were just appended to a character's journal.
+
+        The cached document is updated in place when it was current before the
+        append, so the document does not have to be parsed again.
+
+        Args:
+            character_id (str): Character ID
+            mutations (list): The mutations that were appended
+            previous_key (tuple): current_key() as it was before the append
+        """
+        new_key = self.current_key(character_id)
+        with self._lock:
+            entry = self._entries.get(character_id)
+            if entry is None or entry[0] != previous_key:
+                self._entries.pop(character_id, None)
+                return
+            self._entries[character_id] = (new_key, apply_mutations(entry[1], copy.deepcopy(mutations)))
+
+    def invalidate(self, character_id):
+        """
+        Drop a character from the cache so the next read goes to disk.
+
+        Args:
+            character_id (str): Character ID
+        """
+        with self._lock:
+            self._entries.pop(character_id, None)
+
+
+SUMMARY_FIELDS = ('id', 'name', 'race', 'class', 'level', 'hp', 'armor_class')
+
+
+def summarize_character(character):
+    """
+    Build the compact summary used by listing views.
+
+    Args:
+        character (dict): Full character data
+
+    Returns:
+        dict: Only the fields shown on or used to filter the character list
+    """
+    summary = {field: copy.deepcopy(character.get(field)) for field in SUMMARY_FIELDS}
+    summary['spellcaster'] = is_spellcasting_character(character)
+    return summary
+
+
+def is_spellcasting_character(character):
+    spellcasting = character.get('spellcasting') or {}
+    # Characters created by hand have no spellcasting section until it is edited
+    return bool(spellcasting.get('class') or spellcasting.get('ability') or is_spellcaster(character.get('class')))
+
+
+def affects_summary(mutations):
+    return any(mutation['path'][0] in SUMMARY_FIELDS for mutation in mutations)
+
+
+class SummaryManifest:
+    """
+    Compact, persisted index of character summaries for listing views.
+
+    The manifest is stored next to the character files and records, for each
+    character, the mtime and size of its file and journals together with its
+    summary. A listing only parses files whose stats no longer match the
+    manifest, so neither memory nor latency depends on the size of the full
+    sheets.
+    """
+
+    FILENAME = '.manifest'
+    # Bump when the summary layout changes so stale manifests (and the summary
+    # columns of SQLite databases) are rebuilt
+    FORMAT = 3
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, self.FILENAME)
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.RLock()
+        # Incremented whenever a summary changes; lets callers cache derived indexes
+        self.generation = 0
+
+    def _ensure_loaded(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self.path) as file:
+                manifest = json.load(file)
+            if manifest.get('format') != self.FORMAT:
+                raise ValueError('Outdated manifest format')
+            self._entries = manifest['entries']
+        except (FileNotFoundError, ValueError, AttributeError, KeyError):
+            self._entries = {}
+            self._dirty = True
+
+    def _persist(self):
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({'format': self.FORMAT, 'entries': self._entries}, file)
+        os.replace(temp_path, self.path)
+        self._dirty = False
+
+    def _set(self, character_id, stat, journal_stats, summary):
+        previous = self._entries.get(character_id)
+        if previous is None or previous['summary'] != summary:
+            self.generation += 1
+        self._entries[character_id] = {
+            'stat': stat_key(stat),
+            'journal': [stat_key(s) for s in journal_stats],
+            'summary': summary
+        }
+        self._dirty = True
+
+    def _stats(self, character_id):
+        stat = stat_or_none(os.path.join(self.data_dir, f'{character_id}.json'))
+        journal_stats = [stat_or_none(p) for p in journal_paths(self.data_dir, character_id)]
+        return stat, journal_stats
+
+    def summaries(self):
+        """
+        Get the summary of every character in the data directory.
+
+        Returns:
+            list: Summary dictionaries (see SUMMARY_FIELDS)
+        """
+        with self._lock:
+            self._ensure_loaded()
+            summaries = []
+            scanned = scan_data_dir(self.data_dir)
+            for character_id, (entry, journal_stats) in scanned.items():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+
+                cached = self._entries.get(character_id)
+                if (cached and cached.get('stat') == stat_key(stat)
+                        and cached.get('journal') == [stat_key(s) for s in journal_stats]):
+                    summaries.append(cached['summary'])
+                    continue
+
+                try:
+                    data = load_document(entry.path, journal_paths(self.data_dir, character_id))
+                except (FileNotFoundError, ValueError):
+                    if self._entries.pop(character_id, None) is not None:
+                        self._dirty = True
+                        self.generation += 1
+                    continue
+                summary = summarize_character(data)
+                self._set(character_id, stat, journal_stats, summary)
+                summaries.append(summary)
+
+            for character_id in list(self._entries):
+                if character_id not in scanned:
+                    del self._entries[character_id]
+                    self._dirty = True
+                    self.generation += 1
+
+            if self._dirty:
+                self._persist()
+            return summaries
+
+    def fingerprint(self):
+        """
+        Fingerprint the stats of every character file and journal.
+
+        Returns:
+            tuple: (hex digest that changes whenever any character changes,
+                latest modification time in nanoseconds or None)
+        """
+        with self._lock:
+            self.summaries()
+            digest = hashlib.sha1()
+            latest = None
+            for character_id in sorted(self._entries):
+                entry = self._entries[character_id]
+                digest.update(json.dumps([character_id, entry['stat'], entry['journal']]).encode())
+                for key in [entry['stat'], *entry['journal']]:
+                    if key and (latest is None or key[0] > latest):
+                        latest = key[0]
+            return digest.hexdigest(), latest
+
+    def update(self, character_data):
+        """
+        Record the summary of a character that was just written to disk.
+
+        Args:
+            character_data (dict): The character data as it now reads from disk
+        """
+        character_id = character_data['id']
+        with self._lock:
+            self._ensure_loaded()
+            stat, journal_stats = self._stats(character_id)
+            if stat is None:
+                self.remove(character_id)
+                return
+            self._set(character_id, stat, journal_stats, summarize_character(character_data))
+
+    def apply_mutations(self, character_id, mutations):
+        """
+        Update a summary after mutations were appended to the character's journal.
+
+        Args:
+            character_id (str): Character ID
+            mutations (list): The mutations that were appended
+        """
+        with self._lock:
+            self._ensure_loaded()
+            cached = self._entries.get(character_id)
+            if cached is None:
+                # Picked up from disk on the next listing
+                return
+            stat, journal_stats = self._stats(character_id)
+            summary = cached['summary']
+            if affects_summary(mutations):
+                summary = apply_mutations(copy.deepcopy(summary), [
+                    mutation for mutation in mutations if mutation['path'][0] in SUMMARY_FIELDS
+                ])
+            self._set(character_id, stat, journal_stats, summary)
+
+    def remove(self, character_id):
+        """
+        Drop a character from the manifest.
+
+        Args:
+            character_id (str): Character ID
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if self._entries.pop(character_id, None) is not None:
+                self._dirty = True
+                self.generation += 1
@@ -0,0 +1,47 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+_lock = threading.Lock()
+_last_millis = 0
+_sequence = 0
+
+
+def new_character_id():
+    """
+    Generate a unique, time-ordered character ID.
+
+    IDs start with the same %Y%m%d%H%M%S timestamp the app has always used,
+    followed by milliseconds, a per-process sequence number and random bits:
+
+        20250307221327 483 0001 9f2c41d7
+        (timestamp)    (ms)(seq)(random)
+
+    They sort by creation time (after older 14-digit IDs from the same
+    second), never repeat within a process even when many are generated in
+    the same millisecond, and the random suffix keeps threads and processes
+    from colliding.
+
+    Returns:
+        str: Character ID made of digits and lowercase hex characters
+    """
+    global _last_millis, _sequence
+
+    with _lock:
+        millis = int(time.time() * 1000)
+        if millis <= _last_millis:
+            # Same millisecond (or the clock went back): keep ordering by
+            # counting up from the last timestamp handed out
+            millis = _last_millis
+            _sequence += 1
+            if _sequence > 0xffff:
+                millis += 1
+                _sequence = 0
+        else:
+            _sequence = 0
+        _last_millis = millis
+        sequence = _sequence
+
+    timestamp = datetime.fromtimestamp(millis // 1000).strftime('%Y%m%d%H%M%S')
+    return f'{timestamp}{millis % 1000:03d}{sequence:04x}{os.urandom(4).hex()}'
@@ -0,0 +1,267 @@
+import rules
+
+
+def get_path(document, path):
+    for key in path:
+        if not isinstance(document, dict):
+            return None
+        document = document.get(key)
+    return document
+
+
+def set_path(document, path, value):
+    *parents, key = path
+    for parent in parents:
+        if not isinstance(document.get(parent), dict):
+            document[parent] = {}
+        document = document[parent]
+    document[key] = value
+
+
+def proficient_skill_names(skills):
+    """
+    Get the names of the skills a character is proficient in.
+
+    Args:
+        skills (list): Skill dictionaries, or just the proficient skill names
+            as saved by the character form
+
+    Returns:
+        list: Proficient skill names
+    """
+    return [
+        skill['name'] if isinstance(skill, dict) else skill
+        for skill in skills or ()
+        if not isinstance(skill, dict) or skill.get('proficient')
+    ]
+
+
+class DerivedStat:
+    """
+    A value stored in a character that is computed from other values.
+
+    Attributes:
+        name (str): Name other stats depend on it by
+        path (tuple): Where the value is stored in the character
+        depends (tuple): Names of the inputs and stats it is computed from
+        compute (callable): Computes the value from the character
+        section (str): Top-level key the character must have for the stat to
+            apply, if any
+    """
+
+    def __init__(self, path, depends, compute, section=None):
+        self.path = tuple(path)
+        self.name = '.'.join(self.path)
+        self.depends = tuple(depends)
+        self.compute = compute
+        self.section = section
+
+
+class DerivedStatGraph:
+    """
+    Dependency graph of the derived stats of a character.
+
+    Inputs are the values a user enters (ability scores, proficiencies, ...)
+    and stats are computed from inputs and other stats. The graph is sorted
+    once, and for every input the stats that depend on it, directly or
+    through other stats, are precomputed in evaluation order. Updating a
+    character after a change therefore only recomputes the affected stats.
+    """
+
+    def __init__(self, inputs, stats):
+        """
+        Args:
+            inputs (dict): Input name -> path of the value in a character
+            stats (list): DerivedStat objects
+
+        Raises:
+            ValueError: If a stat depends on something unknown or the stats
+                depend on each other in a cycle
+        """
+        self.inputs = {name: tuple(path) for name, path in inputs.items()}
+        stats_by_name = {stat.name: stat for stat in stats}
+        for stat in stats:
+            unknown = [name for name in stat.depends if name not in self.inputs and name not in stats_by_name]
+            if unknown:
+                raise ValueError(f"Derived stat {stat.name} depends on unknown values: {', '.join(unknown)}")
+
+        # Evaluation order: every stat after the stats it depends on
+        self.order = []
+        visiting, done = set(), set()
+
+        def visit(stat):
+            if stat.name in done:
+                return
+            if stat.name in visiting:
+                raise ValueError(f"Derived stat {stat.name} depends on itself")
+            visiting.add(stat.name)
+            for name in stat.depends:
+                if name in stats_by_name:
+                    visit(stats_by_name[name])
+            visiting.discard(stat.name)
+            done.add(stat.name)
+            self.order.append(stat)
+
+        for stat in stats:
+            visit(stat)
+
+        # Stats affected by each input, in evaluation order
+        affected = {name: set() for name in self.inputs}
+        for stat in self.order:
+            for name in stat.depends:
+                sources = [name] if name in self.inputs else [
+                    source for source, names in affected.items() if name in names
+                ]
+                for source in sources:
+                    affected[source].add(stat.name)
+        self.affected = {
+            name: tuple(stat for stat in self.order if stat.name in names) for name, names in affected.items()
+        }
+
+    def changed_inputs(self, character, previous):
+        """
+        Get the inputs whose values differ between two versions of a character.
+
+        Args:
+            character (dict): New character data
+            previous (dict): Previous character data
+
+        Returns:
+            list: Names of the changed inputs
+        """
+        return [name for name, path in self.inputs.items() if get_path(character, path) != get_path(previous, path)]
+
+    def touches_inputs(self, paths):
+        """
+        Check if changing values at the given paths can change an input.
+
+        Args:
+            paths (iterable): Paths (lists of keys) of changed values
+
+        Returns:
+            bool: True if any path is, contains or is inside an input
+        """
+        for path in paths:
+            path = tuple(path)
+            for input_path in self.inputs.values():
+                length = min(len(path), len(input_path))
+                if path[:length] == input_path[:length]:
+                    return True
+        return False
+
+    def update(self, character, previous=None):
+        """
+        Recompute the derived stats of a character in place.
+
+        Args:
+            character (dict): Character data to update
+            previous (dict): The character as last saved; only stats affected
+                by inputs that changed since are recomputed (default: all)
+
+        Returns:
+            list: Names of the recomputed stats
+        """
+        if previous is None:
+            stale = self.order
+        else:
+            names = set()
+            for name in self.changed_inputs(character, previous):
+                names.update(stat.name for stat in self.affected[name])
+            # Stats never stored before (e.g. on older characters) are computed too
+            stale = [stat for stat in self.order
+                     if stat.name in names or get_path(character, stat.path) is None]
+
+        updated = []
+        for stat in stale:
+            if stat.section and not isinstance(character.get(stat.section), dict):
+                continue
+            set_path(character, stat.path, stat.compute(character))
+            updated.append(stat.name)
+        return updated
+
+
+def modifier_of(ability):
+    def compute(character):
+        score = get_path(character, ('abilities', ability))
+        return rules.ability_modifier(score if isinstance(score, int) else 10)
+    return compute
+
+
+def compute_skills(character):
+    proficient = set(proficient_skill_names(character.get('skills')))
+    modifiers = character['ability_modifiers']
+    proficiency_bonus = character.get('proficiency_bonus') or 0
+    return [
+        {
+            'name': skill,
+            'ability': ability,
+            'proficient': skill in proficient,
+            'bonus': modifiers[ability] + (proficiency_bonus if skill in proficient else 0)
+        }
+        for skill, ability in rules.SKILL_ABILITIES.items()
+    ]
+
+
+def spellcasting_modifier(character):
+    ability = character['spellcasting'].get('ability')
+    return character['ability_modifiers'].get(ability) if ability else None
+
+
+def compute_spell_save_dc(character):
+    modifier = spellcasting_modifier(character)
+    return 0 if modifier is None else 8 + (character.get('proficiency_bonus') or 0) + modifier
+
+
+def compute_spell_attack_bonus(character):
+    modifier = spellcasting_modifier(character)
+    return 0 if modifier is None else (character.get('proficiency_bonus') or 0) + modifier
+
+
+MODIFIERS = tuple(f'ability_modifiers.{ability}' for ability in rules.ABILITIES)
+
+DERIVED_STATS = DerivedStatGraph(
+    inputs={
+        **{f'abilities.{ability}': ('abilities', ability) for ability in rules.ABILITIES},
+        'proficiency_bonus': ('proficiency_bonus',),
+        # Skills are rewritten with their bonuses, so any change to the list is an input change
+        'skill_proficiencies': ('skills',),
+        'spellcasting.ability': ('spellcasting', 'ability')
+    },
+    stats=[
+        *(DerivedStat(('ability_modifiers', ability), [f'abilities.{ability}'], modifier_of(ability))
+          for ability in rules.ABILITIES),
+        DerivedStat(('skills',), ['skill_proficiencies', 'proficiency_bonus', *MODIFIERS], compute_skills),
+        DerivedStat(('spellcasting', 'spell_save_dc'), ['spellcasting.ability', 'proficiency_bonus', *MODIFIERS],
+                    compute_spell_save_dc, section='spellcasting'),
+        DerivedStat(('spellcasting', 'spell_attack_bonus'),
+                    ['spellcasting.ability', 'proficiency_bonus', *MODIFIERS],
+                    compute_spell_attack_bonus, section='spellcasting')
+    ]
+)
+
+
+def update_derived_stats(character, previous=None):
+    """
+    Recompute the derived stats of a character before it is saved.
+
+    Args:
+        character (dict): Character data to update in place
+        previous (dict): The character as last saved, if known
+
+    Returns:
+        list: Names of the recomputed stats
+    """
+    return DERIVED_STATS.update(character, previous)
+
+
+def affects_derived_stats(mutations):
+    """
+    Check if mutations change a value derived stats are computed from.
+
+    Args:
+        mutations (list): Dictionaries with a 'path' and the new 'value'
+
+    Returns:
+        bool: True if the derived stats must be recomputed
+    """
+    return DERIVED_STATS.touches_inputs(mutation['path'] for mutation in mutations)
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# PDFs are hashed in chunks of this many bytes, so they never need to be in memory whole
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_pdf(source):
+    """
+    Get the SHA-256 of a PDF given as a path, its contents or a binary file object.
+
+    File objects are read in chunks from the start and rewound afterwards,
+    so the importers can read them again.
+
+    Args:
+        source (str, bytes or file): PDF path, contents or binary file object
+
+    Returns:
+        str: Hex digest of the PDF contents
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            return hash_pdf(file)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+class ImportCache:
+    """
+    Size-bounded cache of import results, keyed by the SHA-256 of the PDF.
+
+    Entries record what is expensive to produce from a PDF: how it should be
+    imported, the character data extracted from its form fields or text
+    layer, or the OCR text of each page of a scanned sheet. Each entry is
+    stored with the version of the extractor that produced it and is only
+    used by that same version, so bumping an extractor version is enough to
+    stop old results being served.
+
+    Entries live in a small SQLite database, so the cache is shared between
+    threads and worker processes and survives restarts. When the stored
+    values exceed max_bytes, the least recently used entries are evicted.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS import_cache (
+            digest TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            version TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_used REAL NOT NULL,
+            value BLOB NOT NULL,
+            PRIMARY KEY (digest, kind)
+        );
+        CREATE INDEX IF NOT EXISTS idx_import_cache_last_used ON import_cache (last_used);
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.executescript(self.SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def document(self, source):
+        """
+        Get the cache entries of one PDF.
+
+        Args:
+            source (str, bytes or file): PDF path, contents or binary file object
+
+        Returns:
+            DocumentCache: The entries of the PDF, keyed by its hash_pdf()
+        """
+        return DocumentCache(self, hash_pdf(source))
+
+    def get(self, digest, kind, version):
+        """
+        Get a cached value.
+
+        Args:
+            digest (str): SHA-256 of the PDF
+            kind (str): What the value is, e.g. 'form', 'text' or 'ocr-text'
+            version (str): Version of the extractor that must have produced it
+
+        Returns:
+            object: The cached value, or None
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT value FROM import_cache WHERE digest = ? AND kind = ? AND version = ?',
+                (digest, kind, version)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                'UPDATE import_cache SET last_used = ? WHERE digest = ? AND kind = ?', (time.time(), digest, kind)
+            )
+        return json.loads(row[0])
+
+    def put(self, digest, kind, version, value):
+        """
+        Store a value, evicting least recently used entries if the cache is full.
+
+        Args:
+            digest (str): SHA-256 of the PDF
+            kind (str): What the value is, e.g. 'form', 'text' or 'ocr-text'
+            version (str): Version of the extractor that produced it
+            value: JSON serializable value
+        """
+        payload = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        if len(payload) > self.max_bytes:
+            return
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO import_cache (digest, kind, version, size, last_used, value) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (digest, kind, version, len(payload), time.time(), payload)
+            )
+            connection.execute(
+                'DELETE FROM import_cache WHERE rowid IN ('
+                '    SELECT rowid FROM ('
+                '        SELECT rowid, SUM(size) OVER (ORDER BY last_used DESC, rowid DESC) AS total'
+                '        FROM import_cache'
+                '    ) WHERE total > ?'
+                ')',
+                (self.max_bytes,)
+            )
+
+    def clear(self, kind=None):
+        """
+        Remove cached entries.
+
+        Args:
+            kind (str): Only remove entries of this kind (default: all)
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._connect() as connection:
+            if kind is None:
+                cursor = connection.execute('DELETE FROM import_cache')
+            else:
+                cursor = connection.execute('DELETE FROM import_cache WHERE kind = ?', (kind,))
+        return cursor.rowcount
+
+    def stats(self):
+        """
+        Get the current size of the cache.
+
+        Returns:
+            dict: Number of 'entries' and their total size in 'bytes'
+        """
+        entries, size = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM import_cache').fetchone()
+        return {'entries': entries, 'bytes': size}
+
+
+class DocumentCache:
+    """
+    The entries of an ImportCache that belong to one PDF.
+    """
+
+    def __init__(self, cache, digest):
+        self.cache = cache
+        self.digest = digest
+
+    def get(self, kind, version):
+        return self.cache.get(self.digest, kind, version)
+
+    def put(self, kind, version, value):
+        self.cache.put(self.digest, kind, version, value)
@@ -0,0 +1,148 @@
+import copy
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from importer import bulk_import, import_pdf
+
+logger = logging.getLogger(__name__)
+
+
+class ImportJobQueue:
+    """
+    Runs PDF imports as jobs on a local pool of background threads.
+
+    Requests only queue the job and return its ID, so a scanned PDF that
+    takes many seconds to OCR never holds up a web worker. Job state is kept
+    in memory, so status must be polled from the process that accepted the
+    job (as with the Flask server).
+
+    A job is a dictionary with its 'id', 'file', 'status' (queued, running,
+    done or error), current 'stage', and once finished the 'character_id' or
+    'error', the import 'method' and the 'classification' that chose it (see
+    importer.import_pdf), plus created/started/finished times. Bulk jobs
+    have the 'results' and 'summary' of importer.bulk_import instead.
+    """
+
+    # Finished jobs are forgotten after this many seconds
+    RETENTION = 60 * 60
+
+    def __init__(self, storage, workers=2, cache=None):
+        self.storage = storage
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='import-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, source, filename):
+        """
+        Queue a PDF for import.
+
+        Args:
+            source (str, bytes or file): PDF path, contents or binary file
+                object; file objects are closed once the job has finished
+            filename (str): Name shown in the job status
+
+        Returns:
+            str: Job ID
+        """
+        return self._queue(filename, self._run, source)
+
+    def submit_bulk(self, pdfs, storage_spec, cache_spec=None):
+        """
+        Queue many PDFs for import across a pool of worker processes.
+
+        Args:
+            pdfs (list): (display name, PDF path or contents) tuples
+            storage_spec (tuple): Storage the workers import into, see
+                importer.bulk_import()
+            cache_spec (tuple): (path, max bytes) of the ImportCache to use, if any
+
+        Returns:
+            str: Job ID
+        """
+        return self._queue(f'{len(pdfs)} files', self._run_bulk, pdfs, storage_spec, cache_spec,
+                           results=None, summary=None)
+
+    def _queue(self, filename, run, *args, **fields):
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'file': filename,
+            'status': 'queued',
+            'stage': None,
+            'character_id': None,
+            'method': None,
+            'classification': None,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            **fields
+        }
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+        self._executor.submit(run, job_id, *args)
+        return job_id
+
+    def get(self, job_id):
+        """
+        Get the current state of a job.
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            dict: A copy of the job, or None if it is unknown or expired
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return copy.deepcopy(job) if job else None
+
+    def _prune(self):
+        cutoff = time.time() - self.RETENTION
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job['finished_at'] and job['finished_at'] < cutoff]:
+            del self._jobs[job_id]
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            self._jobs[job_id].update(changes)
+
+    def _run(self, job_id, source):
+        self._update(job_id, status='running', stage='starting', started_at=time.time())
+        try:
+            character_id, error, method, classification = import_pdf(
+                source, self.storage, progress=lambda stage: self._update(job_id, stage=stage), cache=self.cache
+            )
+        except Exception as e:
+            logger.exception('Import job %s failed', job_id)
+            character_id, error, method, classification = None, f"Error processing file: {str(e)}", None, None
+        finally:
+            if hasattr(source, 'close'):
+                source.close()
+
+        self._update(
+            job_id,
+            status='error' if error else 'done',
+            stage=None,
+            character_id=character_id,
+            method=method,
+            classification=classification,
+            error=error,
+            finished_at=time.time()
+        )
+
+    def _run_bulk(self, job_id, pdfs, storage_spec, cache_spec):
+        self._update(job_id, status='running', stage='importing', started_at=time.time())
+        try:
+            results, summary = bulk_import(pdfs, storage_spec, cache_spec=cache_spec)
+        except Exception as e:
+            logger.exception('Bulk import job %s failed', job_id)
+            self._update(job_id, status='error', stage=None, error=f"Error importing files: {str(e)}",
+                         finished_at=time.time())
+            return
+        self._update(job_id, status='done', stage=None, results=results, summary=summary, finished_at=time.time())
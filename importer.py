@@ -0,0 +1,245 @@
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.utils import secure_filename
+
+from import_cache import ImportCache
+from storage import create_storage
+
+# Zip members larger than this are skipped rather than extracted
+MAX_ZIP_MEMBER_SIZE = 64 * 1024 * 1024
+
+
+def import_pdf(pdf_path, storage, progress=None, cache=None):
+    """
+    Import a character from a PDF, choosing how to read it with classify_pdf():
+    from its form fields, from the text layer of a digital PDF, or with OCR
+    for scans (and whenever the PDF importers are unavailable).
+
+    Args:
+        pdf_path (str, bytes or file): Path to the PDF file, or its contents
+            or a seekable binary file object
+        storage (CharacterStorage or str): Storage backend, or a data directory
+            for the default JSON storage
+        progress (callable): Called with the name of each stage as it starts
+        cache (ImportCache): Cache of earlier results for identical PDFs
+
+    Returns:
+        tuple: (character_id, error_message, method, classification) where
+            method is 'form', 'text' or 'ocr' and classification holds the
+            chosen 'method', number of 'pages' and the 'seconds' it took to
+            decide (None if the PDF could not be classified)
+    """
+    progress = progress or (lambda stage: None)
+    document_cache = None
+    if cache is not None:
+        document_cache = cache.document(pdf_path)
+
+    inspection = classification = None
+    try:
+        from pdf_import import (EXTRACTOR_VERSION, classify_pdf, import_character_from_pdf,
+                                import_character_from_text_layer)
+    except ImportError:
+        pass
+    else:
+        progress('classifying')
+        start = time.perf_counter()
+        classification = document_cache.get('classification', EXTRACTOR_VERSION) if document_cache else None
+        if classification is not None:
+            classification.update(seconds=round(time.perf_counter() - start, 4), cached=True)
+        else:
+            try:
+                inspection = classify_pdf(pdf_path)
+            except Exception as e:
+                return None, f"Error processing PDF: {str(e)}", None, None
+            classification = {key: inspection[key] for key in ('method', 'pages', 'seconds')}
+            if document_cache:
+                document_cache.put('classification', EXTRACTOR_VERSION,
+                                   {key: classification[key] for key in ('method', 'pages')})
+
+        if classification['method'] == 'form':
+            character_id, error = import_character_from_pdf(pdf_path, storage, progress, document_cache, inspection)
+            return character_id, error, 'form', classification
+        if classification['method'] == 'text':
+            character_id, error = import_character_from_text_layer(
+                pdf_path, storage, progress, document_cache, inspection
+            )
+            return character_id, error, 'text', classification
+
+    try:
+        from ocr_support import import_character_from_scanned_pdf
+    except ImportError as e:
+        return None, f"OCR import is not available: {str(e)}", 'ocr', classification
+    character_id, error = import_character_from_scanned_pdf(pdf_path, storage, progress, document_cache)
+    return character_id, error, 'ocr', classification
+
+
+def collect_pdfs(paths, extract_dir):
+    """
+    Expand PDFs, directories and zip archives into the list of PDFs to import.
+
+    Args:
+        paths (list): PDF files, directories (searched for *.pdf) and .zip files
+        extract_dir (str): Directory zip members are extracted to
+
+    Returns:
+        list: (display name, PDF path) tuples
+    """
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith('.pdf'):
+                    pdfs.append((name, os.path.join(path, name)))
+        elif path.lower().endswith('.zip'):
+            pdfs.extend(extract_zip(path, extract_dir))
+        else:
+            pdfs.append((os.path.basename(path), path))
+    return pdfs
+
+
+def zip_pdf_members(archive):
+    """
+    Get the members of a zip archive that should be imported.
+
+    Args:
+        archive (zipfile.ZipFile): Open zip archive
+
+    Returns:
+        list: (index, ZipInfo) tuples of PDF members within the size limit
+    """
+    return [
+        (index, member) for index, member in enumerate(archive.infolist())
+        if not member.is_dir() and member.filename.lower().endswith('.pdf')
+        and member.file_size <= MAX_ZIP_MEMBER_SIZE
+    ]
+
+
+def read_zip(zip_source, archive_name):
+    """
+    Read the PDFs of a zip archive into memory.
+
+    Args:
+        zip_source (str or file): Zip archive path or binary file object
+        archive_name (str): Archive name used in the display names
+
+    Returns:
+        list: (display name, PDF contents) tuples
+    """
+    with zipfile.ZipFile(zip_source) as archive:
+        return [(f'{archive_name}/{member.filename}', archive.read(member))
+                for _, member in zip_pdf_members(archive)]
+
+
+def extract_zip(zip_path, extract_dir):
+    """
+    Extract the PDFs of a zip archive, ignoring any directory structure.
+
+    Args:
+        zip_path (str): Zip archive
+        extract_dir (str): Directory to extract to
+
+    Returns:
+        list: (display name, PDF path) tuples
+    """
+    pdfs = []
+    archive_name = os.path.basename(zip_path)
+    with zipfile.ZipFile(zip_path) as archive:
+        for index, member in zip_pdf_members(archive):
+            # Member names can't be trusted as paths; prefix with the index so
+            # equal names from different folders don't overwrite each other
+            target = os.path.join(extract_dir, f'{index}-{secure_filename(os.path.basename(member.filename))}')
+            with archive.open(member) as source, open(target, 'wb') as destination:
+                while True:
+                    chunk = source.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    destination.write(chunk)
+            pdfs.append((f'{archive_name}/{member.filename}', target))
+    return pdfs
+
+
+# Storage and import cache of the current worker process, created once by _init_worker
+_worker_storage = None
+_worker_cache = None
+
+
+def _init_worker(storage_spec, cache_spec):
+    global _worker_storage, _worker_cache
+    _worker_storage = create_storage(*storage_spec)
+    _worker_cache = ImportCache(*cache_spec) if cache_spec else None
+    try:
+        from ocr_support import set_ocr_workers
+    except ImportError:
+        return
+    # The pool already runs one file per core; pages of a scan are OCRed in turn
+    set_ocr_workers(1)
+
+
+def _import_worker(name, pdf_path):
+    start = time.perf_counter()
+    character_id, error, method, classification = import_pdf(pdf_path, _worker_storage, cache=_worker_cache)
+    return {
+        'file': name,
+        'character_id': character_id,
+        'method': method,
+        'classification': classification,
+        'error': error,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+def bulk_import(pdfs, storage_spec, workers=None, cache_spec=None):
+    """
+    Import many PDFs in parallel across a pool of worker processes.
+
+    Each worker opens its own storage from storage_spec, since storage
+    objects hold connections and locks that can't be shared between
+    processes. Both backends are safe to write from several processes.
+
+    Args:
+        pdfs (list): (display name, PDF path or contents) tuples, see
+            collect_pdfs() and read_zip()
+        storage_spec (tuple): (backend, path, storage format) as passed to
+            create_storage()
+        workers (int): Number of worker processes (defaults to the CPU count)
+        cache_spec (tuple): (path, max bytes) of the ImportCache to use, if any
+
+    Returns:
+        tuple: (list of per-file result dictionaries in input order, summary)
+    """
+    start = time.perf_counter()
+    results = []
+    if pdfs:
+        workers = min(workers or os.cpu_count() or 1, len(pdfs))
+        # Spawned rather than forked: the web app has threads (and their
+        # locks) that a forked child would inherit in an undefined state
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(storage_spec, cache_spec)) as executor:
+            futures = [executor.submit(_import_worker, name, path) for name, path in pdfs]
+            for (name, _), future in zip(pdfs, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append({
+                        'file': name,
+                        'character_id': None,
+                        'method': None,
+                        'classification': None,
+                        'error': f"Worker failed: {str(e)}",
+                        'seconds': None
+                    })
+
+    imported = sum(1 for result in results if not result['error'])
+    summary = {
+        'total': len(results),
+        'imported': imported,
+        'failed': len(results) - imported,
+        'workers': workers if pdfs else 0,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+    return results, summary
@@ -0,0 +1,124 @@
+import json
+import os
+
+JOURNAL_SUFFIX = '.journal'
+COMPACTING_SUFFIX = '.compacting'
+
+
+def journal_paths(data_dir, character_id):
+    """
+    Get the journal files of a character, in the order they must be applied.
+
+    A journal being compacted is renamed to <id>.compacting while new
+    mutations keep going to a fresh <id>.journal.
+
+    Args:
+        data_dir (str): Data directory
+        character_id (str): Character ID
+
+    Returns:
+        list: [compacting journal path, active journal path]
+    """
+    return [
+        os.path.join(data_dir, f'{character_id}{COMPACTING_SUFFIX}'),
+        os.path.join(data_dir, f'{character_id}{JOURNAL_SUFFIX}')
+    ]
+
+
+def stat_key(stat):
+    # os.replace() gives a file a new inode, so a same-size rewrite is noticed
+    # even within the mtime granularity of the filesystem
+    return [stat.st_mtime_ns, stat.st_size, stat.st_ino] if stat else None
+
+
+def apply_mutations(document, mutations):
+    """
+    Apply 'set' mutations to a character document in place.
+
+    Args:
+        document (dict): Character data
+        mutations (iterable): Mutations as dictionaries with a 'path' (list of
+            keys) and the new 'value'
+
+    Returns:
+        dict: The updated document
+    """
+    for mutation in mutations:
+        *parents, key = mutation['path']
+        target = document
+        for parent in parents:
+            if not isinstance(target.get(parent), dict):
+                target[parent] = {}
+            target = target[parent]
+        target[key] = mutation['value']
+    return document
+
+
+def replay_journal(document, mutations):
+    """
+    Replay journaled mutations on top of the document they were appended to.
+
+    Every append ends with the 'version' it produced. Appends the document
+    already has a version at least as new as are skipped: the document was
+    saved after them, and the journal outlived the save (e.g. a crash between
+    writing the document and removing its journal).
+
+    Args:
+        document (dict): Character data, as stored
+        mutations (list): Result of read_journal()
+
+    Returns:
+        dict: The updated document
+    """
+    stored_version = document.get('version', 0)
+    append = []
+    for mutation in mutations:
+        append.append(mutation)
+        if mutation['path'] == ['version']:
+            if mutation['value'] > stored_version:
+                apply_mutations(document, append)
+            append = []
+    # Mutations journaled without a version are always applied
+    return apply_mutations(document, append)
+
+
+def read_journal(path):
+    """
+    Read the mutations recorded in a journal file.
+
+    A partially written last line (e.g. after a crash) is ignored.
+
+    Args:
+        path (str): Journal file path
+
+    Returns:
+        list: Mutations in the order they were appended
+    """
+    mutations = []
+    try:
+        with open(path) as file:
+            for line in file:
+                try:
+                    mutations.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return mutations
+
+
+def append_mutations(path, mutations):
+    """
+    Append mutations to a journal file with a single write.
+
+    Args:
+        path (str): Journal file path
+        mutations (list): Mutations to record
+
+    Returns:
+        int: Size of the journal file after the append
+    """
+    payload = ''.join(json.dumps(mutation, separators=(',', ':')) + '\n' for mutation in mutations)
+    with open(path, 'a') as file:
+        file.write(payload)
+        return file.tell()
@@ -0,0 +1,255 @@
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+
+import cv2
+import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Backend to use: 'tesserocr', 'batch' or 'pytesseract' (default: tesserocr
+# when the binding is installed, batch otherwise)
+OCR_BACKEND = os.environ.get('DND_OCR_BACKEND')
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class OcrBatch:
+    """
+    Images to recognize together. Used as a context manager: images are
+    add()ed, then run() returns their texts.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add(self, image, config):
+        """
+        Add an image to recognize.
+
+        Args:
+            image (numpy.ndarray): Grayscale or binary image
+            config (str): Tesseract options, e.g. '--oem 3 --psm 6'
+
+        Returns:
+            int: Index of its text in the result of run()
+        """
+        raise NotImplementedError
+
+    def run(self):
+        """
+        Recognize the added images.
+
+        Returns:
+            list: Text of each image, in the order they were added
+        """
+        raise NotImplementedError
+
+
+class ImmediateBatch(OcrBatch):
+    """
+    Batch that recognizes each image as soon as it is added.
+    """
+
+    def __init__(self, recognize):
+        self._recognize = recognize
+        self._texts = []
+
+    def add(self, image, config):
+        self._texts.append(self._recognize(image, config))
+        return len(self._texts) - 1
+
+    def run(self):
+        return self._texts
+
+
+class TesseractListBatch(OcrBatch):
+    """
+    Batch that recognizes all its images with one tesseract run per config.
+
+    Images are written to a temporary directory as they are added, so they
+    are not kept in memory, and tesseract is then given a list file of them:
+    it starts and loads its model once for the whole batch instead of once
+    per image.
+    """
+
+    def __init__(self, tesseract_cmd):
+        self._tesseract_cmd = tesseract_cmd
+        self._directory = None
+        self._images = []
+
+    def __enter__(self):
+        self._directory = tempfile.mkdtemp(prefix='dnd-ocr-')
+        return self
+
+    def __exit__(self, *exc_info):
+        shutil.rmtree(self._directory, ignore_errors=True)
+        return False
+
+    def add(self, image, config):
+        path = os.path.join(self._directory, f'{len(self._images)}.png')
+        if not cv2.imwrite(path, image):
+            raise RuntimeError(f"Could not write {path} for OCR")
+        self._images.append((path, config))
+        return len(self._images) - 1
+
+    def run(self):
+        texts = [None] * len(self._images)
+        configs = {}
+        for index, (_, config) in enumerate(self._images):
+            configs.setdefault(config, []).append(index)
+
+        for number, (config, indexes) in enumerate(configs.items()):
+            list_path = os.path.join(self._directory, f'images-{number}.txt')
+            with open(list_path, 'w') as file:
+                file.write(''.join(self._images[index][0] + '\n' for index in indexes))
+            # Tesseract separates the texts of the images with form feeds
+            # (versions before 5 also end the last one with one)
+            pages = self._tesseract(list_path, config).split('\f')
+            if len(pages) < len(indexes):
+                raise RuntimeError(f"Tesseract returned {len(pages)} texts for {len(indexes)} images")
+            for index, text in zip(indexes, pages):
+                texts[index] = text
+        return texts
+
+    def _tesseract(self, list_path, config):
+        command = [self._tesseract_cmd, list_path, 'stdout', *shlex.split(config)]
+        try:
+            result = subprocess.run(command, capture_output=True)
+        except FileNotFoundError:
+            raise RuntimeError(f"{self._tesseract_cmd} is not installed or it's not in your PATH") from None
+        if result.returncode != 0:
+            raise RuntimeError(f"Tesseract failed: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout.decode('utf-8', errors='replace')
+
+
+class OcrBackend:
+    """
+    Way of running tesseract. Images are recognized in batches, so backends
+    with a per-call overhead can pay it once per batch.
+
+    Attributes:
+        name (str): Name to select the backend with (see OCR_BACKEND)
+    """
+
+    name = None
+
+    def batch(self):
+        """
+        Start a batch of images to recognize.
+
+        Returns:
+            OcrBatch: The new batch
+        """
+        raise NotImplementedError
+
+
+class PytesseractBackend(OcrBackend):
+    """
+    Runs a tesseract process for every image, through pytesseract.
+    """
+
+    name = 'pytesseract'
+
+    def batch(self):
+        return ImmediateBatch(lambda image, config: pytesseract.image_to_string(image, config=config))
+
+
+class BatchTesseractBackend(OcrBackend):
+    """
+    Runs one tesseract process per batch and config, on a list of images.
+    """
+
+    name = 'batch'
+
+    def batch(self):
+        return TesseractListBatch(pytesseract.pytesseract.tesseract_cmd)
+
+
+class TesserocrBackend(OcrBackend):
+    """
+    Recognizes images in-process with the tesserocr binding. An engine is
+    initialized once per thread and config and reused for every later image.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self):
+        self._engines = threading.local()
+
+    def batch(self):
+        return ImmediateBatch(self.recognize)
+
+    def recognize(self, image, config):
+        engine = self.engine(config)
+        engine.SetImage(Image.fromarray(image))
+        return engine.GetUTF8Text()
+
+    def engine(self, config):
+        engines = self._engines.__dict__
+        if config not in engines:
+            oem, psm, variables = parse_config(config)
+            engine = tesserocr.PyTessBaseAPI(psm=psm, oem=oem)
+            for name, value in variables.items():
+                engine.SetVariable(name, value)
+            engines[config] = engine
+        return engines[config]
+
+
+BACKENDS = {backend.name: backend for backend in (TesserocrBackend, BatchTesseractBackend, PytesseractBackend)}
+
+
+def parse_config(config):
+    """
+    Split tesseract command line options into engine settings.
+
+    Args:
+        config (str): Tesseract options, e.g. '--oem 3 --psm 7 -c name=value'
+
+    Returns:
+        tuple: (OCR engine mode, page segmentation mode, variables dict)
+    """
+    oem, psm, variables = 3, 3, {}
+    options = iter(shlex.split(config))
+    for option in options:
+        if option == '--oem':
+            oem = int(next(options))
+        elif option == '--psm':
+            psm = int(next(options))
+        elif option == '-c':
+            name, _, value = next(options).partition('=')
+            variables[name] = value
+    return oem, psm, variables
+
+
+def get_ocr_backend():
+    """
+    Get the OCR backend of this process, created on first use.
+
+    Returns:
+        OcrBackend: The OCR_BACKEND backend
+
+    Raises:
+        ValueError: If OCR_BACKEND names an unknown or unavailable backend
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = OCR_BACKEND or ('tesserocr' if tesserocr else 'batch')
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown OCR backend: {name}")
+            if name == 'tesserocr' and tesserocr is None:
+                raise ValueError("The tesserocr OCR backend needs the tesserocr package")
+            _backend = BACKENDS[name]()
+        return _backend
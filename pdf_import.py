@@ -1,148 +1,312 @@
-import os
-import json
-from datetime import datetime
 import PyPDF2
+import io
+import os
 import re
+import time
+from contextlib import contextmanager
+
+import rules
+from character_ids import new_character_id
+from sheet_profiles import detect_profile
+from storage import open_storage
+from text_extraction import extract_character_data_from_text
+
+# Bump whenever a change to the extraction changes its results, so cached
+# imports (see import_cache) made by older code are not reused
+EXTRACTOR_VERSION = '3'
+
+# A PDF without form fields is read from its text layer, instead of with OCR,
+# when its pages have at least this many characters of text in total
+MIN_TEXT_LAYER_CHARS = 100
+
+
+@contextmanager
+def open_pdf(source):
+    """
+    Open a PDF given as a path, its contents or a binary file object.
+
+    File objects are rewound but left open, so the caller can read them again.
+
+    Args:
+        source (str, bytes or file): PDF path, contents or binary file object
+
+    Yields:
+        file: Seekable binary file positioned at the start of the PDF
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            yield file
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    else:
+        source.seek(0)
+        yield source
+
+
+def classify_pdf(source):
+    """
+    Decide how a PDF should be imported from one pass over its structure.
+
+    Fillable sheets are read from their form fields. Digital PDFs without
+    fields (e.g. a sheet printed to PDF) are read from their text layer, so
+    only scans, which have neither, need OCR. Anything read while deciding
+    is returned, so the chosen importer doesn't open the PDF again.
+
+    Args:
+        source (str, bytes or file): PDF path, contents or binary file object
+
+    Returns:
+        dict: 'method' ('form', 'text' or 'ocr'), number of 'pages', and the
+            'seconds' spent deciding; plus 'form_fields' and 'checkboxes'
+            for 'form', or the 'page_texts' for 'text'
+    """
+    start = time.perf_counter()
+    with open_pdf(source) as file:
+        reader = PyPDF2.PdfReader(file)
+        inspection = {'method': 'ocr', 'pages': len(reader.pages)}
+
+        # Form fields can only be listed by the AcroForm dictionary
+        if '/AcroForm' in reader.trailer['/Root']:
+            form_fields = reader.get_form_text_fields()
+            if form_fields:
+                inspection.update(method='form', form_fields=form_fields, checkboxes=read_checkboxes(reader))
+
+        if inspection['method'] == 'ocr':
+            page_texts = [page.extract_text() or '' for page in reader.pages]
+            if sum(len(text.strip()) for text in page_texts) >= MIN_TEXT_LAYER_CHARS:
+                inspection.update(method='text', page_texts=page_texts)
+
+    inspection['seconds'] = round(time.perf_counter() - start, 4)
+    return inspection
+
+
+def read_checkboxes(reader):
+    """
+    Read the state of every checkbox of a PDF form.
+
+    Args:
+        reader (PyPDF2.PdfReader): Open PDF
+
+    Returns:
+        dict: Checkbox values by field name
+    """
+    # Checkboxes are not text fields; known sheet layouts read skill proficiencies from them
+    return {
+        name: field.get('/V')
+        for name, field in (reader.get_fields() or {}).items()
+        if field.get('/FT') == '/Btn'
+    }
 
 
-def import_character_from_pdf(pdf_path, data_dir):
+def import_character_from_pdf(pdf_path, storage, progress=None, cache=None, inspection=None):
     """
     Import a D&D character from a fillable PDF form.
 
     Args:
-        pdf_path (str): Path to the PDF file
-        data_dir (str): Directory to save the character data
+        pdf_path (str, bytes or file): Path to the PDF file, or its contents
+            or a binary file object
+        storage (CharacterStorage or str): Storage backend, or a data directory
+            for the default JSON storage
+        progress (callable): Called with the name of each stage as it starts
+        cache (DocumentCache): Import cache entries of this PDF, if caching
+        inspection (dict): Result of classify_pdf() for this PDF, whose form
+            fields are used instead of reading the PDF again
 
     Returns:
         tuple: (character_id, error_message)
     """
+    progress = progress or (lambda stage: None)
     try:
-        # Open the PDF
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
+        character_data = cache.get('form', EXTRACTOR_VERSION) if cache else None
+        if character_data is None:
+            if inspection and inspection['method'] == 'form':
+                form_fields, checkboxes = inspection['form_fields'], inspection['checkboxes']
+            else:
+                # Open the PDF
+                progress('reading form fields')
+                with open_pdf(pdf_path) as file:
+                    reader = PyPDF2.PdfReader(file)
 
-            # Check if it has form fields
-            form_fields = reader.get_form_text_fields()
-            if not form_fields or len(form_fields) == 0:
-                return None, "No fillable form fields found in the PDF"
+                    # Check if it has form fields
+                    form_fields = reader.get_form_text_fields()
+                    if not form_fields or len(form_fields) == 0:
+                        return None, "No fillable form fields found in the PDF"
 
-            # Debug: Print form fields
-            # print("Form fields found:", form_fields)
+                    # Debug: Print form fields
+                    # print("Form fields found:", form_fields)
+
+                    checkboxes = read_checkboxes(reader)
 
             # Extract character data from form fields
-            character_data = extract_character_data(form_fields)
+            progress('extracting character data')
+            character_data = extract_character_data(form_fields, checkboxes)
+            if cache:
+                cache.put('form', EXTRACTOR_VERSION, character_data)
+
+        # Every import creates a new character, even from a cached result
+        character_data['id'] = new_character_id()
 
-            # Save the character data
-            character_path = os.path.join(data_dir, f"{character_data['id']}.json")
-            with open(character_path, 'w') as outfile:
-                json.dump(character_data, outfile, indent=2)
+        # Save the character data
+        progress('saving')
+        character_id = open_storage(storage).save(character_data)
 
-            return character_data['id'], None
+        return character_id, None
 
     except Exception as e:
         return None, f"Error processing PDF: {str(e)}"
 
 
-def extract_character_data(form_fields):
+def import_character_from_text_layer(pdf_path, storage, progress=None, cache=None, inspection=None):
     """
-    Extract character data from PDF form fields.
+    Import a D&D character from the text of a digital, non-fillable PDF.
+
+    The text is parsed the same way as OCR text, without rasterizing or
+    recognizing anything.
 
     Args:
-        form_fields (dict): Form fields extracted from the PDF
+        pdf_path (str, bytes or file): Path to the PDF file, or its contents
+            or a binary file object
+        storage (CharacterStorage or str): Storage backend, or a data directory
+            for the default JSON storage
+        progress (callable): Called with the name of each stage as it starts
+        cache (DocumentCache): Import cache entries of this PDF, if caching
+        inspection (dict): Result of classify_pdf() for this PDF, whose page
+            texts are used instead of reading the PDF again
 
     Returns:
-        dict: Character data
+        tuple: (character_id, error_message)
     """
-    # Generate a unique ID for the character
-    character_id = datetime.now().strftime('%Y%m%d%H%M%S')
+    progress = progress or (lambda stage: None)
+    try:
+        character_data = cache.get('text', EXTRACTOR_VERSION) if cache else None
+        if character_data is None:
+            if inspection and inspection['method'] == 'text':
+                page_texts = inspection['page_texts']
+            else:
+                progress('reading text layer')
+                with open_pdf(pdf_path) as file:
+                    page_texts = [page.extract_text() or '' for page in PyPDF2.PdfReader(file).pages]
 
-    # Character name
-    character_name = get_field_value(form_fields, ['CharacterName'])
+            progress('extracting character data')
+            character_data = extract_character_data_from_text(''.join(text + "\n" for text in page_texts))
+            if cache:
+                cache.put('text', EXTRACTOR_VERSION, character_data)
 
-    # Race
-    race = get_field_value(form_fields, ['Race'])
+        # Every import creates a new character, even from a cached result
+        character_data['id'] = new_character_id()
 
-    # Class and level - IMPROVED EXTRACTION
-    class_level = get_field_value(form_fields, ['ClassLevel'])
-    character_class = ''
-    character_level = 1  # Default level
+        progress('saving')
+        character_id = open_storage(storage).save(character_data)
 
-    # Try direct level extraction first
-    level_field = get_field_value(form_fields, ['Level', 'CharacterLevel'])
-    if level_field:
-        try:
-            level_match = re.search(r'\d+', level_field)
-            if level_match:
-                character_level = int(level_match.group())
-        except (ValueError, AttributeError):
-            # If direct extraction fails, continue with class_level parsing
-            pass
+        return character_id, None
 
-    if class_level:
-        # Try to extract class and level (e.g., "Wizard 5")
-        match = re.search(r"([a-zA-Z\s]+)\s*(\d+)", class_level)
-        if match:
-            character_class = match.group(1).strip()
-            try:
-                # Only update level if we successfully parse it
-                parsed_level = int(match.group(2))
-                character_level = parsed_level
-            except ValueError:
-                pass
-        else:
-            character_class = class_level
+    except Exception as e:
+        return None, f"Error processing PDF: {str(e)}"
 
-    # Background
-    background = get_field_value(form_fields, ['Background'])
 
-    # Ability scores
-    abilities = {
-        'strength': parse_int(get_field_value(form_fields, ['STR', 'Strength']), 10),
-        'dexterity': parse_int(get_field_value(form_fields, ['DEX', 'Dexterity']), 10),
-        'constitution': parse_int(get_field_value(form_fields, ['CON', 'Constitution']), 10),
-        'intelligence': parse_int(get_field_value(form_fields, ['INT', 'Intelligence']), 10),
-        'wisdom': parse_int(get_field_value(form_fields, ['WIS', 'Wisdom']), 10),
-        'charisma': parse_int(get_field_value(form_fields, ['CHA', 'Charisma']), 10)
-    }
+# Candidate field names tried, in order, on sheets without a profile
+FALLBACK_FIELD_NAMES = {
+    'name': ['CharacterName'],
+    'race': ['Race'],
+    'class_level': ['ClassLevel'],
+    'level': ['Level', 'CharacterLevel'],
+    'background': ['Background'],
+    'strength': ['STR', 'Strength'],
+    'dexterity': ['DEX', 'Dexterity'],
+    'constitution': ['CON', 'Constitution'],
+    'intelligence': ['INT', 'Intelligence'],
+    'wisdom': ['WIS', 'Wisdom'],
+    'charisma': ['CHA', 'Charisma'],
+    'hp_max': ['HPMax', 'Hit Point Maximum'],
+    'hp_current': ['HPCurrent', 'CURRENT HIT POINTS'],
+    'armor_class': ['AC', 'ARMOR CLASS'],
+    'proficiency_bonus': ['ProfBonus', 'PROFICIENCY BONUS'],
+    'equipment': ['Equipment', 'EQUIPMENT'],
+    'spellcasting_class': ['SpellcastingClass'],
+    'spells': ['Spells', 'SPELLS'],
+    'traits': ['PersonalityTraits', 'PERSONALITY TRAITS']
+}
+
+# Fragments of skill field names on sheets without a profile
+SKILL_FIELD_NAMES = {
+    'Acrobatics': ['Acrobatics'],
+    'Animal Handling': ['Animal', 'AnimalHandling', 'AnimalHandli'],
+    'Arcana': ['Arcana'],
+    'Athletics': ['Athletics'],
+    'Deception': ['Deception'],
+    'History': ['History'],
+    'Insight': ['Insight'],
+    'Intimidation': ['Intimidation'],
+    'Investigation': ['Investigation'],
+    'Medicine': ['Medicine'],
+    'Nature': ['Nature'],
+    'Perception': ['Perception'],
+    'Performance': ['Performance'],
+    'Persuasion': ['Persuasion'],
+    'Religion': ['Religion'],
+    'Sleight of Hand': ['SleightofHand', 'Sleight of Hand', 'SleightHand'],
+    'Stealth': ['Stealth'],
+    'Survival': ['Survival']
+}
+
+
+def extract_character_data(form_fields, checkboxes=None):
+    """
+    Extract character data from PDF form fields.
 
-    # Calculate ability modifiers
-    ability_modifiers = {
-        ability: calculate_ability_modifier(score)
-        for ability, score in abilities.items()
-    }
+    Sheets with a known layout (see sheet_profiles) are read directly from
+    their mapped fields; any other sheet falls back to fuzzy matching of
+    field names.
 
-    # HP
-    hp_max = parse_int(get_field_value(form_fields, ['HPMax', 'Hit Point Maximum']), 10)
-    hp_current = parse_int(get_field_value(form_fields, ['HPCurrent', 'CURRENT HIT POINTS']), hp_max)
+    Args:
+        form_fields (dict): Form fields extracted from the PDF
+        checkboxes (dict): Checkbox states by field name, if available
 
-    # Armor Class
-    armor_class = parse_int(get_field_value(form_fields, ['AC', 'ARMOR CLASS']), 10)
+    Returns:
+        dict: Character data
+    """
+    profile = detect_profile(form_fields)
+    if profile is not None:
+        sheet = profile.read(form_fields, checkboxes)
+    else:
+        sheet = read_unknown_sheet(form_fields)
+    return build_character_data(sheet)
 
-    # Proficiency Bonus
-    proficiency_bonus = parse_int(get_field_value(form_fields, ['ProfBonus', 'PROFICIENCY BONUS']), 2)
 
-    # Skills with proficiency
+def read_unknown_sheet(form_fields):
+    """
+    Read the raw values of a sheet without a profile by fuzzy matching.
+
+    Args:
+        form_fields (dict): Form fields extracted from the PDF
+
+    Returns:
+        dict: Same layout as sheet_profiles.SheetProfile.read()
+    """
+    # Index the field names once for all the lookups below
+    fields = FieldResolver(form_fields)
+
+    sheet = {key: get_field_value(fields, names) for key, names in FALLBACK_FIELD_NAMES.items()}
+    sheet['skill_proficiencies'] = find_skill_proficiencies(form_fields)
+    sheet['spell_slots'] = read_spell_slots(fields)
+    if sheet['spells']:
+        sheet['cantrips'], sheet['spell_list'] = [], []
+    else:
+        sheet['cantrips'], sheet['spell_list'] = find_spell_fields(form_fields)
+    return sheet
+
+
+def find_skill_proficiencies(form_fields):
+    """
+    Find checked skill proficiencies on a sheet without a profile.
+
+    Args:
+        form_fields (dict): Form fields extracted from the PDF
+
+    Returns:
+        list: Skill names
+    """
     skill_proficiencies = []
-    skill_mapping = {
-        'Acrobatics': ['Acrobatics'],
-        'Animal Handling': ['Animal', 'AnimalHandling', 'AnimalHandli'],
-        'Arcana': ['Arcana'],
-        'Athletics': ['Athletics'],
-        'Deception': ['Deception'],
-        'History': ['History'],
-        'Insight': ['Insight'],
-        'Intimidation': ['Intimidation'],
-        'Investigation': ['Investigation'],
-        'Medicine': ['Medicine'],
-        'Nature': ['Nature'],
-        'Perception': ['Perception'],
-        'Performance': ['Performance'],
-        'Persuasion': ['Persuasion'],
-        'Religion': ['Religion'],
-        'Sleight of Hand': ['SleightofHand', 'Sleight of Hand', 'SleightHand'],
-        'Stealth': ['Stealth'],
-        'Survival': ['Survival']
-    }
 
     # Check for skills based on the shown pattern
     for field in form_fields:
@@ -153,7 +317,7 @@ def extract_character_data(form_fields):
 
             # Match it to our known skills
             matched = False
-            for skill_name, field_names in skill_mapping.items():
+            for skill_name, field_names in SKILL_FIELD_NAMES.items():
                 if any(skill_key.lower() == name.lower() or
                        skill_key.lower() in name.lower() or
                        name.lower() in skill_key.lower()
@@ -169,7 +333,7 @@ def extract_character_data(form_fields):
     # If no skills found with the CB format, try other common formats
     if not skill_proficiencies:
         # Check each skill
-        for skill_name, field_names in skill_mapping.items():
+        for skill_name, field_names in SKILL_FIELD_NAMES.items():
             # Look for checkbox fields related to skills
             for field_name in field_names:
                 # Common patterns for skill checkboxes
@@ -188,34 +352,116 @@ def extract_character_data(form_fields):
                                 skill_proficiencies.append(skill_name)
                                 break
 
-    # Calculate skill bonuses based on ability modifiers and proficiency
-    # Define which ability each skill is based on
-    skill_abilities = {
-        'Acrobatics': 'dexterity',
-        'Animal Handling': 'wisdom',
-        'Arcana': 'intelligence',
-        'Athletics': 'strength',
-        'Deception': 'charisma',
-        'History': 'intelligence',
-        'Insight': 'wisdom',
-        'Intimidation': 'charisma',
-        'Investigation': 'intelligence',
-        'Medicine': 'wisdom',
-        'Nature': 'intelligence',
-        'Perception': 'wisdom',
-        'Performance': 'charisma',
-        'Persuasion': 'charisma',
-        'Religion': 'intelligence',
-        'Sleight of Hand': 'dexterity',
-        'Stealth': 'dexterity',
-        'Survival': 'wisdom'
+    return skill_proficiencies
+
+
+def find_spell_fields(form_fields):
+    """
+    Find spells entered in separate fields on a sheet without a profile.
+
+    Args:
+        form_fields (dict): Form fields extracted from the PDF
+
+    Returns:
+        tuple: (list of cantrip names, list of spell dictionaries)
+    """
+    cantrips = []
+    spells = []
+
+    # Common patterns for spell fields
+    cantrip_patterns = ['Cantrip', 'Cantrips', 'Level0']
+    for field in form_fields:
+        if any(pattern in field for pattern in cantrip_patterns) and form_fields[field]:
+            cantrips.append(form_fields[field])
+
+    # Spells of levels 1-9
+    for spell_level in range(1, 10):
+        level_patterns = [f'Level{spell_level}', f'L{spell_level}Spells', f'Spell{spell_level}']
+        for field in form_fields:
+            if any(pattern in field for pattern in level_patterns) and form_fields[field]:
+                spells.append({
+                    'name': form_fields[field],
+                    'level': spell_level
+                })
+
+    return cantrips, spells
+
+
+def build_character_data(sheet):
+    """
+    Build character data from the raw values read from a sheet.
+
+    Args:
+        sheet (dict): Raw sheet values (see read_unknown_sheet())
+
+    Returns:
+        dict: Character data
+    """
+    # Generate a unique ID for the character
+    character_id = new_character_id()
+
+    # Class and level - IMPROVED EXTRACTION
+    class_level = sheet['class_level']
+    character_class = ''
+    character_level = 1  # Default level
+
+    # Try direct level extraction first
+    level_field = sheet['level']
+    if level_field:
+        try:
+            level_match = re.search(r'\d+', level_field)
+            if level_match:
+                character_level = int(level_match.group())
+        except (ValueError, AttributeError):
+            # If direct extraction fails, continue with class_level parsing
+            pass
+
+    if class_level:
+        # Try to extract class and level (e.g., "Wizard 5")
+        match = re.search(r"([a-zA-Z\s]+)\s*(\d+)", class_level)
+        if match:
+            character_class = match.group(1).strip()
+            try:
+                # Only update level if we successfully parse it
+                parsed_level = int(match.group(2))
+                character_level = parsed_level
+            except ValueError:
+                pass
+        else:
+            character_class = class_level
+
+    # Multiclass characters list each class with its level
+    class_levels = rules.parse_class_levels(class_level)
+    if len(class_levels) < 2:
+        class_levels = [(character_class, character_level)]
+
+    # Ability scores
+    abilities = {
+        ability: parse_int(sheet[ability], 10)
+        for ability in ('strength', 'dexterity', 'constitution', 'intelligence', 'wisdom', 'charisma')
+    }
+
+    # Calculate ability modifiers
+    ability_modifiers = {
+        ability: rules.ability_modifier(score)
+        for ability, score in abilities.items()
     }
 
+    # HP
+    hp_max = parse_int(sheet['hp_max'], 10)
+    hp_current = parse_int(sheet['hp_current'], hp_max)
+
+    # Armor Class
+    armor_class = parse_int(sheet['armor_class'], 10)
+
+    # Proficiency Bonus
+    proficiency_bonus = parse_int(sheet['proficiency_bonus'], 2)
+
     # Create skill objects with name, proficiency, and bonus
     skills = []
-    for skill_name, ability in skill_abilities.items():
+    for skill_name, ability in rules.SKILL_ABILITIES.items():
         # Check if the character is proficient in this skill
-        is_proficient = skill_name in skill_proficiencies
+        is_proficient = skill_name in sheet['skill_proficiencies']
 
         # Calculate the bonus
         bonus = ability_modifiers[ability]
@@ -232,17 +478,17 @@ def extract_character_data(form_fields):
 
     # Equipment
     equipment = []
-    equipment_text = get_field_value(form_fields, ['Equipment', 'EQUIPMENT'])
+    equipment_text = sheet['equipment']
     if equipment_text:
         equipment = [item.strip() for item in equipment_text.split('\n') if item.strip()]
 
     # Spellcasting information
-    spellcasting_class = get_field_value(form_fields, ['SpellcastingClass'])
-    if not spellcasting_class and is_spellcaster(character_class):
+    spellcasting_class = sheet['spellcasting_class']
+    if not spellcasting_class and rules.is_spellcaster(character_class):
         spellcasting_class = character_class
 
     # Determine spellcasting ability
-    spellcasting_ability = determine_spellcasting_ability(spellcasting_class)
+    spellcasting_ability = rules.spellcasting_ability(spellcasting_class)
 
     # Calculate spell save DC and spell attack bonus
     spell_save_dc = 0
@@ -253,15 +499,15 @@ def extract_character_data(form_fields):
         spell_save_dc = 8 + proficiency_bonus + ability_mod
         spell_attack_bonus = proficiency_bonus + ability_mod
 
-    # Extract spell slots information
-    spell_slots = extract_spell_slots(form_fields, character_level, character_class)
+    # Spell slots, with class defaults if the sheet has none
+    spell_slots = extract_spell_slots(sheet['spell_slots'], class_levels)
 
     # Spells known or prepared
     spells = []
     cantrips = []
 
     # Try extracting spells from a spell list section
-    spells_text = get_field_value(form_fields, ['Spells', 'SPELLS'])
+    spells_text = sheet['spells']
     if spells_text:
         spell_lines = [item.strip() for item in spells_text.split('\n') if item.strip()]
 
@@ -288,22 +534,9 @@ def extract_character_data(form_fields):
                     'level': current_level
                 })
     else:
-        # Try extracting individual spells from separate form fields
-        # Common patterns for spell fields
-        cantrip_patterns = ['Cantrip', 'Cantrips', 'Level0']
-        for field in form_fields:
-            if any(pattern in field for pattern in cantrip_patterns) and form_fields[field]:
-                cantrips.append(form_fields[field])
-
-        # Spells of levels 1-9
-        for spell_level in range(1, 10):
-            level_patterns = [f'Level{spell_level}', f'L{spell_level}Spells', f'Spell{spell_level}']
-            for field in form_fields:
-                if any(pattern in field for pattern in level_patterns) and form_fields[field]:
-                    spells.append({
-                        'name': form_fields[field],
-                        'level': spell_level
-                    })
+        # Spells entered in separate form fields
+        cantrips = list(sheet['cantrips'])
+        spells = list(sheet['spell_list'])
 
     # Spellcasting data structure
     spellcasting = {
@@ -316,14 +549,11 @@ def extract_character_data(form_fields):
         'spells': spells
     }
 
-    # Traits
-    traits = get_field_value(form_fields, ['PersonalityTraits', 'PERSONALITY TRAITS'])
-
     # Assemble character data
     character_data = {
         'id': character_id,
-        'name': character_name,
-        'race': race,
+        'name': sheet['name'],
+        'race': sheet['race'],
         'class': character_class,
         'level': character_level,  # Using the correct variable name
         'abilities': abilities,
@@ -337,24 +567,83 @@ def extract_character_data(form_fields):
         'skills': skills,
         'equipment': equipment,
         'spellcasting': spellcasting,
-        'background': background,
-        'traits': traits
+        'background': sheet['background'],
+        'traits': sheet['traits']
     }
 
     return character_data
 
 
-def calculate_ability_modifier(ability_score):
+class FieldResolver:
     """
-    Calculate the ability modifier based on an ability score.
+    Resolves candidate field names against the form fields of one PDF.
 
-    Args:
-        ability_score (int): The ability score (1-30)
+    Built once per PDF: fields without a value are dropped (they can never
+    match), field names are lowercased once and indexed by trigram, so a
+    lookup only checks the few fields that share the rarest trigram of the
+    name instead of scanning every field. Results are memoized per name.
 
-    Returns:
-        int: The calculated modifier
+    For each candidate name the priority is the same as it has always been:
+    exact match, then case-insensitive match, then the first field (in form
+    order) whose name contains the candidate, ignoring case.
     """
-    return (ability_score - 10) // 2
+
+    def __init__(self, form_fields):
+        self.form_fields = form_fields
+        self._exact = {}
+        self._lowercase = {}
+        self._fields = []
+        self._trigrams = {}
+        self._cache = {}
+
+        for field, value in form_fields.items():
+            if not value:
+                continue
+            lower = field.lower()
+            index = len(self._fields)
+            self._fields.append((lower, value))
+            self._exact[field] = value
+            self._lowercase.setdefault(lower, value)
+            for trigram in {lower[i:i + 3] for i in range(len(lower) - 2)}:
+                self._trigrams.setdefault(trigram, []).append(index)
+
+    def _containing(self, name):
+        # Indexes of the fields that may contain name, in form order
+        trigrams = {name[i:i + 3] for i in range(len(name) - 2)}
+        if not trigrams:
+            return range(len(self._fields))
+        return min((self._trigrams.get(trigram, []) for trigram in trigrams), key=len)
+
+    def _resolve(self, name):
+        if name in self._exact:
+            return self._exact[name]
+
+        lower = name.lower()
+        if lower in self._lowercase:
+            return self._lowercase[lower]
+
+        for index in self._containing(lower):
+            field, value = self._fields[index]
+            if lower in field:
+                return value
+        return None
+
+    def get(self, field_names):
+        """
+        Get the value of the first candidate name that resolves to a field.
+
+        Args:
+            field_names (list): List of possible field names
+
+        Returns:
+            str: Field value or empty string if not found
+        """
+        for name in field_names:
+            if name not in self._cache:
+                self._cache[name] = self._resolve(name)
+            if self._cache[name] is not None:
+                return self._cache[name]
+        return ""
 
 
 def get_field_value(form_fields, field_names):
@@ -362,28 +651,16 @@ def get_field_value(form_fields, field_names):
     Try to get a value from multiple possible field names.
 
     Args:
-        form_fields (dict): Form fields dictionary
+        form_fields (dict or FieldResolver): Form fields dictionary, or a
+            resolver built from it (preferred when looking up many fields)
         field_names (list): List of possible field names
 
     Returns:
         str: Field value or empty string if not found
     """
-    for name in field_names:
-        # Try exact match
-        if name in form_fields and form_fields[name]:
-            return form_fields[name]
-
-        # Try case-insensitive match
-        for field in form_fields:
-            if field.lower() == name.lower() and form_fields[field]:
-                return form_fields[field]
-
-        # Try partial match
-        for field in form_fields:
-            if name.lower() in field.lower() and form_fields[field]:
-                return form_fields[field]
-
-    return ""
+    if not isinstance(form_fields, FieldResolver):
+        form_fields = FieldResolver(form_fields)
+    return form_fields.get(field_names)
 
 
 def parse_int(value, default=0):
@@ -410,86 +687,17 @@ def parse_int(value, default=0):
         return default
 
 
-def is_spellcaster(character_class):
-    """
-    Determine if a class is a spellcaster.
-
-    Args:
-        character_class (str): Character class name
-
-    Returns:
-        bool: True if the class can cast spells
-    """
-    if not character_class:
-        return False
-
-    # Standard spellcasting classes
-    full_casters = ['wizard', 'sorcerer', 'bard', 'cleric', 'druid']
-    half_casters = ['paladin', 'ranger', 'artificer']
-    third_casters = ['eldritch knight', 'arcane trickster']
-
-    # Normalize the class name
-    class_lower = character_class.lower()
-
-    # Check if the class is a spellcaster
-    return (any(caster in class_lower for caster in full_casters) or
-            any(caster in class_lower for caster in half_casters) or
-            any(caster in class_lower for caster in third_casters) or
-            'warlock' in class_lower)
-
-
-def determine_spellcasting_ability(character_class):
-    """
-    Determine the spellcasting ability for a class.
-
-    Args:
-        character_class (str): Character class name
-
-    Returns:
-        str: Spellcasting ability or empty string if not a spellcaster
-    """
-    if not character_class:
-        return ""
-
-    # Normalize the class name
-    class_lower = character_class.lower()
-
-    # Intelligence-based casters
-    if any(c in class_lower for c in ['wizard', 'artificer', 'eldritch knight', 'arcane trickster']):
-        return 'intelligence'
-
-    # Wisdom-based casters
-    if any(c in class_lower for c in ['cleric', 'druid', 'ranger']):
-        return 'wisdom'
-
-    # Charisma-based casters
-    if any(c in class_lower for c in ['bard', 'sorcerer', 'paladin', 'warlock']):
-        return 'charisma'
-
-    return ""
-
-
-def extract_spell_slots(form_fields, level, character_class):
+def read_spell_slots(form_fields):
     """
-    Extract spell slot information from the form fields.
+    Read raw spell slot values from the form fields of a sheet without a profile.
 
     Args:
-        form_fields (dict): Form fields dictionary
-        level (int): Character level
-        character_class (str): Character class
+        form_fields (dict or FieldResolver): Form fields dictionary or resolver
 
     Returns:
-        dict: Spell slots data structure
+        dict: Slot level -> raw 'total' and 'used' strings ('' if not found)
     """
-    # Initialize spell slots
     spell_slots = {}
-    for slot_level in range(1, 10):
-        spell_slots[str(slot_level)] = {
-            'total': 0,
-            'used': 0
-        }
-
-    # Try to extract spell slots from form fields
     for slot_level in range(1, 10):
         # Look for fields that might contain spell slot information
         total_patterns = [
@@ -504,180 +712,47 @@ def extract_spell_slots(form_fields, level, character_class):
             f'Level{slot_level}SlotsExpended'
         ]
 
-        # Extract total slots
-        for pattern in total_patterns:
-            value = get_field_value(form_fields, [pattern])
-            if value:
-                spell_slots[str(slot_level)]['total'] = parse_int(value, 0)
-                break
-
-        # Extract used slots
-        for pattern in used_patterns:
-            value = get_field_value(form_fields, [pattern])
-            if value:
-                spell_slots[str(slot_level)]['used'] = parse_int(value, 0)
-                break
-
-    # If we couldn't find spell slots in the form, calculate them based on class and level
-    if all(spell_slots[str(i)]['total'] == 0 for i in range(1, 10)) and is_spellcaster(character_class):
-        calculate_default_spell_slots(spell_slots, level, character_class)
+        # get_field_value tries the patterns in order and returns the first value found
+        spell_slots[str(slot_level)] = {
+            'total': get_field_value(form_fields, total_patterns),
+            'used': get_field_value(form_fields, used_patterns)
+        }
 
     return spell_slots
 
 
-def calculate_default_spell_slots(spell_slots, level, character_class):
-    """
-    Calculate default spell slots based on class and level.
-
-    Args:
-        spell_slots (dict): Spell slots dictionary to update
-        level (int): Character level
-        character_class (str): Character class
-    """
-    class_lower = character_class.lower()
-
-    # Full casters: wizard, sorcerer, bard, cleric, druid
-    if any(c in class_lower for c in ['wizard', 'sorcerer', 'bard', 'cleric', 'druid']):
-        calculate_full_caster_slots(spell_slots, level)
-
-    # Half casters: paladin, ranger, artificer
-    elif any(c in class_lower for c in ['paladin', 'ranger', 'artificer']):
-        calculate_half_caster_slots(spell_slots, level)
-
-    # Warlock (special case)
-    elif 'warlock' in class_lower:
-        calculate_warlock_slots(spell_slots, level)
-
-    # Third casters: eldritch knight, arcane trickster
-    elif any(c in class_lower for c in ['eldritch knight', 'arcane trickster']):
-        calculate_third_caster_slots(spell_slots, level)
-
-
-def calculate_full_caster_slots(spell_slots, level):
-    """
-    Calculate spell slots for full casters.
-
-    Args:
-        spell_slots (dict): Spell slots dictionary to update
-        level (int): Character level
-    """
-    # Spell slots by level for full casters
-    full_caster_slots = {
-        1: {'1': 2},
-        2: {'1': 3},
-        3: {'1': 4, '2': 2},
-        4: {'1': 4, '2': 3},
-        5: {'1': 4, '2': 3, '3': 2},
-        6: {'1': 4, '2': 3, '3': 3},
-        7: {'1': 4, '2': 3, '3': 3, '4': 1},
-        8: {'1': 4, '2': 3, '3': 3, '4': 2},
-        9: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 1},
-        10: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 2},
-        11: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 2, '6': 1},
-        12: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 2, '6': 1},
-        13: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 2, '6': 1, '7': 1},
-        14: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 2, '6': 1, '7': 1},
-        15: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 2, '6': 1, '7': 1, '8': 1},
-        16: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 2, '6': 1, '7': 1, '8': 1},
-        17: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 2, '6': 1, '7': 1, '8': 1, '9': 1},
-        18: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 3, '6': 1, '7': 1, '8': 1, '9': 1},
-        19: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 3, '6': 2, '7': 1, '8': 1, '9': 1},
-        20: {'1': 4, '2': 3, '3': 3, '4': 3, '5': 3, '6': 2, '7': 2, '8': 1, '9': 1}
-    }
-
-    # Get the slots for the character level (cap at 20)
-    level_slots = full_caster_slots.get(min(level, 20), {})
-
-    # Update the spell slots dictionary
-    for slot_level, count in level_slots.items():
-        spell_slots[slot_level]['total'] = count
-
-
-def calculate_half_caster_slots(spell_slots, level):
-    """
-    Calculate spell slots for half casters (paladin, ranger).
-
-    Args:
-        spell_slots (dict): Spell slots dictionary to update
-        level (int): Character level
-    """
-    # Treat as half the full caster level (rounded up, but starting from level 2)
-    caster_level = (level - 1) // 2 + 1 if level > 1 else 0
-
-    # Use full caster table with the modified level
-    if caster_level > 0:
-        calculate_full_caster_slots(spell_slots, caster_level)
-
-    # Half casters only get up to 5th level spells
-    for slot_level in range(6, 10):
-        spell_slots[str(slot_level)]['total'] = 0
-
-
-def calculate_warlock_slots(spell_slots, level):
+def extract_spell_slots(raw_slots, class_levels):
     """
-    Calculate spell slots for warlocks.
+    Build the spell slots data structure from raw sheet values.
 
     Args:
-        spell_slots (dict): Spell slots dictionary to update
-        level (int): Character level
-    """
-    # Warlock spell slots by level
-    warlock_slots = {
-        1: {'1': 1},
-        2: {'1': 2},
-        3: {'2': 2},
-        4: {'2': 2},
-        5: {'3': 2},
-        6: {'3': 2},
-        7: {'4': 2},
-        8: {'4': 2},
-        9: {'5': 2},
-        10: {'5': 2},
-        11: {'5': 3},
-        12: {'5': 3},
-        13: {'5': 3},
-        14: {'5': 3},
-        15: {'5': 3},
-        16: {'5': 3},
-        17: {'5': 4},
-        18: {'5': 4},
-        19: {'5': 4},
-        20: {'5': 4}
-    }
-
-    # Get the slots for the character level
-    level_slots = warlock_slots.get(min(level, 20), {})
+        raw_slots (dict): Slot level -> raw 'total' and either 'used' or
+            'remaining' strings
+        class_levels (list): (class name, level) tuples of the character, see
+            rules.parse_class_levels()
 
-    # Update the spell slots dictionary
-    for slot_level, count in level_slots.items():
-        spell_slots[slot_level]['total'] = count
-
-    # Get mystic arcanum for higher level spells
-    if level >= 11:
-        spell_slots['6']['total'] = 1
-    if level >= 13:
-        spell_slots['7']['total'] = 1
-    if level >= 15:
-        spell_slots['8']['total'] = 1
-    if level >= 17:
-        spell_slots['9']['total'] = 1
-
-
-def calculate_third_caster_slots(spell_slots, level):
+    Returns:
+        dict: Spell slots data structure
     """
-    Calculate spell slots for third casters (Eldritch Knight, Arcane Trickster).
+    # Initialize spell slots
+    spell_slots = {}
+    for slot_level in range(1, 10):
+        spell_slots[str(slot_level)] = {
+            'total': 0,
+            'used': 0
+        }
 
-    Args:
-        spell_slots (dict): Spell slots dictionary to update
-        level (int): Character level
-    """
-    # Calculate equivalent full caster level (one-third)
-    caster_level = level // 3
+    for slot_level, raw in raw_slots.items():
+        total = parse_int(raw.get('total'), 0)
+        if raw.get('remaining'):
+            used = max(total - parse_int(raw['remaining'], total), 0)
+        else:
+            used = parse_int(raw.get('used'), 0)
+        spell_slots[slot_level] = {'total': total, 'used': used}
 
-    # Use full caster table with the modified level
-    if caster_level > 0:
-        calculate_full_caster_slots(spell_slots, caster_level)
+    # If we couldn't find spell slots in the form, calculate them based on class and level
+    if all(spell_slots[str(i)]['total'] == 0 for i in range(1, 10)):
+        for slot_level, total in enumerate(rules.spell_slot_totals(class_levels), 1):
+            spell_slots[str(slot_level)]['total'] = total
 
-    # Third casters only get up to 4th level spells
-    for slot_level in range(5, 10):
-        spell_slots[str(slot_level)]['total'] = 0
\ No newline at end of file
+    return spell_slots
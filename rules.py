@@ -0,0 +1,248 @@
+import re
+from types import MappingProxyType
+
+MAX_LEVEL = 20
+
+ABILITIES = ('strength', 'dexterity', 'constitution', 'intelligence', 'wisdom', 'charisma')
+
+# Ability each skill is based on
+SKILL_ABILITIES = MappingProxyType({
+    'Acrobatics': 'dexterity',
+    'Animal Handling': 'wisdom',
+    'Arcana': 'intelligence',
+    'Athletics': 'strength',
+    'Deception': 'charisma',
+    'History': 'intelligence',
+    'Insight': 'wisdom',
+    'Intimidation': 'charisma',
+    'Investigation': 'intelligence',
+    'Medicine': 'wisdom',
+    'Nature': 'intelligence',
+    'Perception': 'wisdom',
+    'Performance': 'charisma',
+    'Persuasion': 'charisma',
+    'Religion': 'intelligence',
+    'Sleight of Hand': 'dexterity',
+    'Stealth': 'dexterity',
+    'Survival': 'wisdom'
+})
+
+# Spellcasting classes and subclasses by lower-case name: (progression, spellcasting ability)
+CASTING_CLASSES = MappingProxyType({
+    'wizard': ('full', 'intelligence'),
+    'sorcerer': ('full', 'charisma'),
+    'bard': ('full', 'charisma'),
+    'cleric': ('full', 'wisdom'),
+    'druid': ('full', 'wisdom'),
+    'paladin': ('half', 'charisma'),
+    'ranger': ('half', 'wisdom'),
+    'artificer': ('artificer', 'intelligence'),
+    'warlock': ('pact', 'charisma'),
+    'eldritch knight': ('third', 'intelligence'),
+    'arcane trickster': ('third', 'intelligence')
+})
+
+# Spell slots of spell levels 1-9 by caster level (the multiclass spellcaster table)
+SPELL_SLOTS_BY_CASTER_LEVEL = (
+    (0, 0, 0, 0, 0, 0, 0, 0, 0),
+    (2, 0, 0, 0, 0, 0, 0, 0, 0),
+    (3, 0, 0, 0, 0, 0, 0, 0, 0),
+    (4, 2, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 2, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 1, 0, 0, 0, 0, 0),
+    (4, 3, 3, 2, 0, 0, 0, 0, 0),
+    (4, 3, 3, 3, 1, 0, 0, 0, 0),
+    (4, 3, 3, 3, 2, 0, 0, 0, 0),
+    (4, 3, 3, 3, 2, 1, 0, 0, 0),
+    (4, 3, 3, 3, 2, 1, 0, 0, 0),
+    (4, 3, 3, 3, 2, 1, 1, 0, 0),
+    (4, 3, 3, 3, 2, 1, 1, 0, 0),
+    (4, 3, 3, 3, 2, 1, 1, 1, 0),
+    (4, 3, 3, 3, 2, 1, 1, 1, 0),
+    (4, 3, 3, 3, 2, 1, 1, 1, 1),
+    (4, 3, 3, 3, 3, 1, 1, 1, 1),
+    (4, 3, 3, 3, 3, 2, 1, 1, 1),
+    (4, 3, 3, 3, 3, 2, 2, 1, 1)
+)
+
+# Warlock pact magic by warlock level: (slot level, number of slots)
+PACT_SLOTS = (
+    (0, 0), (1, 1), (1, 2), (2, 2), (2, 2), (3, 2), (3, 2), (4, 2), (4, 2), (5, 2), (5, 2),
+    (5, 3), (5, 3), (5, 3), (5, 3), (5, 3), (5, 3), (5, 4), (5, 4), (5, 4), (5, 4)
+)
+
+# Warlock levels that grant a mystic arcanum, tracked as one slot of that spell level
+MYSTIC_ARCANUM_LEVELS = MappingProxyType({6: 11, 7: 13, 8: 15, 9: 17})
+
+# Caster level of a single-class character by progression and class level
+SINGLE_CLASS_CASTER_LEVEL = MappingProxyType({
+    'full': lambda level: level,
+    'half': lambda level: (level + 1) // 2 if level >= 2 else 0,
+    'artificer': lambda level: (level + 1) // 2,
+    'third': lambda level: (level + 2) // 3 if level >= 3 else 0
+})
+
+# What each class level adds to a multiclass character's caster level
+MULTICLASS_CASTER_LEVEL = MappingProxyType({
+    'full': lambda level: level,
+    'half': lambda level: level // 2,
+    'artificer': lambda level: (level + 1) // 2,
+    'third': lambda level: level // 3
+})
+
+
+def _pact_row(level):
+    slots = [0] * 9
+    slot_level, count = PACT_SLOTS[level]
+    if count:
+        slots[slot_level - 1] = count
+    for arcanum_level, required_level in MYSTIC_ARCANUM_LEVELS.items():
+        if level >= required_level:
+            slots[arcanum_level - 1] = 1
+    return tuple(slots)
+
+
+# Spell slots of a single-class character by progression, indexed by class level
+CLASS_SPELL_SLOTS = MappingProxyType({
+    **{
+        progression: tuple(SPELL_SLOTS_BY_CASTER_LEVEL[caster_level(level)] for level in range(MAX_LEVEL + 1))
+        for progression, caster_level in SINGLE_CLASS_CASTER_LEVEL.items()
+    },
+    'pact': tuple(_pact_row(level) for level in range(MAX_LEVEL + 1))
+})
+
+NO_SPELL_SLOTS = SPELL_SLOTS_BY_CASTER_LEVEL[0]
+
+
+def find_casting_class(character_class):
+    """
+    Find the spellcasting class (or subclass) named in a class description.
+
+    Args:
+        character_class (str): Class as written on a sheet, e.g. "Wizard" or
+            "Fighter (Eldritch Knight)"
+
+    Returns:
+        str: Key of CASTING_CLASSES, or None if no spellcasting class is named
+    """
+    words = re.findall(r'[a-z]+', (character_class or '').lower())
+    # Subclasses are two words and take precedence over their base class
+    for first, second in zip(words, words[1:]):
+        name = f'{first} {second}'
+        if name in CASTING_CLASSES:
+            return name
+    for word in words:
+        if word in CASTING_CLASSES:
+            return word
+    return None
+
+
+def is_spellcaster(character_class):
+    """
+    Determine if a class is a spellcaster.
+
+    Args:
+        character_class (str): Character class name
+
+    Returns:
+        bool: True if the class can cast spells
+    """
+    return find_casting_class(character_class) is not None
+
+
+def spellcasting_ability(character_class):
+    """
+    Determine the spellcasting ability for a class.
+
+    Args:
+        character_class (str): Character class name
+
+    Returns:
+        str: Spellcasting ability or empty string if not a spellcaster
+    """
+    name = find_casting_class(character_class)
+    return CASTING_CLASSES[name][1] if name else ""
+
+
+def ability_modifier(ability_score):
+    """
+    Calculate the ability modifier based on an ability score.
+
+    Args:
+        ability_score (int): The ability score (1-30)
+
+    Returns:
+        int: The calculated modifier
+    """
+    return (ability_score - 10) // 2
+
+
+def parse_class_levels(class_level):
+    """
+    Split a class and level description into its classes.
+
+    Args:
+        class_level (str): e.g. "Wizard 5" or "Paladin 6 / Sorcerer 2"
+
+    Returns:
+        list: (class name, level) tuples, in the order written
+    """
+    return [
+        (name.strip(' /,&+'), int(level))
+        for name, level in re.findall(r'([A-Za-z][A-Za-z\s()]*?)\s*(\d+)', class_level or '')
+    ]
+
+
+def caster_level(class_levels):
+    """
+    Calculate the caster level of a character, ignoring pact magic.
+
+    A single spellcasting class uses its own progression; several are
+    combined as described for multiclass spellcasters.
+
+    Args:
+        class_levels (list): (class name, level) tuples
+
+    Returns:
+        int: Caster level (0-20)
+    """
+    casters = []
+    for character_class, level in class_levels:
+        name = find_casting_class(character_class)
+        if name and CASTING_CLASSES[name][0] != 'pact':
+            casters.append((CASTING_CLASSES[name][0], max(0, min(level, MAX_LEVEL))))
+    if len(casters) == 1:
+        progression, level = casters[0]
+        return SINGLE_CLASS_CASTER_LEVEL[progression](level)
+    return min(sum(MULTICLASS_CASTER_LEVEL[progression](level) for progression, level in casters), MAX_LEVEL)
+
+
+def spell_slot_totals(class_levels):
+    """
+    Look up the spell slots a character has from their classes and levels.
+
+    Pact magic slots are added to the slots of the same spell level.
+
+    Args:
+        class_levels (list): (class name, level) tuples
+
+    Returns:
+        tuple: Number of slots of spell levels 1-9
+    """
+    if len(class_levels) == 1:
+        # Single class: one table lookup
+        character_class, level = class_levels[0]
+        name = find_casting_class(character_class)
+        if not name:
+            return NO_SPELL_SLOTS
+        return CLASS_SPELL_SLOTS[CASTING_CLASSES[name][0]][max(0, min(level, MAX_LEVEL))]
+
+    slots = SPELL_SLOTS_BY_CASTER_LEVEL[caster_level(class_levels)]
+    for character_class, level in class_levels:
+        name = find_casting_class(character_class)
+        if name and CASTING_CLASSES[name][0] == 'pact':
+            pact = CLASS_SPELL_SLOTS['pact'][max(0, min(level, MAX_LEVEL))]
+            slots = tuple(total + extra for total, extra in zip(slots, pact))
+    return slots
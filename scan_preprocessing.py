@@ -0,0 +1,171 @@
+import time
+
+import cv2
+import numpy as np
+
+# Quality is measured on every SAMPLE_STEP-th row (and column, for skew), which
+# is plenty for whole-page statistics and keeps measuring in the milliseconds
+SAMPLE_STEP = 4
+
+# Noise (see measure_quality) from which pages are median blurred, and from
+# which they get the full, and by far slowest, non-local means denoise
+MEDIAN_NOISE = 3.0
+DENOISE_NOISE = 10.0
+
+# Contrast (see measure_quality) below which ink and paper are separated
+# locally rather than with a single threshold
+LOW_CONTRAST = 120
+
+# Difference in paper brightness between parts of a page from which it is
+# taken to be unevenly lit, which a single threshold doesn't cope with either
+UNEVEN_LIGHTING = 40
+
+# Pages are rotated straight when their text lines are tilted at least this
+# many degrees, up to MAX_SKEW
+MIN_SKEW = 0.5
+MAX_SKEW = 5.0
+
+
+def no_preprocessing(gray):
+    # Tesseract binarizes clean pages itself
+    return gray
+
+
+def adaptive_threshold(gray):
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+
+
+def median_blur(gray):
+    _, binary = cv2.threshold(cv2.medianBlur(gray, 3), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def nlm_denoise(gray):
+    _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+    return cv2.fastNlMeansDenoising(binary, None, 10, 7, 21)
+
+
+# Preprocessing profiles, from cheapest to most expensive
+PROFILES = {
+    'none': no_preprocessing,
+    'adaptive': adaptive_threshold,
+    'median': median_blur,
+    'denoise': nlm_denoise
+}
+
+
+def measure_quality(gray):
+    """
+    Estimate how clean a page is, with a few numpy passes over a sample of it.
+
+    Args:
+        gray (numpy.ndarray): Grayscale page
+
+    Returns:
+        dict: 'noise' (median difference between neighbouring pixels in
+            gray levels, about half the noise's standard deviation on white
+            paper), 'contrast' (gray levels between the paper, taken as the
+            median, and the ink, taken as the darkest 0.5%), 'lighting'
+            (range of the paper's brightness over a 4x4 grid of the page)
+            and 'skew' (tilt of the text lines in degrees, positive
+            when they descend to the right)
+    """
+    rows = gray[::SAMPLE_STEP]
+
+    # Neighbouring pixels differ by noise alone on the blank paper that
+    # makes up most of a page, so the median difference measures the noise
+    differences = np.abs(np.diff(rows.astype(np.int16), axis=1))
+    noise = float(np.median(differences))
+
+    histogram = np.cumsum(np.bincount(rows.ravel(), minlength=256))
+    ink = int(np.searchsorted(histogram, histogram[-1] * 0.005))
+    paper = int(np.searchsorted(histogram, histogram[-1] * 0.5))
+
+    height, width = rows.shape
+    papers = [
+        np.percentile(rows[top:top + height // 4, left:left + width // 4], 90)
+        for top in range(0, height - height // 4 + 1, height // 4)
+        for left in range(0, width - width // 4 + 1, width // 4)
+    ]
+
+    return {
+        'noise': round(noise, 2),
+        'contrast': paper - ink,
+        'lighting': int(max(papers) - min(papers)),
+        'skew': estimate_skew(rows[:, ::SAMPLE_STEP])
+    }
+
+
+def estimate_skew(sample):
+    """
+    Find the tilt of the text lines of a page from its ink pixels.
+
+    The pixels are projected onto the vertical axis along lines of several
+    slopes; the projection is sharpest along the text lines.
+
+    Args:
+        sample (numpy.ndarray): Grayscale page, or a sample with the same
+            step in both directions
+
+    Returns:
+        float: Tilt in degrees, within MAX_SKEW
+    """
+    ys, xs = np.nonzero(sample < 128)
+    if len(ys) < 100:
+        return 0.0
+
+    def sharpness(angle):
+        projected = np.round(ys - xs * np.tan(np.radians(angle))).astype(np.int64)
+        return np.bincount(projected - projected.min()).astype(np.float64).var()
+
+    # Whole degrees first, then tenths around the best
+    coarse = max(np.arange(-MAX_SKEW, MAX_SKEW + 1), key=sharpness)
+    fine = max(np.arange(coarse - 0.9, coarse + 1), key=sharpness)
+    return round(float(np.clip(fine, -MAX_SKEW, MAX_SKEW)), 1)
+
+
+def choose_profile(quality):
+    """
+    Pick the cheapest preprocessing profile that copes with a page.
+
+    Args:
+        quality (dict): Result of measure_quality()
+
+    Returns:
+        str: Key of PROFILES
+    """
+    if quality['noise'] >= DENOISE_NOISE:
+        return 'denoise'
+    if quality['noise'] >= MEDIAN_NOISE:
+        return 'median'
+    if quality['contrast'] < LOW_CONTRAST or quality['lighting'] >= UNEVEN_LIGHTING:
+        return 'adaptive'
+    return 'none'
+
+
+def deskew(gray, angle):
+    height, width = gray.shape
+    rotation = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(gray, rotation, (width, height), flags=cv2.INTER_LINEAR, borderValue=255)
+
+
+def preprocess_page(gray, profile=None):
+    """
+    Prepare a page for OCR with the profile its measured quality calls for.
+
+    Args:
+        gray (numpy.ndarray): Grayscale page
+        profile (str): Key of PROFILES to use instead of choosing one
+
+    Returns:
+        tuple: (preprocessed image, report) where report holds the quality
+            metrics, the 'profile' used and the 'seconds' measuring and
+            preprocessing took
+    """
+    start = time.perf_counter()
+    quality = measure_quality(gray)
+    if abs(quality['skew']) >= MIN_SKEW:
+        gray = deskew(gray, quality['skew'])
+    profile = profile or choose_profile(quality)
+    image = PROFILES[profile](gray)
+    return image, {**quality, 'profile': profile, 'seconds': round(time.perf_counter() - start, 4)}
@@ -0,0 +1,181 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class Codec:
+    """
+    Serializer for stored character documents.
+
+    Attributes:
+        name (str): Name used in configuration (DND_STORAGE_FORMAT)
+        binary (bool): True if encode() returns bytes that aren't UTF-8 text
+    """
+
+    name = None
+    binary = False
+
+    def encode(self, document):
+        raise NotImplementedError
+
+    def decode(self, data):
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    """
+    Pretty-printed stdlib JSON, the historical on-disk format.
+    """
+
+    name = 'json'
+
+    def encode(self, document):
+        return json.dumps(document, indent=2).encode('utf-8')
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class FastJsonCodec(Codec):
+    """
+    Compact JSON written and read with orjson.
+    """
+
+    name = 'fastjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ValueError("The 'fastjson' storage format requires the orjson package")
+
+    def encode(self, document):
+        return orjson.dumps(document)
+
+    def decode(self, data):
+        return orjson.loads(data)
+
+
+class MessagePackCodec(Codec):
+    """
+    Binary MessagePack documents.
+    """
+
+    name = 'msgpack'
+    binary = True
+
+    def __init__(self):
+        if msgpack is None:
+            raise ValueError("The 'msgpack' storage format requires the msgpack package")
+
+    def encode(self, document):
+        return msgpack.packb(document, use_bin_type=True)
+
+    def decode(self, data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+CODECS = {
+    'json': JsonCodec,
+    'fastjson': FastJsonCodec,
+    'msgpack': MessagePackCodec
+}
+
+
+def get_codec(name):
+    """
+    Get a codec by name.
+
+    Args:
+        name (str): 'json', 'fastjson' or 'msgpack'
+
+    Returns:
+        Codec: The codec
+
+    Raises:
+        ValueError: If the codec is unknown or its package is not installed
+    """
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown storage format: {name}")
+
+
+def detect_format(data):
+    """
+    Detect the format of a stored document from its first byte.
+
+    Character documents are always objects, so JSON starts with '{' (after
+    optional whitespace) and MessagePack with a map header.
+
+    Args:
+        data (bytes): Stored document
+
+    Returns:
+        str: 'json' or 'msgpack'
+
+    Raises:
+        ValueError: If the format is not recognised
+    """
+    for byte in data[:64]:
+        if byte == 0x7b:  # '{'
+            return 'json'
+        if 0x80 <= byte <= 0x8f or byte in (0xde, 0xdf):
+            return 'msgpack'
+        if byte not in b' \t\r\n':
+            break
+    raise ValueError('Unrecognised document format')
+
+
+def decode_document(data):
+    """
+    Decode a stored document in any supported format.
+
+    JSON is decoded with orjson when it is installed.
+
+    Args:
+        data (bytes or str): Stored document
+
+    Returns:
+        dict: The document
+
+    Raises:
+        ValueError: If the data can't be decoded
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    if detect_format(data) == 'msgpack':
+        if msgpack is None:
+            raise ValueError('Document is stored as MessagePack but msgpack is not installed')
+        try:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except msgpack.UnpackException as e:
+            raise ValueError(f'Invalid MessagePack document: {e}')
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_document(path):
+    """
+    Read and decode a stored document file.
+
+    Args:
+        path (str): Document path
+
+    Returns:
+        dict: The document
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file can't be decoded
+    """
+    with open(path, 'rb') as file:
+        return decode_document(file.read())
@@ -0,0 +1,247 @@
+# Values read from a sheet (raw strings, parsed by pdf_import)
+SHEET_FIELDS = (
+    'name', 'race', 'class_level', 'level', 'background',
+    'strength', 'dexterity', 'constitution', 'intelligence', 'wisdom', 'charisma',
+    'hp_max', 'hp_current', 'armor_class', 'proficiency_bonus',
+    'equipment', 'spellcasting_class', 'spells', 'traits'
+)
+
+# Share of a profile's markers a PDF must have for the profile to be used
+MIN_MARKER_SCORE = 0.8
+
+# Values checkbox fields have when they are not ticked
+UNCHECKED_VALUES = ('', '/Off', 'Off')
+
+PROFILE_DEFINITIONS = {
+    'wotc-5e': {
+        'title': 'Official D&D 5e character sheet (Wizards of the Coast)',
+        'markers': [
+            'CharacterName', 'ClassLevel', 'PlayerName', 'Race ', 'Alignment', 'XP',
+            'STRmod', 'DEXmod ', 'CONmod', 'INTmod', 'WISmod', 'CHamod',
+            'HPMax', 'HPCurrent', 'HPTemp', 'HDTotal', 'ProficienciesLang', 'Features and Traits'
+        ],
+        'fields': {
+            'name': ['CharacterName'],
+            'race': ['Race ', 'Race'],
+            'class_level': ['ClassLevel'],
+            'background': ['Background'],
+            'strength': ['STR'],
+            'dexterity': ['DEX'],
+            'constitution': ['CON'],
+            'intelligence': ['INT'],
+            'wisdom': ['WIS'],
+            'charisma': ['CHA'],
+            'hp_max': ['HPMax'],
+            'hp_current': ['HPCurrent'],
+            'armor_class': ['AC'],
+            'proficiency_bonus': ['ProfBonus'],
+            'equipment': ['Equipment'],
+            'spellcasting_class': ['Spellcasting Class 2'],
+            'traits': ['PersonalityTraits ', 'PersonalityTraits']
+        },
+        # Skill proficiency checkboxes, in the order they appear on the sheet
+        'skills': {
+            'Acrobatics': ['Check Box 23'],
+            'Animal Handling': ['Check Box 24'],
+            'Arcana': ['Check Box 25'],
+            'Athletics': ['Check Box 26'],
+            'Deception': ['Check Box 27'],
+            'History': ['Check Box 28'],
+            'Insight': ['Check Box 29'],
+            'Intimidation': ['Check Box 30'],
+            'Investigation': ['Check Box 31'],
+            'Medicine': ['Check Box 32'],
+            'Nature': ['Check Box 33'],
+            'Perception': ['Check Box 34'],
+            'Performance': ['Check Box 35'],
+            'Persuasion': ['Check Box 36'],
+            'Religion': ['Check Box 37'],
+            'Sleight of Hand': ['Check Box 38'],
+            'Stealth': ['Check Box 39'],
+            'Survival': ['Check Box 40']
+        },
+        # The sheet records remaining slots rather than expended ones
+        'spell_slots': {
+            str(level): {'total': f'SlotsTotal {18 + level}', 'remaining': f'SlotsRemaining {18 + level}'}
+            for level in range(1, 10)
+        },
+        'cantrips': ['Spells 1014'] + [f'Spells {number}' for number in range(1016, 1023)],
+        # Spell lines of levels 1-9, top to bottom. The sheet numbers the
+        # first line (or two) of each level out of order.
+        'spell_lines': {
+            level: [f'Spells {number}' for number in numbers]
+            for level, numbers in {
+                1: (1015, *range(1023, 1034)),
+                2: (1046, *range(1034, 1046)),
+                3: (1048, 1047, *range(1049, 1060)),
+                4: (1061, 1060, *range(1062, 1073)),
+                5: (1074, 1073, *range(1075, 1082)),
+                6: (1083, 1082, *range(1084, 1091)),
+                7: (1092, 1091, *range(1093, 1100)),
+                8: (10101, 10100, *range(10102, 10107)),
+                9: (10108, 10107, *range(10109, 10114))
+            }.items()
+        }
+    },
+    'skill-cb': {
+        'title': 'Community sheet with Skill-CB-* skill checkboxes',
+        'markers': [
+            'Skill-CB-Acrobatics', 'Skill-CB-Arcana', 'Skill-CB-Athletics', 'Skill-CB-Deception',
+            'Skill-CB-History', 'Skill-CB-Insight', 'Skill-CB-Intimidation', 'Skill-CB-Investigation',
+            'Skill-CB-Medicine', 'Skill-CB-Nature', 'Skill-CB-Perception', 'Skill-CB-Performance',
+            'Skill-CB-Persuasion', 'Skill-CB-Religion', 'Skill-CB-Stealth', 'Skill-CB-Survival'
+        ],
+        'fields': {
+            'name': ['CharacterName'],
+            'race': ['Race'],
+            'class_level': ['ClassLevel'],
+            'level': ['Level', 'CharacterLevel'],
+            'background': ['Background'],
+            'strength': ['STR', 'Strength'],
+            'dexterity': ['DEX', 'Dexterity'],
+            'constitution': ['CON', 'Constitution'],
+            'intelligence': ['INT', 'Intelligence'],
+            'wisdom': ['WIS', 'Wisdom'],
+            'charisma': ['CHA', 'Charisma'],
+            'hp_max': ['HPMax'],
+            'hp_current': ['HPCurrent'],
+            'armor_class': ['AC'],
+            'proficiency_bonus': ['ProfBonus'],
+            'equipment': ['Equipment'],
+            'spellcasting_class': ['SpellcastingClass'],
+            'spells': ['Spells'],
+            'traits': ['PersonalityTraits']
+        },
+        'skills': {
+            'Acrobatics': ['Skill-CB-Acrobatics'],
+            'Animal Handling': ['Skill-CB-AnimalHandling', 'Skill-CB-Animal', 'Skill-CB-AnimalHandli'],
+            'Arcana': ['Skill-CB-Arcana'],
+            'Athletics': ['Skill-CB-Athletics'],
+            'Deception': ['Skill-CB-Deception'],
+            'History': ['Skill-CB-History'],
+            'Insight': ['Skill-CB-Insight'],
+            'Intimidation': ['Skill-CB-Intimidation'],
+            'Investigation': ['Skill-CB-Investigation'],
+            'Medicine': ['Skill-CB-Medicine'],
+            'Nature': ['Skill-CB-Nature'],
+            'Perception': ['Skill-CB-Perception'],
+            'Performance': ['Skill-CB-Performance'],
+            'Persuasion': ['Skill-CB-Persuasion'],
+            'Religion': ['Skill-CB-Religion'],
+            'Sleight of Hand': ['Skill-CB-SleightofHand', 'Skill-CB-SleightOfHand', 'Skill-CB-SleightHand'],
+            'Stealth': ['Skill-CB-Stealth'],
+            'Survival': ['Skill-CB-Survival']
+        },
+        'spell_slots': {
+            str(level): {'total': f'SlotsTotal{level}', 'used': f'SlotsExpended{level}'}
+            for level in range(1, 10)
+        }
+    }
+}
+
+
+class SheetProfile:
+    """
+    Compiled field layout of one character sheet.
+
+    A profile maps the values the importer needs to the exact form field
+    names of one sheet, together with marker fields that identify it, so a
+    matching PDF is read in a single pass over known fields. Profiles are
+    compiled once, at import time, from PROFILE_DEFINITIONS.
+
+    Attributes:
+        name (str): Profile name
+        title (str): Human readable description of the sheet
+        markers (frozenset): Field names that identify the sheet
+    """
+
+    def __init__(self, name, title, markers, fields, skills=None, spell_slots=None, cantrips=None,
+                 spell_lines=None):
+        unknown = set(fields) - set(SHEET_FIELDS)
+        if unknown:
+            raise ValueError(f"Profile {name} maps unknown fields: {', '.join(sorted(unknown))}")
+
+        self.name = name
+        self.title = title
+        self.markers = frozenset(markers)
+        self.fields = tuple((key, tuple(fields.get(key, ()))) for key in SHEET_FIELDS)
+        self.skills = tuple((skill, tuple(names)) for skill, names in (skills or {}).items())
+        self.spell_slots = tuple((level, dict(slot)) for level, slot in (spell_slots or {}).items())
+        self.cantrips = tuple(cantrips or ())
+        self.spell_lines = tuple((level, tuple(names)) for level, names in (spell_lines or {}).items())
+
+    def score(self, form_fields):
+        """
+        Get the share of this profile's markers present in a PDF.
+
+        Args:
+            form_fields (dict): Form fields extracted from the PDF
+
+        Returns:
+            float: 0.0 (no markers) to 1.0 (all markers)
+        """
+        if not self.markers:
+            return 0.0
+        return sum(marker in form_fields for marker in self.markers) / len(self.markers)
+
+    def read(self, form_fields, checkboxes=None):
+        """
+        Read the raw values of a sheet that matches this profile.
+
+        Args:
+            form_fields (dict): Form fields extracted from the PDF
+            checkboxes (dict): Checkbox states by field name, if available
+
+        Returns:
+            dict: Raw strings for every key in SHEET_FIELDS ('' if missing),
+                plus 'skill_proficiencies' (list of skill names),
+                'spell_slots' (level -> raw 'total' and 'used' or 'remaining'),
+                'cantrips' (list) and 'spell_list' (list of name/level dicts)
+        """
+        def first_value(names):
+            for name in names:
+                value = form_fields.get(name)
+                if value:
+                    return value
+            return ''
+
+        sheet = {key: first_value(names) for key, names in self.fields}
+        # Skill boxes are checkboxes on some sheets and text fields on others
+        checkboxes = checkboxes or {}
+        sheet['skill_proficiencies'] = [
+            skill for skill, names in self.skills
+            if any(checkboxes.get(name, form_fields.get(name)) not in (None, *UNCHECKED_VALUES) for name in names)
+        ]
+        sheet['spell_slots'] = {
+            level: {kind: form_fields.get(name) or '' for kind, name in slot.items()}
+            for level, slot in self.spell_slots
+        }
+        sheet['cantrips'] = [form_fields[name] for name in self.cantrips if form_fields.get(name)]
+        sheet['spell_list'] = [
+            {'name': form_fields[name], 'level': level}
+            for level, names in self.spell_lines
+            for name in names
+            if form_fields.get(name)
+        ]
+        return sheet
+
+
+PROFILES = tuple(SheetProfile(name, **definition) for name, definition in PROFILE_DEFINITIONS.items())
+
+
+def detect_profile(form_fields):
+    """
+    Pick the profile of the sheet a PDF was made from.
+
+    Args:
+        form_fields (dict): Form fields extracted from the PDF
+
+    Returns:
+        SheetProfile: Best matching profile, or None if the sheet is unknown
+    """
+    best, best_score = None, 0.0
+    for profile in PROFILES:
+        score = profile.score(form_fields)
+        if score >= MIN_MARKER_SCORE and score > best_score:
+            best, best_score = profile, score
+    return best
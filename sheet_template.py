@@ -0,0 +1,239 @@
+import os
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+import rules
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Page 1 of the official 5e character sheet, blank, rendered at the 200 DPI
+# scans are rasterized at
+TEMPLATE_IMAGE = os.path.join(BASE_DIR, 'assets', '5e_sheet_page1.png')
+
+# Keypoints and descriptors of the template are computed once and kept in the
+# data directory (or DND_CACHE_DIR), which unlike the source tree is writable
+CACHE_DIR = os.environ.get('DND_CACHE_DIR') or os.path.join(BASE_DIR, 'data')
+TEMPLATE_FEATURES_FILE = os.path.join(CACHE_DIR, '5e_sheet_page1.orb.npz')
+
+# Bump whenever the way the template keypoints are computed changes
+TEMPLATE_FEATURES_VERSION = '1'
+
+ORB_FEATURES = 3000
+
+# Matches a page needs, after RANSAC, to be taken for the template
+MIN_INLIERS = 60
+
+# Tesseract settings by kind of field: single lines, digits only, and
+# modifiers with their sign
+FIELD_CONFIGS = {
+    'line': '--oem 3 --psm 7',
+    'number': '--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789',
+    'bonus': '--oem 3 --psm 7 -c tessedit_char_whitelist=+-0123456789',
+    'block': '--oem 3 --psm 6'
+}
+
+# Field boxes on the template as (left, top, right, bottom) pixels, and the
+# FIELD_CONFIGS entry they are read with
+TEMPLATE_FIELDS = {
+    'name': ((121, 176, 560, 226), 'line'),
+    'class_level': ((737, 132, 1056, 178), 'line'),
+    'background': ((1056, 132, 1320, 178), 'line'),
+    'race': ((737, 207, 1056, 251), 'line'),
+    'strength': ((133, 518, 184, 555), 'number'),
+    'dexterity': ((133, 717, 184, 754), 'number'),
+    'constitution': ((133, 916, 184, 953), 'number'),
+    'intelligence': ((133, 1115, 184, 1152), 'number'),
+    'wisdom': ((133, 1313, 184, 1350), 'number'),
+    'charisma': ((133, 1511, 184, 1548), 'number'),
+    'proficiency_bonus': ((268, 472, 334, 516), 'bonus'),
+    'armor_class': ((649, 402, 726, 451), 'number'),
+    'hp_max': ((805, 545, 1056, 578), 'number'),
+    'hp_current': ((633, 605, 1067, 666), 'number'),
+    'traits': ((1158, 388, 1593, 515), 'block'),
+    'equipment': ((619, 1647, 1087, 2093), 'block')
+}
+
+# Centers of the skill proficiency bubbles, in SKILL_ABILITIES order
+SKILL_BUBBLES = {skill: (289, round(905.3 + 37.46 * index)) for index, skill in enumerate(rules.SKILL_ABILITIES)}
+
+# Pixels around a bubble's center that are dark when it is filled in
+BUBBLE_RADIUS = 4
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def template_features():
+    """
+    Get the ORB keypoints and descriptors of the template.
+
+    They are computed on first use and saved to TEMPLATE_FEATURES_FILE, so
+    each OCR worker process only loads them.
+
+    Returns:
+        dict: 'points' (keypoint coordinates), 'descriptors' and the template
+            'width' and 'height', or None if there is no template image
+    """
+    global _template
+    with _template_lock:
+        if _template is None and os.path.exists(TEMPLATE_IMAGE):
+            stat = os.stat(TEMPLATE_IMAGE)
+            source = f'{TEMPLATE_FEATURES_VERSION}:{stat.st_size}:{stat.st_mtime_ns}'
+            _template = load_template_features(source) or compute_template_features(source)
+        return _template
+
+
+def load_template_features(source):
+    try:
+        with np.load(TEMPLATE_FEATURES_FILE) as saved:
+            if str(saved['source']) != source:
+                return None
+            return {
+                'points': saved['points'],
+                'descriptors': saved['descriptors'],
+                'width': int(saved['size'][0]),
+                'height': int(saved['size'][1])
+            }
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def compute_template_features(source):
+    image = cv2.imread(TEMPLATE_IMAGE, cv2.IMREAD_GRAYSCALE)
+    # Only the printed sheet is matched, not what an upload is filled in with
+    mask = np.full(image.shape, 255, np.uint8)
+    for (left, top, right, bottom), _ in TEMPLATE_FIELDS.values():
+        mask[top:bottom, left:right] = 0
+    keypoints, descriptors = cv2.ORB_create(ORB_FEATURES).detectAndCompute(image, mask)
+    features = {
+        'points': np.float32([keypoint.pt for keypoint in keypoints]),
+        'descriptors': descriptors,
+        'width': image.shape[1],
+        'height': image.shape[0]
+    }
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Written under a temporary name, so workers starting together never
+        # load a half-written file
+        with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix='.npz', delete=False) as file:
+            np.savez(file, source=source, points=features['points'], descriptors=descriptors,
+                     size=np.int32([features['width'], features['height']]))
+        os.replace(file.name, TEMPLATE_FEATURES_FILE)
+    except OSError:
+        # Read-only installs just compute them once per process
+        pass
+    return features
+
+
+def align_to_template(gray):
+    """
+    Align a page to the template, if it is page 1 of the standard sheet.
+
+    Args:
+        gray (numpy.ndarray): Grayscale page
+
+    Returns:
+        numpy.ndarray: The page warped onto the template's coordinates, or
+            None if it does not match the template
+    """
+    template = template_features()
+    if template is None:
+        return None
+
+    keypoints, descriptors = cv2.ORB_create(ORB_FEATURES).detectAndCompute(gray, None)
+    if descriptors is None or len(keypoints) < MIN_INLIERS:
+        return None
+    pairs = cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(descriptors, template['descriptors'], k=2)
+    # Lowe's ratio test drops matches that are about as close to another point
+    matches = [pair[0] for pair in pairs if len(pair) == 2 and pair[0].distance < 0.75 * pair[1].distance]
+    if len(matches) < MIN_INLIERS:
+        return None
+
+    page_points = np.float32([keypoints[match.queryIdx].pt for match in matches])
+    template_points = template['points'][[match.trainIdx for match in matches]]
+    homography, inliers = cv2.findHomography(page_points, template_points, cv2.RANSAC, 5.0)
+    if homography is None or int(inliers.sum()) < MIN_INLIERS:
+        return None
+    return cv2.warpPerspective(gray, homography, (template['width'], template['height']), borderValue=255)
+
+
+def read_template_fields(aligned, batch):
+    """
+    Recognize the fields of a page aligned to the template.
+
+    Only the field boxes go through tesseract, each with the settings for
+    its kind of value; skill proficiencies are read from the bubbles.
+
+    Args:
+        aligned (numpy.ndarray): Result of align_to_template()
+        batch (ocr_backends.OcrBatch): Batch the field boxes are added to
+
+    Returns:
+        dict: Index of the text of each TEMPLATE_FIELDS entry in the batch's
+            results, plus 'skills' (names of the skills whose bubble is
+            filled in); see template_field_values()
+    """
+    _, binary = cv2.threshold(aligned, 150, 255, cv2.THRESH_BINARY)
+    fields = {}
+    for name, ((left, top, right, bottom), kind) in TEMPLATE_FIELDS.items():
+        # Tesseract finds text more reliably with a margin around it
+        field = cv2.copyMakeBorder(binary[top:bottom, left:right], 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=255)
+        fields[name] = batch.add(field, FIELD_CONFIGS[kind])
+    fields['skills'] = [
+        skill for skill, (x, y) in SKILL_BUBBLES.items()
+        if binary[y - BUBBLE_RADIUS:y + BUBBLE_RADIUS + 1, x - BUBBLE_RADIUS:x + BUBBLE_RADIUS + 1].mean() < 128
+    ]
+    return fields
+
+
+def template_field_values(fields, texts):
+    """
+    Get the recognized values of template fields once their batch has run.
+
+    Args:
+        fields (dict): Result of read_template_fields()
+        texts (list): Result of running the batch
+
+    Returns:
+        dict: Text of each TEMPLATE_FIELDS entry, plus 'skills'
+    """
+    return {name: texts[index].strip() if name != 'skills' else index for name, index in fields.items()}
+
+
+def template_page_text(values):
+    """
+    Write recognized template fields as labelled text, in the form
+    text_extraction.extract_character_data_from_text() reads.
+
+    Args:
+        values (dict): Result of template_field_values()
+
+    Returns:
+        str: Text of the page
+    """
+    labels = (
+        ('name', 'CHARACTER NAME: {}'),
+        ('class_level', 'CLASS & LEVEL: {}'),
+        ('race', 'RACE: {}'),
+        ('background', 'BACKGROUND: {}'),
+        *((ability, ability.upper() + ' {}') for ability in rules.ABILITIES),
+        ('proficiency_bonus', 'PROFICIENCY BONUS: {}'),
+        ('armor_class', 'ARMOR CLASS: {}'),
+        ('hp_max', 'Hit Point Maximum: {}'),
+        ('hp_current', 'CURRENT HIT POINTS: {}')
+    )
+    # Empty values are left out, or the next line would be read as the value.
+    # Every section ends with a heading the parser stops it at.
+    lines = [label.format(values[name]) for name, label in labels if values.get(name)]
+    if values.get('traits'):
+        lines.extend(('PERSONALITY TRAITS', values['traits'], 'IDEALS'))
+    lines.append('SKILLS')
+    lines.extend(f'X {skill}' for skill in values.get('skills', ()))
+    lines.append('EQUIPMENT')
+    if values.get('equipment'):
+        lines.append(values['equipment'])
+    lines.append('FEATURES')
+    return '\n'.join(lines) + '\n'
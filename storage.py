@@ -0,0 +1,1058 @@
+import base64
+import binascii
+import bisect
+import copy
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from character_cache import (CharacterCache, SummaryManifest, affects_summary, load_document, scan_data_dir,
+                             stat_or_none, summarize_character)
+from character_ids import new_character_id
+from derived_stats import affects_derived_stats, update_derived_stats
+from journal import append_mutations, apply_mutations, journal_paths, read_journal, replay_journal
+from serialization import decode_document, get_codec, read_document
+
+logger = logging.getLogger(__name__)
+
+# Fields with their own indexed column; mutating them needs a full save
+INDEXED_FIELDS = ('id', 'name', 'race', 'class', 'level', 'version')
+
+
+# Summary fields the character list can be sorted by; every sort is
+# tie-broken by id so cursors are stable
+SORT_FIELDS = ('name', 'race', 'class', 'level', 'id')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class VersionConflict(Exception):
+    """
+    Raised when a write expects a different version than the stored one.
+    """
+
+    def __init__(self, character_id, expected_version, current_version):
+        super().__init__(
+            f"Character {character_id} is at version {current_version}, expected {expected_version}"
+        )
+        self.character_id = character_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+def check_version(character_id, expected_version, current_version):
+    if expected_version is not None and expected_version != current_version:
+        raise VersionConflict(character_id, expected_version, current_version)
+
+
+def utc_from_timestamp(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def sort_value(summary, field):
+    value = summary.get(field)
+    if value is None:
+        return 0 if field == 'level' else ''
+    return value
+
+
+def parse_sort(sort):
+    """
+    Parse a sort parameter such as 'level' or '-name'.
+
+    Args:
+        sort (str): Field name, prefixed with '-' for descending order
+
+    Returns:
+        tuple: (field, descending)
+
+    Raises:
+        ValueError: If the field can't be sorted by
+    """
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field not in SORT_FIELDS:
+        raise ValueError(f"Unknown sort field: {field}")
+    return field, descending
+
+
+def encode_cursor(summary, field):
+    payload = json.dumps([sort_value(summary, field), summary['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    """
+    Decode a pagination cursor into the (sort value, id) of the last item seen.
+
+    Args:
+        cursor (str): Cursor from encode_cursor()
+        field (str): Field the results are sorted by
+
+    Raises:
+        ValueError: If the cursor is malformed or doesn't hold a value of
+            the sort field's type
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, character_id = json.loads(payload)
+    except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+    # Comparing it with the sort keys would fail (or order wrongly) otherwise
+    if type(value) is not (int if field == 'level' else str) or not isinstance(character_id, str):
+        raise ValueError('Invalid cursor')
+    return value, character_id
+
+
+def matches_filters(summary, filters):
+    """
+    Check a summary against the list filters.
+
+    Args:
+        summary (dict): Character summary
+        filters (dict): Any of class, race (case-insensitive), min_level,
+            max_level and spellcaster (bool)
+
+    Returns:
+        bool: True if the character matches every filter
+    """
+    for field in ('class', 'race'):
+        if filters.get(field) is not None and (summary.get(field) or '').lower() != filters[field].lower():
+            return False
+    level = summary.get('level') or 0
+    if filters.get('min_level') is not None and level < filters['min_level']:
+        return False
+    if filters.get('max_level') is not None and level > filters['max_level']:
+        return False
+    if filters.get('spellcaster') is not None and bool(summary.get('spellcaster')) != filters['spellcaster']:
+        return False
+    return True
+
+
+@contextmanager
+def lock_file(path):
+    """
+    Hold an exclusive OS-level lock on a file, across threads and processes.
+
+    Lock files may be removed while they are held (see remove_lock_file()), so
+    a lock taken on a file that is no longer at path is dropped and taken
+    again on the current one.
+
+    Args:
+        path (str): Lock file path (created if missing)
+    """
+    while True:
+        with open(path, 'a+b') as file:
+            if fcntl:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                if fcntl and not is_same_file(file, path):
+                    continue
+                yield
+                return
+            finally:
+                if fcntl:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+                else:
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def is_same_file(file, path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(file.fileno())
+    return (stat.st_dev, stat.st_ino) == (opened.st_dev, opened.st_ino)
+
+
+def remove_lock_file(path):
+    """
+    Remove a lock file that is held by the caller.
+
+    Writers waiting on it take the lock again on a new file. Windows can't
+    remove open files, so there lock files are kept.
+
+    Args:
+        path (str): Lock file path
+    """
+    if not fcntl:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_file_atomic(path, data, codec=None):
+    """
+    Write a document via a temporary file and rename, so readers never see a
+    partially written file.
+
+    Args:
+        path (str): Destination path
+        data (dict): Document to write
+        codec (Codec): Serialization format (pretty-printed JSON by default)
+    """
+    payload = (codec or get_codec('json')).encode(data)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(payload)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class CharacterStorage:
+    """
+    Interface for persisting character documents.
+
+    Every read and write of character data (web app and importers) goes
+    through one of these backends, so the persistence layer can be swapped
+    without touching the callers.
+    """
+
+    def get(self, character_id):
+        """
+        Get a single character.
+
+        Args:
+            character_id (str): Character ID
+
+        Returns:
+            dict: Character data (safe to modify) or None if not found
+        """
+        raise NotImplementedError
+
+    def all(self):
+        """
+        Get every stored character.
+
+        Returns:
+            list: Character data dictionaries
+        """
+        raise NotImplementedError
+
+    def iter_characters(self):
+        """
+        Iterate over every stored character, reading one document at a time.
+
+        Unlike all(), nothing is accumulated, so memory stays constant no
+        matter how large the roster is.
+
+        Yields:
+            dict: Character data
+        """
+        yield from self.all()
+
+    def character_meta(self, character_id):
+        """
+        Get the cache validators of a character for conditional requests.
+
+        Args:
+            character_id (str): Character ID
+
+        Returns:
+            dict: 'version' and 'last_modified' (UTC datetime or None), or
+                None if the character does not exist
+        """
+        raise NotImplementedError
+
+    def collection_meta(self):
+        """
+        Get the cache validators of the whole roster for conditional requests.
+
+        Returns:
+            dict: 'tag' (changes whenever any character changes) and
+                'last_modified' (UTC datetime or None)
+        """
+        raise NotImplementedError
+
+    def summaries(self):
+        """
+        Get the listing summary of every stored character.
+
+        Returns:
+            list: Summary dictionaries
+        """
+        raise NotImplementedError
+
+    def query_summaries(self, filters=None, sort='id', limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Get one page of filtered, sorted character summaries.
+
+        Pagination is keyset based: the cursor records the sort value and id of
+        the last item returned, so pages stay consistent while characters are
+        added or removed.
+
+        Args:
+            filters (dict): See matches_filters()
+            sort (str): Sort field, prefixed with '-' for descending order
+            limit (int): Maximum number of summaries to return
+            cursor (str): next_cursor from the previous page
+
+        Returns:
+            tuple: (list of summaries, next cursor or None)
+
+        Raises:
+            ValueError: If the sort field or cursor is invalid
+        """
+        field, descending = parse_sort(sort)
+        keys, ordered = self._sorted_summaries(field)
+
+        if descending:
+            end = bisect.bisect_left(keys, decode_cursor(cursor, field)) if cursor else len(keys)
+            candidates = (ordered[i] for i in range(end - 1, -1, -1))
+        else:
+            start = bisect.bisect_right(keys, decode_cursor(cursor, field)) if cursor else 0
+            candidates = (ordered[i] for i in range(start, len(ordered)))
+
+        page = []
+        has_more = False
+        for summary in candidates:
+            if filters and not matches_filters(summary, filters):
+                continue
+            if len(page) == limit:
+                has_more = True
+                break
+            page.append(summary)
+
+        next_cursor = encode_cursor(page[-1], field) if has_more else None
+        return page, next_cursor
+
+    def _sorted_summaries(self, field):
+        """
+        Get all summaries ordered by a field, together with their sort keys.
+
+        Returns:
+            tuple: (list of (sort value, id) keys, list of summaries)
+        """
+        ordered = sorted(self.summaries(), key=lambda summary: (sort_value(summary, field), summary['id']))
+        return [(sort_value(summary, field), summary['id']) for summary in ordered], ordered
+
+    def save(self, character_data, expected_version=None):
+        """
+        Create or replace a character. Assigns an ID if the data has none.
+
+        The stored 'version' is incremented on every write. When
+        expected_version is given the write only happens if the stored
+        version still matches it (compare-and-swap). Derived stats (ability
+        modifiers, skill bonuses, spell save DC, ...) are recomputed before
+        writing, so stored characters never need computing when read.
+
+        Args:
+            character_data (dict): Character data, updated with the new version
+            expected_version (int): Version the caller based its changes on
+
+        Returns:
+            str: The character ID
+
+        Raises:
+            VersionConflict: If the stored version differs from expected_version
+        """
+        raise NotImplementedError
+
+    def delete(self, character_id):
+        """
+        Delete a character.
+
+        Args:
+            character_id (str): Character ID
+
+        Returns:
+            bool: True if the character existed
+        """
+        raise NotImplementedError
+
+    def apply_mutations(self, character_id, mutations, expected_version=None):
+        """
+        Apply small 'set' mutations, e.g. a used spell slot or current HP.
+
+        Backends with a journal append the mutations instead of rewriting the
+        whole document; the journal is folded back in by compact().
+
+        Args:
+            character_id (str): Character ID
+            mutations (list): Dictionaries with a 'path' (list of keys) and the
+                new 'value'
+            expected_version (int): Version the caller based its changes on
+
+        Returns:
+            int: The new version, or None if the character does not exist
+
+        Raises:
+            VersionConflict: If the stored version differs from expected_version
+        """
+        character_data = self.get(character_id)
+        if character_data is None:
+            return None
+        check_version(character_id, expected_version, character_data.get('version', 0))
+        apply_mutations(character_data, mutations)
+        self.save(character_data, expected_version=character_data.get('version', 0))
+        return character_data['version']
+
+    def compact(self, character_id):
+        """
+        Fold a character's journal back into its document.
+
+        Args:
+            character_id (str): Character ID
+        """
+
+    def migrate_format(self):
+        """
+        Rewrite every stored document in this storage's serialization format.
+
+        Documents are read in whatever format they are currently stored in;
+        versions and journals are left untouched.
+
+        Returns:
+            int: Number of documents rewritten
+        """
+        raise NotImplementedError
+
+    def new_id(self):
+        return new_character_id()
+
+
+class JournalCompactor:
+    """
+    Background thread that compacts character journals.
+
+    Compaction requests are collected for a short delay, so a burst of
+    clicks during a session results in a single rewrite per character.
+    """
+
+    def __init__(self, storage, delay=2.0):
+        self.storage = storage
+        self.delay = delay
+        self._pending = set()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, character_id):
+        with self._condition:
+            self._pending.add(character_id)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='journal-compactor', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+            time.sleep(self.delay)
+            with self._condition:
+                pending, self._pending = self._pending, set()
+            for character_id in pending:
+                try:
+                    self.storage.compact(character_id)
+                except Exception:
+                    logger.exception('Failed to compact journal of character %s', character_id)
+
+
+class JsonDirectoryStorage(CharacterStorage):
+    """
+    One file per character in a data directory.
+
+    Files are pretty-printed JSON by default; any other format from
+    serialization.CODECS can be configured and files keep their .json name,
+    since the format is detected from the content on read.
+
+    Mutations are appended to a per-character <id>.journal file and replayed
+    on read until the compactor folds them back into the document.
+    """
+
+    # Journal size after which a background compaction is scheduled
+    COMPACT_THRESHOLD = 16 * 1024
+
+    def __init__(self, data_dir, storage_format='json'):
+        self.data_dir = data_dir
+        self.codec = get_codec(storage_format)
+        self.lock_dir = os.path.join(data_dir, '.locks')
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self.cache = CharacterCache(data_dir)
+        self.manifest = SummaryManifest(data_dir)
+        self.compactor = JournalCompactor(self)
+        self._write_locks = [threading.Lock() for _ in range(64)]
+        self._sort_indexes = {}
+
+    @contextmanager
+    def _write_lock(self, character_id):
+        # Serializes writers of the same character across threads and
+        # processes; writers of different characters never wait on each other
+        with self._write_locks[hash(character_id) % len(self._write_locks)]:
+            with lock_file(self._lock_path(character_id)):
+                yield
+
+    def _lock_path(self, character_id):
+        return os.path.join(self.lock_dir, f'{character_id}.lock')
+
+    def _current_version(self, character_id):
+        character_data = self.cache.peek(character_id)
+        if character_data is None:
+            return None
+        return character_data.get('version', 0)
+
+    def get_path(self, character_id):
+        return os.path.join(self.data_dir, f'{character_id}.json')
+
+    def get(self, character_id):
+        return self.cache.get(character_id)
+
+    def all(self):
+        return self.cache.all()
+
+    def iter_characters(self):
+        # Read straight from disk so exporting does not fill the cache
+        for character_id, (entry, _) in scan_data_dir(self.data_dir).items():
+            try:
+                yield load_document(entry.path, journal_paths(self.data_dir, character_id))
+            except (FileNotFoundError, ValueError):
+                continue
+
+    def character_meta(self, character_id):
+        stats = [stat_or_none(self.get_path(character_id))]
+        if stats[0] is None:
+            return None
+        stats.extend(stat_or_none(path) for path in journal_paths(self.data_dir, character_id))
+
+        character_data = self.cache.peek(character_id)
+        if character_data is None:
+            return None
+        return {
+            'version': character_data.get('version', 0),
+            'last_modified': utc_from_timestamp(max(stat.st_mtime for stat in stats if stat))
+        }
+
+    def collection_meta(self):
+        tag, latest = self.manifest.fingerprint()
+        return {'tag': tag, 'last_modified': utc_from_timestamp(latest / 1e9 if latest else None)}
+
+    def summaries(self):
+        return self.manifest.summaries()
+
+    def _sorted_summaries(self, field):
+        # The sorted order is kept per sort field until the manifest changes,
+        # so paging through the roster does not re-sort it for every page
+        self.manifest.summaries()
+        generation = self.manifest.generation
+        cached = self._sort_indexes.get(field)
+        if cached and cached[0] == generation:
+            return cached[1]
+        index = super()._sorted_summaries(field)
+        self._sort_indexes[field] = (generation, index)
+        return index
+
+    def save(self, character_data, expected_version=None):
+        if not character_data.get('id'):
+            character_data['id'] = self.new_id()
+        character_id = character_data['id']
+
+        with self._write_lock(character_id):
+            previous = self.cache.peek(character_id)
+            current_version = previous.get('version', 0) if previous is not None else None
+            check_version(character_id, expected_version, current_version)
+            character_data['version'] = (current_version or 0) + 1
+            # Only stats whose inputs differ from the stored character are recomputed
+            update_derived_stats(character_data, previous)
+
+            write_file_atomic(self.get_path(character_id), character_data, self.codec)
+            # The saved document already contains everything the journal recorded
+            self._remove_journals(character_id)
+            self.cache.store(character_id, character_data)
+            self.manifest.update(character_data)
+        return character_id
+
+    def delete(self, character_id):
+        with self._write_lock(character_id):
+            try:
+                os.remove(self.get_path(character_id))
+                return True
+            except FileNotFoundError:
+                return False
+            finally:
+                self._remove_journals(character_id)
+                self.cache.invalidate(character_id)
+                self.manifest.remove(character_id)
+                # Lock files would otherwise pile up for every character ever deleted
+                remove_lock_file(self._lock_path(character_id))
+
+    def _remove_journals(self, character_id):
+        for path in journal_paths(self.data_dir, character_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def apply_mutations(self, character_id, mutations, expected_version=None):
+        if affects_derived_stats(mutations):
+            # Derived stats are recomputed by save()
+            return super().apply_mutations(character_id, mutations, expected_version)
+
+        with self._write_lock(character_id):
+            current_version = self._current_version(character_id)
+            if current_version is None:
+                return None
+            check_version(character_id, expected_version, current_version)
+
+            mutations = list(mutations) + [{'path': ['version'], 'value': current_version + 1}]
+            previous_key = self.cache.current_key(character_id)
+            journal_size = append_mutations(journal_paths(self.data_dir, character_id)[1], mutations)
+            self.cache.apply_mutations(character_id, mutations, previous_key)
+            self.manifest.apply_mutations(character_id, mutations)
+
+        if journal_size >= self.COMPACT_THRESHOLD:
+            self.compactor.schedule(character_id)
+        return current_version + 1
+
+    def compact(self, character_id):
+        with self._write_lock(character_id):
+            self._compact(character_id)
+
+    def _compact(self, character_id):
+        compacting_path, journal_path = journal_paths(self.data_dir, character_id)
+        if not os.path.exists(compacting_path):
+            # Hand the current journal over to compaction; new mutations go to
+            # a fresh journal file in the meantime
+            try:
+                os.link(journal_path, compacting_path)
+            except (FileNotFoundError, FileExistsError):
+                return
+            os.remove(journal_path)
+
+        path = self.get_path(character_id)
+        try:
+            character_data = load_document(path, [compacting_path])
+        except FileNotFoundError:
+            os.remove(compacting_path)
+            return
+
+        write_file_atomic(path, character_data, self.codec)
+        os.remove(compacting_path)
+
+        replay_journal(character_data, read_journal(journal_path))
+        self.cache.store(character_id, character_data)
+        self.manifest.update(character_data)
+
+    def migrate_format(self):
+        count = 0
+        for character_id in scan_data_dir(self.data_dir):
+            with self._write_lock(character_id):
+                path = self.get_path(character_id)
+                try:
+                    document = read_document(path)
+                except (FileNotFoundError, ValueError):
+                    continue
+                write_file_atomic(path, document, self.codec)
+                # Content is unchanged, but the new stats must not look stale
+                self.cache.invalidate(character_id)
+            count += 1
+        return count
+
+
+class SQLiteStorage(CharacterStorage):
+    """
+    Characters stored in a single SQLite database.
+
+    The document is kept (as JSON by default, or in any other format from
+    serialization.CODECS) next to indexed columns for the fields used
+    to look up and list characters, so listings never parse full sheets and
+    no directory scans are involved. Mutations are inserted into a journal
+    table and replayed on read until they are compacted into the document.
+    """
+
+    # Journal rows per character after which a background compaction is scheduled
+    COMPACT_THRESHOLD = 64
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS characters (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL DEFAULT '',
+            race TEXT NOT NULL DEFAULT '',
+            class TEXT NOT NULL DEFAULT '',
+            level INTEGER NOT NULL DEFAULT 0,
+            spellcaster INTEGER NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL,
+            summary TEXT NOT NULL,
+            document TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS character_journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            character_id TEXT NOT NULL,
+            mutation TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_character_journal_character ON character_journal (character_id, seq);
+        CREATE TABLE IF NOT EXISTS storage_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    # Sort indexes include id for keyset pagination; filter indexes are case-insensitive
+    INDEXES = """
+        DROP INDEX IF EXISTS idx_characters_class;
+        CREATE INDEX IF NOT EXISTS idx_characters_name ON characters (name, id);
+        CREATE INDEX IF NOT EXISTS idx_characters_level ON characters (level, id);
+        CREATE INDEX IF NOT EXISTS idx_characters_class_sort ON characters (class, id);
+        CREATE INDEX IF NOT EXISTS idx_characters_race_sort ON characters (race, id);
+        CREATE INDEX IF NOT EXISTS idx_characters_class_nocase ON characters (class COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_characters_race_nocase ON characters (race COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_characters_spellcaster ON characters (spellcaster);
+    """
+
+    def __init__(self, db_path, storage_format='json'):
+        self.db_path = db_path
+        self.codec = get_codec(storage_format)
+        self._local = threading.local()
+        self.compactor = JournalCompactor(self)
+        with self._connect() as connection:
+            connection.executescript(self.SCHEMA)
+            self._migrate(connection)
+            connection.executescript(self.INDEXES)
+
+    def _migrate(self, connection):
+        columns = [row[1] for row in connection.execute('PRAGMA table_info(characters)')]
+        if 'version' not in columns:
+            connection.execute('ALTER TABLE characters ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        if 'updated_at' not in columns:
+            connection.execute('ALTER TABLE characters ADD COLUMN updated_at REAL')
+        if 'spellcaster' not in columns:
+            connection.execute('ALTER TABLE characters ADD COLUMN spellcaster INTEGER NOT NULL DEFAULT 0')
+        # Rebuild the summary columns of databases written with an older summary layout
+        if connection.execute('PRAGMA user_version').fetchone()[0] < SummaryManifest.FORMAT:
+            for character_id, document in connection.execute('SELECT id, document FROM characters').fetchall():
+                summary = summarize_character(decode_document(document))
+                connection.execute(
+                    'UPDATE characters SET name = ?, race = ?, class = ?, level = ?, spellcaster = ?, summary = ? '
+                    'WHERE id = ?',
+                    (*self._indexed_values(summary), json.dumps(summary), character_id)
+                )
+            connection.execute(f'PRAGMA user_version = {SummaryManifest.FORMAT}')
+
+    @staticmethod
+    def _indexed_values(summary):
+        return (sort_value(summary, 'name'),
+                sort_value(summary, 'race'),
+                sort_value(summary, 'class'),
+                sort_value(summary, 'level'),
+                int(bool(summary.get('spellcaster'))))
+
+    def _encode(self, character_data):
+        # Text formats stay TEXT so the database remains readable with the sqlite3 shell
+        payload = self.codec.encode(character_data)
+        return payload if self.codec.binary else payload.decode('utf-8')
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _journal(self, connection, character_id):
+        rows = connection.execute(
+            'SELECT mutation FROM character_journal WHERE character_id = ? ORDER BY seq', (character_id,)
+        )
+        return [json.loads(mutation) for mutation, in rows]
+
+    def get(self, character_id):
+        connection = self._connect()
+        row = connection.execute(
+            'SELECT document, version FROM characters WHERE id = ?', (character_id,)
+        ).fetchone()
+        if not row:
+            return None
+        character_data = apply_mutations(decode_document(row[0]), self._journal(connection, character_id))
+        character_data['version'] = row[1]
+        return character_data
+
+    def all(self):
+        connection = self._connect()
+        journals = {}
+        for character_id, mutation in connection.execute(
+                'SELECT character_id, mutation FROM character_journal ORDER BY seq'):
+            journals.setdefault(character_id, []).append(json.loads(mutation))
+
+        characters = []
+        for character_id, document, version in connection.execute(
+                'SELECT id, document, version FROM characters ORDER BY id'):
+            character_data = apply_mutations(decode_document(document), journals.get(character_id, []))
+            character_data['version'] = version
+            characters.append(character_data)
+        return characters
+
+    def iter_characters(self):
+        # A dedicated connection keeps the export's read transaction separate
+        # from the requests served by this thread while the response streams
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            journaled = {character_id for character_id, in connection.execute(
+                'SELECT DISTINCT character_id FROM character_journal')}
+            for character_id, document, version in connection.execute(
+                    'SELECT id, document, version FROM characters ORDER BY id'):
+                character_data = decode_document(document)
+                if character_id in journaled:
+                    apply_mutations(character_data, self._journal(connection, character_id))
+                character_data['version'] = version
+                yield character_data
+        finally:
+            connection.close()
+
+    def _bump_revision(self, connection):
+        # Roster-wide revision counter backing collection_meta()
+        connection.execute(
+            "INSERT INTO storage_meta (key, value) VALUES ('revision', 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+        )
+
+    def character_meta(self, character_id):
+        row = self._connect().execute(
+            'SELECT version, updated_at FROM characters WHERE id = ?', (character_id,)
+        ).fetchone()
+        if not row:
+            return None
+        return {'version': row[0], 'last_modified': utc_from_timestamp(row[1])}
+
+    def collection_meta(self):
+        connection = self._connect()
+        revision = connection.execute("SELECT value FROM storage_meta WHERE key = 'revision'").fetchone()
+        latest, = connection.execute('SELECT MAX(updated_at) FROM characters').fetchone()
+        return {'tag': str(revision[0] if revision else 0), 'last_modified': utc_from_timestamp(latest)}
+
+    def summaries(self):
+        rows = self._connect().execute('SELECT summary FROM characters ORDER BY id')
+        return [json.loads(summary) for summary, in rows]
+
+    def query_summaries(self, filters=None, sort='id', limit=DEFAULT_PAGE_SIZE, cursor=None):
+        field, descending = parse_sort(sort)
+        filters = filters or {}
+        conditions = []
+        params = []
+
+        for column in ('class', 'race'):
+            if filters.get(column) is not None:
+                conditions.append(f'{column} = ? COLLATE NOCASE')
+                params.append(filters[column])
+        if filters.get('min_level') is not None:
+            conditions.append('level >= ?')
+            params.append(filters['min_level'])
+        if filters.get('max_level') is not None:
+            conditions.append('level <= ?')
+            params.append(filters['max_level'])
+        if filters.get('spellcaster') is not None:
+            conditions.append('spellcaster = ?')
+            params.append(int(filters['spellcaster']))
+        if cursor:
+            conditions.append(f'({field}, id) {"<" if descending else ">"} (?, ?)')
+            params.extend(decode_cursor(cursor, field))
+
+        direction = 'DESC' if descending else 'ASC'
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        rows = self._connect().execute(
+            f'SELECT summary FROM characters {where} ORDER BY {field} {direction}, id {direction} LIMIT ?',
+            (*params, limit + 1)
+        ).fetchall()
+
+        page = [json.loads(summary) for summary, in rows[:limit]]
+        next_cursor = encode_cursor(page[-1], field) if len(rows) > limit else None
+        return page, next_cursor
+
+    def _current_version(self, connection, character_id):
+        row = connection.execute('SELECT version FROM characters WHERE id = ?', (character_id,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, character_data, expected_version=None):
+        if not character_data.get('id'):
+            character_data['id'] = self.new_id()
+        character_id = character_data['id']
+
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            current_version = self._current_version(connection, character_id)
+            check_version(character_id, expected_version, current_version)
+            character_data['version'] = (current_version or 0) + 1
+            # Decoding the stored document would cost more than recomputing every stat
+            update_derived_stats(character_data)
+
+            summary = summarize_character(character_data)
+            connection.execute(
+                'INSERT OR REPLACE INTO characters '
+                '(id, name, race, class, level, spellcaster, version, updated_at, summary, document) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (character_id,
+                 *self._indexed_values(summary),
+                 character_data['version'],
+                 time.time(),
+                 json.dumps(summary),
+                 self._encode(character_data))
+            )
+            connection.execute('DELETE FROM character_journal WHERE character_id = ?', (character_id,))
+            self._bump_revision(connection)
+        return character_id
+
+    def delete(self, character_id):
+        with self._connect() as connection:
+            cursor = connection.execute('DELETE FROM characters WHERE id = ?', (character_id,))
+            connection.execute('DELETE FROM character_journal WHERE character_id = ?', (character_id,))
+            self._bump_revision(connection)
+        return cursor.rowcount > 0
+
+    def apply_mutations(self, character_id, mutations, expected_version=None):
+        if any(mutation['path'][0] in INDEXED_FIELDS for mutation in mutations) or affects_derived_stats(mutations):
+            return super().apply_mutations(character_id, mutations, expected_version)
+
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            current_version = self._current_version(connection, character_id)
+            if current_version is None:
+                return None
+            check_version(character_id, expected_version, current_version)
+
+            connection.executemany(
+                'INSERT INTO character_journal (character_id, mutation) VALUES (?, ?)',
+                [(character_id, json.dumps(mutation)) for mutation in mutations]
+            )
+            connection.execute(
+                'UPDATE characters SET version = version + 1, updated_at = ? WHERE id = ?', (time.time(), character_id)
+            )
+            self._bump_revision(connection)
+            if affects_summary(mutations):
+                for mutation in mutations:
+                    json_path = '$' + ''.join(f'."{key}"' for key in mutation['path'])
+                    connection.execute(
+                        'UPDATE characters SET summary = json_set(summary, ?, json(?)) WHERE id = ?',
+                        (json_path, json.dumps(mutation['value']), character_id)
+                    )
+            journal_length, = connection.execute(
+                'SELECT COUNT(*) FROM character_journal WHERE character_id = ?', (character_id,)
+            ).fetchone()
+
+        if journal_length >= self.COMPACT_THRESHOLD:
+            self.compactor.schedule(character_id)
+        return current_version + 1
+
+    def compact(self, character_id):
+        with self._connect() as connection:
+            # Take the write lock up front so no save can slip in between
+            # reading the journal and replacing the document
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT document, version FROM characters WHERE id = ?', (character_id,)
+            ).fetchone()
+            journal = connection.execute(
+                'SELECT seq, mutation FROM character_journal WHERE character_id = ? ORDER BY seq', (character_id,)
+            ).fetchall()
+            if not row or not journal:
+                return
+            character_data = apply_mutations(
+                decode_document(row[0]), [json.loads(mutation) for _, mutation in journal]
+            )
+            character_data['version'] = row[1]
+            connection.execute(
+                'UPDATE characters SET summary = ?, document = ? WHERE id = ?',
+                (json.dumps(summarize_character(character_data)), self._encode(character_data), character_id)
+            )
+            connection.execute(
+                'DELETE FROM character_journal WHERE character_id = ? AND seq <= ?', (character_id, journal[-1][0])
+            )
+
+    def migrate_format(self):
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            rows = connection.execute('SELECT id, document FROM characters').fetchall()
+            connection.executemany(
+                'UPDATE characters SET document = ? WHERE id = ?',
+                [(self._encode(decode_document(document)), character_id) for character_id, document in rows]
+            )
+        return len(rows)
+
+
+STORAGE_BACKENDS = {
+    'json': JsonDirectoryStorage,
+    'sqlite': SQLiteStorage
+}
+
+
+def create_storage(backend, path, storage_format='json'):
+    """
+    Create a storage backend by name.
+
+    Args:
+        backend (str): Backend name ('json' or 'sqlite')
+        path (str): Data directory for 'json', database file for 'sqlite'
+        storage_format (str): Format documents are written in (see
+            serialization.CODECS); every format can always be read
+
+    Returns:
+        CharacterStorage: The storage backend
+    """
+    try:
+        backend_class = STORAGE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return backend_class(path, storage_format)
+
+
+def open_storage(target):
+    """
+    Accept either a storage backend or a data directory path.
+
+    Args:
+        target (CharacterStorage or str): Storage backend or data directory
+
+    Returns:
+        CharacterStorage: The storage backend
+    """
+    if isinstance(target, CharacterStorage):
+        return target
+    return JsonDirectoryStorage(target)
+
+
+def copy_characters(source, destination):
+    """
+    Copy every character from one backend into another.
+
+    Args:
+        source (CharacterStorage): Storage to read from
+        destination (CharacterStorage): Storage to write to
+
+    Returns:
+        int: Number of characters copied
+    """
+    count = 0
+    for character_data in source.all():
+        # Documents can be shared with the source's cache, and saving sets
+        # the version and derived stats in place
+        destination.save(copy.deepcopy(character_data))
+        count += 1
+    return count
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing app opens its storage and import cache; keep them out of data/
+_app_data = tempfile.mkdtemp(prefix='dnd-tests-')
+os.environ.setdefault('DND_STORAGE_PATH', _app_data)
+os.environ.setdefault('DND_IMPORT_CACHE_PATH', os.path.join(_app_data, 'import_cache.db'))
@@ -0,0 +1,72 @@
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+@pytest.fixture
+def character_id():
+    return app.storage.save({
+        'name': 'Aria',
+        'race': 'Elf',
+        'class': 'Wizard',
+        'level': 1,
+        'abilities': {'strength': 8, 'dexterity': 14, 'constitution': 12,
+                      'intelligence': 16, 'wisdom': 10, 'charisma': 10},
+        'hp': {'max': 6, 'current': 6},
+        'armor_class': 12,
+        'proficiency_bonus': 2
+    })
+
+
+@pytest.mark.parametrize('version', ['', 'abc', '1.5'])
+def test_edit_with_an_invalid_version_field_is_rejected(client, character_id, version):
+    response = client.post(f'/character/{character_id}/edit', data={'name': 'Changed', 'version': version})
+
+    assert response.status_code == 400
+    assert app.storage.get(character_id)['name'] == 'Aria'
+
+
+def test_edit_of_an_outdated_version_is_not_saved(client, character_id):
+    app.storage.save(app.storage.get(character_id), expected_version=1)
+    response = client.post(f'/character/{character_id}/edit', data={'name': 'Changed', 'version': '1'})
+
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(f'/character/{character_id}/edit')
+    assert app.storage.get(character_id)['name'] == 'Aria'
+
+
+@pytest.mark.parametrize('query, error', [
+    ('limit=abc', 'limit must be an integer'),
+    ('min_level=x', 'min_level must be an integer'),
+    ('spellcaster=maybe', 'spellcaster must be yes or no')
+])
+def test_invalid_list_arguments_get_a_fixed_message(client, query, error):
+    response = client.get(f'/api/characters?{query}')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+def test_character_api_is_only_not_modified_for_a_matching_etag(client, character_id):
+    response = client.get(f'/api/character/{character_id}')
+    etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+
+    assert client.get(f'/api/character/{character_id}', headers={'If-None-Match': etag}).status_code == 304
+    # A change within the same second keeps Last-Modified
+    app.storage.apply_mutations(character_id, [{'path': ['hp', 'current'], 'value': 3}])
+    response = client.get(f'/api/character/{character_id}', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+    assert response.get_json()['hp']['current'] == 3
+
+
+def test_character_page_etag_holds_the_render_version(client, character_id, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'RENDER_VERSION', 'release-7')
+    response = client.get(f'/character/{character_id}')
+
+    assert response.headers['ETag'] == '"html-release-7-1"'
+    assert client.get(f'/character/{character_id}', headers={'If-None-Match': '"html-1"'}).status_code == 200
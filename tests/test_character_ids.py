@@ -0,0 +1,58 @@
+import threading
+
+import character_ids
+from character_ids import new_character_id
+
+
+def test_ids_are_unique_and_sort_by_creation():
+    ids = [new_character_id() for _ in range(2000)]
+
+    assert len(set(ids)) == len(ids)
+    assert sorted(ids) == ids
+
+
+def test_ids_sort_after_older_ids_from_the_same_second():
+    character_id = new_character_id()
+
+    assert character_id[:14].isdigit()
+    assert character_id > character_id[:14]
+
+
+def test_ids_keep_their_order_when_the_clock_stands_still(monkeypatch):
+    monkeypatch.setattr(character_ids, '_last_millis', 0)
+    monkeypatch.setattr(character_ids.time, 'time', lambda: 1741385607.483)
+
+    ids = [new_character_id() for _ in range(3)]
+
+    assert sorted(ids) == ids
+    assert [character_id[17:21] for character_id in ids] == ['0000', '0001', '0002']
+
+
+def test_ids_move_to_the_next_millisecond_when_the_sequence_runs_out(monkeypatch):
+    monkeypatch.setattr(character_ids, '_last_millis', 0)
+    monkeypatch.setattr(character_ids.time, 'time', lambda: 1741385607.483)
+    first = new_character_id()
+    monkeypatch.setattr(character_ids, '_sequence', 0xffff)
+
+    second = new_character_id()
+
+    assert second[14:21] == '4840000'
+    assert second > first
+
+
+def test_ids_from_many_threads_do_not_collide():
+    ids = []
+
+    def generate():
+        generated = [new_character_id() for _ in range(500)]
+        with lock:
+            ids.extend(generated)
+
+    lock = threading.Lock()
+    threads = [threading.Thread(target=generate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == 2000
@@ -0,0 +1,134 @@
+import copy
+
+import pytest
+
+from derived_stats import DerivedStat, DerivedStatGraph, affects_derived_stats, update_derived_stats
+
+
+def make_character():
+    character = {
+        'name': 'Aria',
+        'abilities': {'strength': 8, 'dexterity': 14, 'constitution': 12, 'intelligence': 17, 'wisdom': 10,
+                      'charisma': 13},
+        'proficiency_bonus': 3,
+        'skills': ['Arcana', 'Stealth'],
+        'spellcasting': {'ability': 'intelligence'}
+    }
+    update_derived_stats(character)
+    return character
+
+
+def skill(character, name):
+    return next(skill for skill in character['skills'] if skill['name'] == name)
+
+
+def test_all_stats_are_computed_without_a_previous_version():
+    character = make_character()
+
+    assert character['ability_modifiers'] == {'strength': -1, 'dexterity': 2, 'constitution': 1,
+                                              'intelligence': 3, 'wisdom': 0, 'charisma': 1}
+    assert skill(character, 'Arcana') == {'name': 'Arcana', 'ability': 'intelligence', 'proficient': True,
+                                          'bonus': 6}
+    assert skill(character, 'Athletics')['bonus'] == -1
+    assert character['spellcasting']['spell_save_dc'] == 14
+    assert character['spellcasting']['spell_attack_bonus'] == 6
+
+
+def test_only_stats_depending_on_a_changed_input_are_recomputed():
+    previous = make_character()
+    character = copy.deepcopy(previous)
+    character['abilities']['intelligence'] = 19
+
+    updated = update_derived_stats(character, previous)
+
+    assert updated == ['ability_modifiers.intelligence', 'skills', 'spellcasting.spell_save_dc',
+                       'spellcasting.spell_attack_bonus']
+    assert skill(character, 'Arcana')['bonus'] == 7
+    assert character['spellcasting']['spell_save_dc'] == 15
+
+
+def test_a_change_reaching_only_some_stats_recomputes_only_those():
+    previous = make_character()
+    character = copy.deepcopy(previous)
+    character['spellcasting']['ability'] = 'charisma'
+
+    assert update_derived_stats(character, previous) == ['spellcasting.spell_save_dc',
+                                                         'spellcasting.spell_attack_bonus']
+    assert character['spellcasting']['spell_save_dc'] == 12
+
+
+def test_partial_recompute_matches_a_full_one():
+    previous = make_character()
+    character = copy.deepcopy(previous)
+    character['abilities']['dexterity'] = 18
+    character['proficiency_bonus'] = 4
+    character['skills'] = [{'name': 'Stealth', 'proficient': True}]
+
+    update_derived_stats(character, previous)
+    recomputed = copy.deepcopy(character)
+    update_derived_stats(recomputed)
+
+    assert character == recomputed
+
+
+def test_nothing_is_recomputed_when_no_input_changed():
+    previous = make_character()
+    character = copy.deepcopy(previous)
+    character['name'] = 'Aria the Wise'
+
+    assert update_derived_stats(character, previous) == []
+
+
+def test_stats_missing_from_an_older_character_are_computed():
+    previous = make_character()
+    character = copy.deepcopy(previous)
+    del character['spellcasting']['spell_attack_bonus']
+
+    assert update_derived_stats(character, previous) == ['spellcasting.spell_attack_bonus']
+    assert character['spellcasting']['spell_attack_bonus'] == 6
+
+
+def test_stats_of_a_missing_section_are_skipped():
+    character = make_character()
+    del character['spellcasting']
+
+    assert 'spellcasting.spell_save_dc' not in update_derived_stats(character)
+    assert 'spellcasting' not in character
+
+
+def test_stats_are_evaluated_after_the_stats_they_depend_on():
+    graph = DerivedStatGraph(
+        inputs={'a': ('a',)},
+        stats=[
+            DerivedStat(('c',), ['b'], lambda character: character['b'] * 10),
+            DerivedStat(('b',), ['a'], lambda character: character['a'] + 1)
+        ]
+    )
+    character = {'a': 1}
+
+    assert graph.update(character) == ['b', 'c']
+    assert character == {'a': 1, 'b': 2, 'c': 20}
+    assert [stat.name for stat in graph.affected['a']] == ['b', 'c']
+
+
+def test_unknown_dependencies_and_cycles_are_rejected():
+    with pytest.raises(ValueError, match='unknown values: missing'):
+        DerivedStatGraph({'a': ('a',)}, [DerivedStat(('b',), ['a', 'missing'], len)])
+
+    with pytest.raises(ValueError, match='depends on itself'):
+        DerivedStatGraph({}, [DerivedStat(('b',), ['c'], len), DerivedStat(('c',), ['b'], len)])
+
+
+@pytest.mark.parametrize('path, affects', [
+    (['abilities', 'strength'], True),
+    (['abilities'], True),
+    (['proficiency_bonus'], True),
+    (['skills', 3, 'proficient'], True),
+    (['spellcasting'], True),
+    (['spellcasting', 'ability'], True),
+    (['spellcasting', 'spell_slots', '1', 'used'], False),
+    (['hp', 'current'], False),
+    (['name'], False)
+])
+def test_affects_derived_stats(path, affects):
+    assert affects_derived_stats([{'path': ['name'], 'value': 'Aria'}, {'path': path, 'value': 1}]) == affects
@@ -0,0 +1,78 @@
+import io
+import tempfile
+
+import pytest
+
+from import_cache import ImportCache, hash_pdf
+
+PDF = b'%PDF-1.4 one character sheet' * 1000
+OTHER_PDF = b'%PDF-1.4 another character sheet' * 1000
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ImportCache(str(tmp_path / 'import_cache.db'))
+
+
+def test_hash_is_the_same_for_a_path_contents_and_a_file(tmp_path, monkeypatch):
+    monkeypatch.setattr('import_cache.HASH_CHUNK_SIZE', 1000)
+    path = tmp_path / 'sheet.pdf'
+    path.write_bytes(PDF)
+    spool = tempfile.SpooledTemporaryFile(max_size=100)
+    spool.write(PDF)
+
+    assert hash_pdf(str(path)) == hash_pdf(PDF) == hash_pdf(spool) != hash_pdf(OTHER_PDF)
+    # The importers read the file again from the start
+    assert spool.tell() == 0
+
+
+def test_entries_are_found_by_content(cache):
+    cache.document(PDF).put('form', '1', {'name': 'Aria'})
+
+    assert cache.document(io.BytesIO(PDF)).get('form', '1') == {'name': 'Aria'}
+    assert cache.document(OTHER_PDF).get('form', '1') is None
+    assert cache.document(PDF).get('text', '1') is None
+
+
+def test_entries_of_another_extractor_version_are_ignored(cache):
+    cache.document(PDF).put('form', '1', {'name': 'Aria'})
+
+    assert cache.document(PDF).get('form', '2') is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    value = 'x' * 100
+    cache = ImportCache(str(tmp_path / 'import_cache.db'), max_bytes=250)
+    cache.put('a', 'form', '1', value)
+    cache.put('b', 'form', '1', value)
+    assert cache.get('a', 'form', '1') == value
+
+    cache.put('c', 'form', '1', value)
+    assert cache.get('b', 'form', '1') is None
+    assert cache.get('a', 'form', '1') == value
+    assert cache.get('c', 'form', '1') == value
+    assert cache.stats()['entries'] == 2
+
+
+def test_values_larger_than_the_cache_are_not_stored(tmp_path):
+    cache = ImportCache(str(tmp_path / 'import_cache.db'), max_bytes=50)
+    cache.put('a', 'form', '1', 'x' * 100)
+
+    assert cache.stats() == {'entries': 0, 'bytes': 0}
+
+
+def test_clear_import_cache_command(cache, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'import_cache', cache)
+    for kind in ('form', 'classification'):
+        cache.put('a', kind, '1', {})
+        cache.put('b', kind, '1', {})
+
+    result = app.app.test_cli_runner().invoke(args=['clear-import-cache', '--kind', 'form'])
+    assert result.exit_code == 0
+    assert 'Removed 2 cache entries; 2 entries' in result.output
+    assert cache.get('a', 'classification', '1') == {}
+
+    result = app.app.test_cli_runner().invoke(args=['clear-import-cache'])
+    assert 'Removed 2 cache entries; 0 entries' in result.output
@@ -0,0 +1,50 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pytest
+
+import ocr_support
+
+
+class PageFailed(Exception):
+    pass
+
+
+@pytest.fixture
+def scan(monkeypatch):
+    # A 6 page scan OCRed by 2 workers, without poppler or tesseract; page 0 fails
+    recognized = []
+    lock = threading.Lock()
+
+    def recognize(page):
+        if page == 0:
+            raise PageFailed()
+        time.sleep(0.2)
+        with lock:
+            recognized.append(page)
+        return f'page {page}', {'profile': 'none', 'seconds': 0.2}
+
+    @contextmanager
+    def pdf_file(source):
+        yield source
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(ocr_support, 'OCR_WORKERS', 2)
+    monkeypatch.setattr(ocr_support, 'pdf_file', pdf_file)
+    monkeypatch.setattr(ocr_support.pdf2image, 'pdfinfo_from_path', lambda path: {'Pages': 6})
+    monkeypatch.setattr(ocr_support, 'rasterize_pages', lambda path, page_count: iter(range(page_count)))
+    monkeypatch.setattr(ocr_support, '_ocr_page_worker', recognize)
+    monkeypatch.setattr(ocr_support, 'get_page_pool', lambda: pool)
+    yield recognized
+    pool.shutdown()
+
+
+def test_pages_queued_behind_a_failed_page_are_cancelled(scan):
+    with pytest.raises(PageFailed):
+        ocr_support.ocr_pdf('scan.pdf', lambda stage: None)
+    time.sleep(0.5)
+
+    # Page 1 may already have been running; page 2 was still queued
+    assert 2 not in scan
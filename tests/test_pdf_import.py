@@ -0,0 +1,74 @@
+import random
+
+from pdf_import import FieldResolver, get_field_value
+
+
+def reference_lookup(form_fields, field_names):
+    # The linear scan FieldResolver replaced
+    for name in field_names:
+        if form_fields.get(name):
+            return form_fields[name]
+        for field, value in form_fields.items():
+            if field.lower() == name.lower() and value:
+                return value
+        for field, value in form_fields.items():
+            if name.lower() in field.lower() and value:
+                return value
+    return ""
+
+
+def test_exact_match_wins_over_other_case_and_containing_fields():
+    fields = FieldResolver({'Class Level': 'contains', 'CLASS': 'other case', 'Class': 'exact'})
+
+    assert fields.get(['Class']) == 'exact'
+
+
+def test_case_insensitive_match_wins_over_containing_fields():
+    fields = FieldResolver({'ClassLevel': 'contains', 'CLASS': 'other case'})
+
+    assert fields.get(['class']) == 'other case'
+
+
+def test_first_containing_field_in_form_order_wins():
+    fields = FieldResolver({'Race ': '', 'Subrace Name': 'Hill', 'Race Name': 'Dwarf'})
+
+    assert fields.get(['race']) == 'Hill'
+
+
+def test_empty_fields_never_match():
+    fields = FieldResolver({'Race': '', 'Race Name': 'Dwarf'})
+
+    assert fields.get(['Race']) == 'Dwarf'
+    assert fields.get(['Background']) == ''
+
+
+def test_earlier_candidates_win_over_better_matches_of_later_ones():
+    fields = FieldResolver({'CharacterName': 'Aria', 'Name': 'Player'})
+
+    assert fields.get(['Character', 'Name']) == 'Aria'
+    assert fields.get(['Alignment', 'Name']) == 'Player'
+
+
+def test_names_shorter_than_a_trigram_are_still_found():
+    fields = FieldResolver({'Strength': '16', 'STRmod': '+3', 'AC': '15'})
+
+    assert fields.get(['ac']) == '15'
+    assert fields.get(['rm']) == '+3'
+
+
+def test_lookups_agree_with_a_linear_scan():
+    generator = random.Random(7)
+    words = ['Spell', 'Slot', 'Total', 'Level', 'CHA', 'mod', 'Check Box', 'Save', ' ', '1', '2', '-']
+    form_fields = {}
+    for _ in range(300):
+        name = ''.join(generator.choice(words) for _ in range(generator.randint(1, 4)))
+        form_fields[name] = generator.choice(['', '', 'x', str(generator.randint(0, 20))])
+    fields = FieldResolver(form_fields)
+
+    for _ in range(500):
+        candidates = [''.join(generator.choice(words) for _ in range(generator.randint(1, 2))).lower()
+                      if generator.random() < 0.5 else generator.choice(list(form_fields))
+                      for _ in range(generator.randint(1, 3))]
+        expected = reference_lookup(form_fields, candidates)
+        assert fields.get(candidates) == expected
+        assert get_field_value(form_fields, candidates) == expected
@@ -0,0 +1,88 @@
+import pytest
+
+import rules
+from rules import (ability_modifier, caster_level, find_casting_class, is_spellcaster, parse_class_levels,
+                   spell_slot_totals, spellcasting_ability)
+
+
+@pytest.mark.parametrize('character_class, expected', [
+    ('Wizard', 'wizard'),
+    ('cleric (Life Domain)', 'cleric'),
+    ('Fighter (Eldritch Knight)', 'eldritch knight'),
+    ('Arcane Trickster Rogue', 'arcane trickster'),
+    ('Fighter', None),
+    ('Rogue (Thief)', None),
+    ('', None),
+    (None, None)
+])
+def test_find_casting_class(character_class, expected):
+    assert find_casting_class(character_class) == expected
+    assert is_spellcaster(character_class) == (expected is not None)
+
+
+def test_spellcasting_ability():
+    assert spellcasting_ability('Sorcerer') == 'charisma'
+    assert spellcasting_ability('Fighter (Eldritch Knight)') == 'intelligence'
+    assert spellcasting_ability('Barbarian') == ''
+
+
+@pytest.mark.parametrize('score, modifier', [(1, -5), (8, -1), (9, -1), (10, 0), (11, 0), (15, 2), (30, 10)])
+def test_ability_modifier(score, modifier):
+    assert ability_modifier(score) == modifier
+
+
+def test_parse_class_levels():
+    assert parse_class_levels('Wizard 5') == [('Wizard', 5)]
+    assert parse_class_levels('Paladin 6 / Sorcerer 2') == [('Paladin', 6), ('Sorcerer', 2)]
+    assert parse_class_levels('Fighter (Eldritch Knight) 7, Wizard 1') == [
+        ('Fighter (Eldritch Knight)', 7), ('Wizard', 1)]
+    assert parse_class_levels('Wizard') == []
+    assert parse_class_levels(None) == []
+
+
+def slots(*counts):
+    return tuple(counts) + (0,) * (9 - len(counts))
+
+
+@pytest.mark.parametrize('class_levels, expected', [
+    ([('Wizard', 1)], slots(2)),
+    ([('Wizard', 5)], slots(4, 3, 2)),
+    ([('Wizard', 20)], slots(4, 3, 3, 3, 3, 2, 2, 1, 1)),
+    ([('Wizard', 25)], slots(4, 3, 3, 3, 3, 2, 2, 1, 1)),
+    ([('Paladin', 1)], slots()),
+    ([('Paladin', 2)], slots(2)),
+    ([('Ranger', 5)], slots(4, 2)),
+    ([('Artificer', 1)], slots(2)),
+    ([('Fighter (Eldritch Knight)', 2)], slots()),
+    ([('Fighter (Eldritch Knight)', 7)], slots(4, 2)),
+    ([('Warlock', 1)], slots(1)),
+    ([('Warlock', 5)], slots(0, 0, 2)),
+    ([('Warlock', 11)], slots(0, 0, 0, 0, 3, 1)),
+    ([('Warlock', 17)], slots(0, 0, 0, 0, 4, 1, 1, 1, 1)),
+    ([('Fighter', 10)], slots()),
+    ([('Paladin', 6), ('Sorcerer', 2)], slots(4, 3, 2)),
+    ([('Paladin', 3), ('Ranger', 3)], slots(3)),
+    ([('Wizard', 3), ('Warlock', 2)], slots(6, 2)),
+    ([('Fighter', 4), ('Rogue', 4)], slots())
+])
+def test_spell_slot_totals(class_levels, expected):
+    assert spell_slot_totals(class_levels) == expected
+
+
+def test_caster_level_ignores_pact_magic_and_is_capped():
+    assert caster_level([('Warlock', 10)]) == 0
+    assert caster_level([('Paladin', 1), ('Warlock', 3)]) == 0
+    assert caster_level([('Wizard', 15), ('Cleric', 15)]) == rules.MAX_LEVEL
+
+
+def test_class_tables_cover_every_level():
+    assert len(rules.SPELL_SLOTS_BY_CASTER_LEVEL) == len(rules.PACT_SLOTS) == rules.MAX_LEVEL + 1
+    for progression, by_level in rules.CLASS_SPELL_SLOTS.items():
+        assert len(by_level) == rules.MAX_LEVEL + 1
+        assert by_level[0] == rules.NO_SPELL_SLOTS
+        if progression == 'pact':
+            # Pact slots move up to higher spell levels as the warlock levels up
+            continue
+        for lower, higher in zip(by_level, by_level[1:]):
+            assert all(before <= after for before, after in zip(lower, higher))
+    assert {progression for progression, _ in rules.CASTING_CLASSES.values()} == set(rules.CLASS_SPELL_SLOTS)
@@ -0,0 +1,232 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from journal import journal_paths
+from storage import VersionConflict, copy_characters, create_storage, lock_file, remove_lock_file, sort_value
+
+CHARACTERS = [
+    ('Aria', 'Elf', 'Wizard', 5),
+    ('Borin', 'Dwarf', 'Cleric', 3),
+    ('Cass', 'Human', 'Rogue', 5),
+    ('Dain', 'Dwarf', 'Fighter', 1),
+    ('Eryn', 'Elf', 'Ranger', 3),
+    ('Faye', 'Halfling', 'Bard', 5),
+    ('Gorm', 'Half-Orc', 'Barbarian', 2)
+]
+
+
+def new_character(name='Aria', race='Elf', character_class='Wizard', level=1):
+    return {
+        'name': name,
+        'race': race,
+        'class': character_class,
+        'level': level,
+        'abilities': {},
+        'hp': {'max': 10, 'current': 10}
+    }
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def storage(request, tmp_path):
+    path = str(tmp_path) if request.param == 'json' else str(tmp_path / 'characters.db')
+    return create_storage(request.param, path)
+
+
+def save_roster(storage):
+    # Explicit IDs, so the roster doesn't depend on how new IDs are generated
+    return [storage.save(dict(new_character(*character), id=f'character-{index}'))
+            for index, character in enumerate(CHARACTERS)]
+
+
+@pytest.fixture
+def json_storage(tmp_path):
+    return create_storage('json', str(tmp_path))
+
+
+def test_save_increments_version(storage):
+    character = new_character()
+    character_id = storage.save(character)
+    assert storage.get(character_id)['version'] == 1
+
+    storage.save(character, expected_version=1)
+    assert character['version'] == 2
+    assert storage.get(character_id)['version'] == 2
+
+
+def test_stale_save_raises_version_conflict(storage):
+    character_id = storage.save(new_character())
+    first, second = storage.get(character_id), storage.get(character_id)
+
+    first['name'] = 'First'
+    storage.save(first, expected_version=1)
+    second['name'] = 'Second'
+    with pytest.raises(VersionConflict) as conflict:
+        storage.save(second, expected_version=1)
+
+    assert conflict.value.expected_version == 1
+    assert conflict.value.current_version == 2
+    stored = storage.get(character_id)
+    assert (stored['name'], stored['version']) == ('First', 2)
+
+
+def test_stale_mutations_raise_version_conflict(storage):
+    character_id = storage.save(new_character())
+    assert storage.apply_mutations(character_id, [{'path': ['hp', 'current'], 'value': 7}], expected_version=1) == 2
+
+    with pytest.raises(VersionConflict):
+        storage.apply_mutations(character_id, [{'path': ['hp', 'current'], 'value': 3}], expected_version=1)
+    stored = storage.get(character_id)
+    assert (stored['hp']['current'], stored['version']) == (7, 2)
+
+
+def test_mutations_of_a_missing_character_return_none(storage):
+    assert storage.apply_mutations('missing', [{'path': ['hp', 'current'], 'value': 3}]) is None
+
+
+@pytest.mark.parametrize('sort', ['id', 'name', 'level', '-level', 'race', '-class'])
+def test_pages_return_every_character_once_in_order(storage, sort):
+    save_roster(storage)
+    field = sort.lstrip('-')
+    expected = sorted(storage.summaries(), key=lambda summary: (sort_value(summary, field), summary['id']),
+                      reverse=sort.startswith('-'))
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = storage.query_summaries(sort=sort, limit=3, cursor=cursor)
+        seen.extend(summary['id'] for summary in page)
+        if cursor is None:
+            break
+    assert seen == [summary['id'] for summary in expected]
+
+
+def test_pages_skip_characters_deleted_between_pages(storage):
+    ids = save_roster(storage)
+    page, cursor = storage.query_summaries(sort='id', limit=3)
+    storage.delete(ids[3])
+    assert len(storage.summaries()) == len(CHARACTERS) - 1
+
+    rest, _ = storage.query_summaries(sort='id', limit=10, cursor=cursor)
+    assert [summary['id'] for summary in page + rest] == sorted(set(ids) - {ids[3]})
+
+
+@pytest.mark.parametrize('sort, value', [('level', 'Aria'), ('name', 3), ('level', True), ('level', 2.5)])
+def test_cursor_of_another_field_type_is_rejected(storage, sort, value):
+    storage.save(new_character())
+    cursor = base64.urlsafe_b64encode(json.dumps([value, 'x']).encode()).decode().rstrip('=')
+    with pytest.raises(ValueError):
+        storage.query_summaries(sort=sort, cursor=cursor)
+
+
+def test_spellcaster_filter_falls_back_to_the_class(storage):
+    wizard = storage.save(new_character('Aria', character_class='Wizard'))
+    fighter = storage.save(new_character('Borin', character_class='Fighter'))
+    knight = storage.save(dict(new_character('Cass', character_class='Fighter'),
+                               spellcasting={'class': 'Fighter (Eldritch Knight)', 'ability': 'intelligence'}))
+
+    casters, _ = storage.query_summaries(filters={'spellcaster': True})
+    others, _ = storage.query_summaries(filters={'spellcaster': False})
+    assert {summary['id'] for summary in casters} == {wizard, knight}
+    assert [summary['id'] for summary in others] == [fighter]
+
+
+def test_sqlite_summaries_of_an_older_layout_are_rebuilt(tmp_path):
+    path = str(tmp_path / 'characters.db')
+    character_id = create_storage('sqlite', path).save(new_character(character_class='Wizard'))
+    with sqlite3.connect(path) as connection:
+        connection.execute('UPDATE characters SET spellcaster = 0')
+        connection.execute('PRAGMA user_version = 0')
+
+    casters, _ = create_storage('sqlite', path).query_summaries(filters={'spellcaster': True})
+    assert [summary['id'] for summary in casters] == [character_id]
+
+
+def test_malformed_cursor_is_rejected(storage):
+    with pytest.raises(ValueError):
+        storage.query_summaries(cursor='not a cursor!')
+
+
+def test_journal_is_replayed_when_reopened(json_storage, tmp_path):
+    character_id = json_storage.save(new_character())
+    json_storage.apply_mutations(character_id, [{'path': ['hp', 'current'], 'value': 4}])
+    assert os.path.exists(journal_paths(str(tmp_path), character_id)[1])
+
+    reopened = create_storage('json', str(tmp_path))
+    stored = reopened.get(character_id)
+    assert (stored['hp']['current'], stored['version']) == (4, 2)
+
+
+def test_compaction_folds_the_journal_into_the_document(json_storage, tmp_path):
+    character_id = json_storage.save(new_character())
+    json_storage.apply_mutations(character_id, [{'path': ['hp', 'current'], 'value': 4}])
+    json_storage.compact(character_id)
+
+    assert not any(os.path.exists(path) for path in journal_paths(str(tmp_path), character_id))
+    stored = create_storage('json', str(tmp_path)).get(character_id)
+    assert (stored['hp']['current'], stored['version']) == (4, 2)
+
+
+def test_journal_left_behind_by_a_save_is_ignored(json_storage, tmp_path):
+    character_id = json_storage.save(new_character())
+    json_storage.apply_mutations(character_id, [{'path': ['hp', 'current'], 'value': 4}])
+    journal_path = journal_paths(str(tmp_path), character_id)[1]
+    with open(journal_path) as file:
+        journal = file.read()
+
+    character = json_storage.get(character_id)
+    character['hp']['current'] = 9
+    json_storage.save(character, expected_version=2)
+    # As if the process died between writing the document and removing the journal
+    with open(journal_path, 'w') as file:
+        file.write(journal)
+
+    stored = create_storage('json', str(tmp_path)).get(character_id)
+    assert (stored['hp']['current'], stored['version']) == (9, 3)
+
+
+def test_deleting_a_character_removes_its_lock_file(json_storage, tmp_path):
+    character_id = json_storage.save(new_character())
+    json_storage.apply_mutations(character_id, [{'path': ['hp', 'current'], 'value': 4}])
+    assert json_storage.delete(character_id)
+
+    assert os.listdir(tmp_path / '.locks') == []
+    assert not any(os.path.exists(path) for path in journal_paths(str(tmp_path), character_id))
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='lock files are kept on Windows')
+def test_writers_waiting_on_a_removed_lock_file_lock_the_new_one(tmp_path):
+    path = str(tmp_path / 'character.lock')
+    held, locked = threading.Event(), []
+
+    def writer():
+        held.wait()
+        with lock_file(path):
+            locked.append(os.path.exists(path))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    with lock_file(path):
+        held.set()
+        time.sleep(0.1)
+        remove_lock_file(path)
+    thread.join(5)
+
+    assert locked == [True]
+
+
+def test_copying_characters_leaves_the_source_untouched(tmp_path):
+    # A file written before derived stats were stored, read through the cache
+    with open(tmp_path / 'aria.json', 'w') as file:
+        json.dump(dict(new_character(), id='aria', version=1, ability_modifiers={}), file)
+    source = create_storage('json', str(tmp_path))
+    before = source.get('aria')
+    destination = create_storage('sqlite', str(tmp_path / 'characters.db'))
+
+    assert copy_characters(source, destination) == 1
+    assert source.get('aria') == before
+    assert destination.get('aria')['name'] == 'Aria'